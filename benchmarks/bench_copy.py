@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Benchmark FileSequence.copy_to against shutil.copy per frame
+
+Copies a temporary sequence of 200 frames of 4MB each into a new folder.
+Every copy goes to a fresh folder, so page cache effects are the same for
+each method.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from benchutils import report
+
+from sequences import core
+
+FRAMES = 200
+FRAME_SIZE = 4 * 1024 * 1024
+
+
+def copy_with_shutil(seq, folder):
+    os.makedirs(folder)
+    for path in seq.paths:
+        shutil.copy(path, folder)
+
+
+def main():
+    root = tempfile.mkdtemp()
+    try:
+        source = os.path.join(root, 'source')
+        os.mkdir(source)
+        data = os.urandom(FRAME_SIZE)
+        for frame in range(1, FRAMES + 1):
+            with open(os.path.join(source, 'beauty.{0:04d}.exr'.format(frame)), 'wb') as f:
+                f.write(data)
+        seq = core.FileSequence(os.path.join(source, 'beauty.0001.exr'))
+        seq.frameSizes
+
+        cases = [
+            ('shutil.copy', lambda folder: copy_with_shutil(seq, folder)),
+            ('copy_to 1', lambda folder: seq.copy_to(folder + '/', workers=1)),
+            ('copy_to 8', lambda folder: seq.copy_to(folder + '/', workers=8)),
+            ('copy_to link', lambda folder: seq.copy_to(folder + '/', hardlink=True)),
+        ]
+        rows = []
+        for index, (name, func) in enumerate(cases):
+            folder = os.path.join(root, 'copy{0}'.format(index))
+            start = time.time()
+            func(folder)
+            elapsed = time.time() - start
+            assert len(os.listdir(folder)) == FRAMES
+            rows.append((name, FRAMES, '{0:.2f}s'.format(elapsed)))
+        report('Copy {0} frames of {1}MB'.format(FRAMES, FRAME_SIZE // (1024 * 1024)), rows, ('method', 'frames', 'time'))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
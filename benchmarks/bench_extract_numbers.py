@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Benchmark FileSequence.extract_numbers on large folder listings
+
+Times the python and NumPy implementations on a listing of paths that
+all have the length of the sequence paths, half of them in the sequence,
+and on a listing that mixes in paths of other lengths. The NumPy
+implementation is skipped if NumPy is not installed.
+"""
+from benchutils import best_time, report
+
+import sequences
+from sequences import core
+
+SIZES = [1000, 10000, 100000, 1000000]
+
+
+LISTINGS = [
+    ('equal length', '/show/seq010/shot010/render/volume.{0:07d}.exr'),
+    ('mixed length', '/show/seq010/shot010/render/beauty_denoise.{0:07d}.exr'),
+]
+
+
+def build_listing(size, otherTemplate):
+    paths = []
+    for index in range(size // 2):
+        paths.append('/show/seq010/shot010/render/beauty.{0:07d}.exr'.format(index))
+        paths.append(otherTemplate.format(index))
+    return paths
+
+
+def main():
+    seq = sequences.FileSequence('/show/seq010/shot010/render/beauty.0000001.exr', validateExists=False)
+    rows = []
+    for name, otherTemplate in LISTINGS:
+        for size in SIZES:
+            paths = build_listing(size, otherTemplate)
+            pythonTime = best_time(lambda: seq.extract_numbers(paths, useNumpy=False))
+            if core.numpy is not None:
+                numpyTime = best_time(lambda: seq.extract_numbers(paths, useNumpy=True))
+                numpyColumn = '{0:.1f}ms'.format(numpyTime * 1e3)
+            else:
+                numpyColumn = 'n/a'
+            rows.append((name, size, '{0:.1f}ms'.format(pythonTime * 1e3), numpyColumn))
+    report('extract_numbers', rows, ('listing', 'paths', 'python', 'numpy'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Benchmark flatten_sequences scaling
+
+Builds manifests of growing size with 100 frames per sequence and times
+flatten_sequences on each. The time per path should stay flat as the
+manifest grows, the script exits with an error if the largest manifest
+costs more than twice as much per path as the smallest.
+"""
+import sys
+
+from benchutils import best_time, report
+
+import sequences
+
+SIZES = [25000, 50000, 100000, 200000, 400000]
+FRAMES = 100
+MAX_RATIO = 2.0
+
+
+def build_manifest(size):
+    paths = []
+    for index in range(size // FRAMES):
+        template = '/show/seq{0:03d}/shot{1:05d}/render/beauty.{{0:04d}}.exr'.format(index % 50, index)
+        paths.extend(template.format(frame) for frame in range(1001, 1001 + FRAMES))
+    paths.append('/show/readme.txt')
+    return paths
+
+
+def main():
+    rows = []
+    perPath = []
+    for size in SIZES:
+        paths = build_manifest(size)
+        elapsed = best_time(lambda: sequences.flatten_sequences(paths))
+        perPath.append(elapsed / len(paths))
+        rows.append((len(paths), '{0:.3f}s'.format(elapsed), '{0:.2f}us'.format(perPath[-1] * 1e6)))
+    report('flatten_sequences', rows, ('paths', 'time', 'per path'))
+
+    ratio = perPath[-1] / perPath[0]
+    print('Per path cost ratio largest/smallest: {0:.2f}'.format(ratio))
+    if ratio > MAX_RATIO:
+        print('Scaling is not linear')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Benchmark recursive scan_for_files with a persistent listing cache
+
+Builds a temporary tree of 400 folders and scans it with a simulated
+network latency of 5ms added to every folder listing, without a cache, with
+a cold cache and with a warm cache opened as a new process would. Only the
+listings are slowed down, a warm scan still stats every folder.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import scandir
+
+from benchutils import best_time, report
+
+from sequences import core
+
+LATENCY = 0.005
+FOLDERS = 20
+
+
+class SlowScandir(object):
+    """
+    Stands in for the scandir module, every listing waits LATENCY seconds first
+    """
+
+    @staticmethod
+    def scandir(path):
+        time.sleep(LATENCY)
+        return scandir.scandir(path)
+
+
+def build_tree(root):
+    folders = [root]
+    for shot in range(FOLDERS):
+        folders.append(os.path.join(root, 'shot{0:03d}'.format(shot)))
+        for layer in range(FOLDERS):
+            folder = os.path.join(folders[-1], 'layer{0:03d}'.format(layer))
+            os.makedirs(folder)
+            for frame in range(5):
+                open(os.path.join(folder, 'beauty.{0:04d}.exr'.format(frame)), 'w').close()
+            folders.append(folder)
+    # Old enough to be stored in the cache
+    stamp = time.time() - 60
+    for folder in folders:
+        os.utime(folder, (stamp, stamp))
+
+
+def main():
+    root = tempfile.mkdtemp()
+    cacheFolder = tempfile.mkdtemp()
+    database = os.path.join(cacheFolder, 'listings.db')
+    try:
+        tree = os.path.join(root, 'tree')
+        build_tree(tree)
+        expected = core.scan_for_files(tree, recursive=True)
+        core.scandir = SlowScandir
+        rows = []
+
+        elapsed = best_time(lambda: core.scan_for_files(tree, recursive=True), repeat=1)
+        rows.append(('none', '{0:.2f}s'.format(elapsed)))
+
+        core.set_listing_cache(database)
+        elapsed = best_time(lambda: core.scan_for_files(tree, recursive=True), repeat=1)
+        rows.append(('cold', '{0:.2f}s'.format(elapsed)))
+        core.LISTING_CACHE.close()
+
+        cache = core.set_listing_cache(database)
+        assert core.scan_for_files(tree, recursive=True) == expected
+        assert cache.misses == 0
+        elapsed = best_time(lambda: core.scan_for_files(tree, recursive=True))
+        rows.append(('warm', '{0:.2f}s'.format(elapsed)))
+        cache.close()
+        report('scan_for_files, {0:.0f}ms per listing'.format(LATENCY * 1e3), rows, ('cache', 'time'))
+    finally:
+        core.scandir = scandir
+        core.set_listing_cache(None)
+        shutil.rmtree(root)
+        shutil.rmtree(cacheFolder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Benchmark the memory used per resident FileSequence
+
+Flattens a manifest of 100k ten frame sequences, loads the items of every
+sequence and measures how much the resident set grew. The figure includes
+the flatten_sequences result entry of each sequence, but not the manifest
+paths. The script exits with an error if a sequence costs more than
+MAX_BYTES_PER_SEQUENCE, the figure documented in the README.
+
+Resident set size is read from /proc, so this only runs on Linux.
+"""
+import gc
+import sys
+
+from benchutils import report
+
+import sequences
+
+SEQUENCES = 100000
+FRAMES = 10
+MAX_BYTES_PER_SEQUENCE = 2560
+
+
+def resident_bytes():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * 4096
+
+
+def build_manifest(count):
+    paths = []
+    for index in range(count):
+        template = '/show/seq{0:03d}/shot{1:05d}/render/beauty.{{0:04d}}.exr'.format(index % 50, index)
+        paths.extend(template.format(frame) for frame in range(1001, 1001 + FRAMES))
+    return paths
+
+
+def main():
+    paths = build_manifest(SEQUENCES)
+    gc.collect()
+    before = resident_bytes()
+
+    flattened = sequences.flatten_sequences(paths)
+    for seq in flattened.itervalues():
+        seq.items
+    gc.collect()
+    perSequence = (resident_bytes() - before) / float(len(flattened))
+
+    report('resident FileSequence memory', [(len(flattened), '{0:.0f}B'.format(perSequence))], ('sequences', 'per sequence'))
+    if perSequence > MAX_BYTES_PER_SEQUENCE:
+        print('Sequences use more than {0} bytes each'.format(MAX_BYTES_PER_SEQUENCE))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
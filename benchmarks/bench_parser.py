@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Benchmark the sequence path parser against DEFAULT_FILE_SEQUENCE_PATTERN
+
+Times the work FileSequence.validate_path does to find the sequence groups
+and format type of a path, once with the regex and once with
+match_file_sequence, on plain render paths and on paths with many periods
+in the folder names. The script exits with an error if the parser is
+slower than the regex on any of them.
+"""
+import sys
+
+from benchutils import best_time, report
+
+from sequences import core
+
+COUNT = 20000
+
+
+def build_paths(count, template):
+    return [template.format(index % 50, index // 100, 1001 + index % 100) for index in range(count)]
+
+
+PATH_SETS = [
+    ('render', '/mnt/projects/show/seq_{0:03d}/shot_{1:05d}/render/v003/beauty.{2:04d}.exr'),
+    ('dotted', '/mnt/projects/show.v2/seq_{0:03d}/shot_{1:05d}/render/comp.main.v003/beauty.denoised.left.{2:04d}.exr'),
+    ('spaces', '/mnt/My Projects/show v2/seq {0:03d}/shot {1:05d}/plate.main.{2:04d} - Copy.jpg'),
+]
+
+
+def parse_regex(paths):
+    regex = core.DEFAULT_FILE_SEQUENCE_PATTERN
+    results = []
+    for path in paths:
+        groups = regex.search(path).groupdict()
+        formatType = None
+        for key in groups:
+            if key in core.SEQUENCE_FORMAT_TYPES and groups[key]:
+                formatType = key
+        results.append((groups, formatType))
+    return results
+
+
+def parse_scanner(paths):
+    results = []
+    for path in paths:
+        match = core.match_file_sequence(path)
+        results.append((match.groupdict(), match.formatType))
+    return results
+
+
+def main():
+    rows = []
+    result = 0
+    for name, template in PATH_SETS:
+        paths = build_paths(COUNT, template)
+        for path, expected, parsed in zip(paths, parse_regex(paths[:100]), parse_scanner(paths[:100])):
+            if parsed != expected:
+                print('Parser and regex disagree on {0}'.format(path))
+                return 1
+
+        regexTime = best_time(lambda: parse_regex(paths))
+        scannerTime = best_time(lambda: parse_scanner(paths))
+        speedup = regexTime / scannerTime
+        rows.append((
+            name,
+            '{0:.2f}us'.format(regexTime / COUNT * 1e6),
+            '{0:.2f}us'.format(scannerTime / COUNT * 1e6),
+            '{0:.2f}x'.format(speedup),
+        ))
+        if speedup < 1.0:
+            result = 1
+    report('sequence path parsing, per path', rows, ('paths', 'regex', 'scanner', 'speedup'))
+    if result:
+        print('Parser is slower than the regex')
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(main())
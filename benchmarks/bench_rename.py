@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Benchmark FileSequence.rename with a pool of workers
+
+Re-pads a temporary sequence of 2000 frames with a simulated network
+latency of 2ms added to every rename, with growing numbers of workers.
+The new names never reuse an old name, so every frame is renamed once.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from benchutils import report
+
+from sequences import core
+
+LATENCY = 0.002
+FRAMES = 2000
+WORKERS = [1, 4, 16, 32]
+
+
+class SlowOs(object):
+    """
+    Stands in for the os module, every rename waits LATENCY seconds first
+    """
+
+    def __getattr__(self, name):
+        return getattr(os, name)
+
+    @staticmethod
+    def rename(src, dst):
+        time.sleep(LATENCY)
+        os.rename(src, dst)
+
+
+def main():
+    root = tempfile.mkdtemp()
+    try:
+        for frame in range(1, FRAMES + 1):
+            open(os.path.join(root, 'beauty.{0:04d}.exr'.format(frame)), 'w').close()
+        seq = core.FileSequence(os.path.join(root, 'beauty.0001.exr'))
+        core.os = SlowOs()
+        rows = []
+        padding = 4
+        for workers in WORKERS:
+            padding += 1
+            start = time.time()
+            assert seq.rename(padding=padding, workers=workers)
+            elapsed = time.time() - start
+            assert len(seq) == FRAMES
+            rows.append((workers, FRAMES, '{0:.2f}s'.format(elapsed)))
+        report('FileSequence.rename, {0:.0f}ms per rename'.format(LATENCY * 1e3), rows, ('workers', 'frames', 'time'))
+    finally:
+        core.os = os
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Benchmark recursive scan_for_files with a pool of workers
+
+Builds a temporary tree of 400 folders and scans it with a simulated
+network latency of 5ms added to every folder listing, once serially and
+with growing numbers of workers.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import scandir
+
+from benchutils import best_time, report
+
+from sequences import core
+
+LATENCY = 0.005
+FOLDERS = 20
+WORKERS = [1, 4, 16, 32]
+
+
+class SlowScandir(object):
+    """
+    Stands in for the scandir module, every listing waits LATENCY seconds first
+    """
+
+    @staticmethod
+    def scandir(path):
+        time.sleep(LATENCY)
+        return scandir.scandir(path)
+
+
+def build_tree(root):
+    for shot in range(FOLDERS):
+        for layer in range(FOLDERS):
+            folder = os.path.join(root, 'shot{0:03d}'.format(shot), 'layer{0:03d}'.format(layer))
+            os.makedirs(folder)
+            for frame in range(5):
+                open(os.path.join(folder, 'beauty.{0:04d}.exr'.format(frame)), 'w').close()
+
+
+def main():
+    root = tempfile.mkdtemp()
+    try:
+        build_tree(root)
+        expected = core.scan_for_files(root, recursive=True)
+        core.scandir = SlowScandir
+        rows = []
+        for workers in WORKERS:
+            result = core.scan_for_files(root, recursive=True, workers=workers)
+            assert result == expected
+            elapsed = best_time(lambda: core.scan_for_files(root, recursive=True, workers=workers), repeat=1)
+            rows.append((workers, len(result), '{0:.2f}s'.format(elapsed)))
+        report('scan_for_files, {0:.0f}ms per listing'.format(LATENCY * 1e3), rows, ('workers', 'files', 'time'))
+    finally:
+        core.scandir = scandir
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
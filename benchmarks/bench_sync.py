@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Benchmark sync_sequence re-syncing a mostly complete sequence
+
+Syncs a temporary sequence of 5000 small frames to another folder, then
+adds 10 frames and syncs again, like mirroring render output while the
+render is running. Reports the time and the folder scans and stats of
+each sync.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from benchutils import report
+
+from sequences import core
+
+FRAMES = 5000
+NEW_FRAMES = 10
+
+
+def write_frames(folder, frames):
+    for frame in frames:
+        with open(os.path.join(folder, 'beauty.{0:04d}.exr'.format(frame)), 'wb') as f:
+            f.write('x' * 1024)
+    # Old enough for refresh to trust the folder time
+    stamp = time.time() - 10
+    os.utime(folder, (stamp, stamp))
+
+
+def main():
+    root = tempfile.mkdtemp()
+    try:
+        source = os.path.join(root, 'scratch')
+        destination = os.path.join(root, 'nas')
+        os.mkdir(source)
+        write_frames(source, range(1, FRAMES + 1))
+        seq = core.FileSequence(os.path.join(source, 'beauty.0001.exr'))
+
+        rows = []
+        for name in ('initial', 'unchanged', '+{0} frames'.format(NEW_FRAMES)):
+            if name.startswith('+'):
+                write_frames(source, range(FRAMES + 1, FRAMES + NEW_FRAMES + 1))
+            counter = core.SYSCALL_COUNTER
+            start = time.time()
+            copy, copied, removed = core.sync_sequence(seq, destination)
+            elapsed = time.time() - start
+            rows.append((name, len(copied), core.SYSCALL_COUNTER - counter, '{0:.3f}s'.format(elapsed)))
+        report('sync_sequence, {0} frames'.format(FRAMES), rows, ('sync', 'copied', 'syscalls', 'time'))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""
+Shared helpers for the benchmark scripts
+
+The benchmarks are plain scripts, run them from the repository root:
+
+    python benchmarks/bench_flatten.py
+"""
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPT_DIR), 'src'))
+
+
+def best_time(func, repeat=3):
+    """
+    Best wall clock time in seconds of calling func repeat times
+    """
+    result = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        if result is None or elapsed < result:
+            result = elapsed
+    return result
+
+
+def report(title, rows, columns):
+    """
+    Print rows of results under a title
+    """
+    print(title)
+    print('  '.join('{0:>14}'.format(c) for c in columns))
+    for row in rows:
+        print('  '.join('{0:>14}'.format(c) for c in row))
+    print('')
@@ -48,6 +48,9 @@ setup(
     include_package_data=True,
     # Requirements
     install_requires=requirements,
+    extras_require={
+        'numpy': ['numpy'],
+    },
     tests_require=test_requirements,
     zip_safe=False,
     keywords=[
@@ -6,3 +6,5 @@ del get_versions
 
 import utils                # NOQA
 from core import *          # NOQA
+from frameset import *      # NOQA
+from watcher import *       # NOQA
@@ -2,12 +2,23 @@
 
 import os
 import re
+import sys
+import json
+import errno
+import time
+import uuid
 import logging
+import sqlite3
+import threading
 import collections
-from itertools import count, groupby
+from array import array
+from itertools import izip, imap, compress
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 
 import scandir
-from utils import path_normalize, join_paths, fileStructure
+from utils import get_os, path_normalize, join_paths, compile_filter, copy_file, fileStructure, LRUCache
+from frameset import FrameSet, FrameMap, TemplateFrameMap, format_frame_range
 
 P4 = None
 try:
@@ -17,14 +28,32 @@ except:
 if not hasattr(P4, "P4") or not callable(P4.P4):
     P4 = None
 
+numpy = None
+try:
+    import numpy
+except ImportError:
+    pass
+
 __all__ = [
     'AbstractSequence',
     'FileSequence',
     'BaseSequence',
     'ImageSequence',
+    'DirectoryIndex',
+    'RenamePlan',
+    'RenameJournal',
+    'ListingCache',
+    'set_listing_cache',
+    'PendingResult',
     'scan_for_files',
+    'ascan_for_files',
+    'iter_files',
+    'find_sequences',
+    'afind_sequences',
+    'walk_sequences',
     'flatten_sequences',
     'get_sequence_range',
+    'sync_sequence',
 ]
 
 ROOTLOG = logging.getLogger()
@@ -69,6 +98,54 @@ SEQUENCE_FORMAT_TYPES = [
     'dollar',
 ]
 
+# Item numbers within a file name, used to bucket directory listings
+FILE_NUMBER_PATTERN = re.compile('\.(\d+)')
+
+# Parsed state of frame paths, shared by every sequence built from the same template
+TEMPLATE_CACHE_SIZE = 4096
+TEMPLATE_CACHE = LRUCache(TEMPLATE_CACHE_SIZE)
+
+# Lists at least this long use the NumPy implementation of extract_numbers
+NUMPY_MIN_ITEMS = 2048
+if numpy is not None:
+    # Maps digit bytes to '0' and all other bytes to something else
+    _DIGIT_ZERO_TABLE = numpy.arange(256, dtype=numpy.uint8)
+    _DIGIT_ZERO_TABLE[:ord('0')] = 1
+    _DIGIT_ZERO_TABLE[ord('0'):ord('9') + 1] = ord('0')
+
+# Folders modified less than this many seconds before a scan are scanned again on refresh,
+# a file added in the same timestamp tick would not change the folder time
+FOLDER_STAMP_RESOLUTION = 2.0
+
+# Folder listings on windows include the size and modification time of every file,
+# elsewhere getting them from a scan would cost a stat per file
+SCAN_STATS = get_os() == 'windows'
+# Typecode of the arrays of file sizes
+_SIZE_TYPECODE = 'l' if array('l').itemsize >= 8 else 'd'
+
+# Persistent folder listings used by scans when set, see set_listing_cache
+LISTING_CACHE = None
+
+# Moves of a rename for each phase, as indexes in (old path, temporary path, new path)
+RENAME_PHASES = {
+    'temporary': (0, 1),
+    'final': (1, 2),
+    'direct': (0, 2),
+    'undo-final': (2, 1),
+    'undo-temporary': (1, 0),
+    'undo-direct': (2, 0),
+}
+# Completed renames written to a rename journal at once
+JOURNAL_BATCH_SIZE = 512
+
+# Number of items copied or linked at once by default
+TRANSFER_WORKERS = 8
+
+# Number of threads shared by the asynchronous functions, at most this many folders are listed at once
+ASYNC_WORKERS = 8
+_ASYNC_POOL = None
+_ASYNC_POOL_LOCK = threading.Lock()
+
 # Profiling
 REGEX_COUNTER = 0
 SYSCALL_COUNTER = 0
@@ -84,6 +161,26 @@ class AbstractSequence(collections.Mapping):
     formatStringKey = 'item'
     sequenceFormatTypes = SEQUENCE_FORMAT_TYPES
 
+    # Sequence state is kept in slots, catalogs can hold hundreds of thousands of sequences
+    __slots__ = (
+        '_string',
+        '_input_items',
+        '_allow_negative',
+        '_primary_match',
+        '_format_type',
+        '_current_item',
+        '_current_item_number',
+        '_padding',
+        '_base_sequence_items',
+        '_sequence_items',
+        '_regex_string',
+        '_parsed',
+        '_built',
+        '_prefix',
+        '_suffix',
+        '_ext',
+    )
+
     def __init__(self, string, items=None, skipValidate=False, allowNegative=False):
         """
         Initalize a base sequence
@@ -151,17 +248,17 @@ class AbstractSequence(collections.Mapping):
         return len(self.items)
 
     def __iter__(self):
-        return sorted(self.items).__iter__()
+        return iter(self.items)
 
     def _clearProperties(self):
-        self._matches = []
         self._primary_match = None
         self._format_type = None
 
         self._current_item = None
         self._current_item_number = None
 
-        self._sequence_items = collections.OrderedDict()
+        # Created when the items are first loaded
+        self._sequence_items = None
         self._regex_string = None
 
         self._parsed = False
@@ -169,7 +266,6 @@ class AbstractSequence(collections.Mapping):
         self._prefix = None
         self._suffix = None
         self._ext = None
-        self._range = None
 
     def reload(self):
         self._clearProperties()
@@ -200,13 +296,21 @@ class AbstractSequence(collections.Mapping):
         """
         if not self.parsed:
             self._parse_values()
+        if self._sequence_items is None:
+            self._sequence_items = self._new_sequence_items()
         if not self._built:
             if self._input_items is not None:
                 items = self._build_sequence_items_from_input()
-                self._sequence_items.update(sorted(items.items(), key=lambda i: i[0]))
+                self._sequence_items.update(items)
                 self._built = True
         return self._sequence_items
 
+    def _new_sequence_items(self):
+        """
+        Empty mapping to hold the sequence items
+        """
+        return FrameMap()
+
     @property
     def items(self):
         """
@@ -224,6 +328,13 @@ class AbstractSequence(collections.Mapping):
     def parsed(self):
         return self._parsed
 
+    @property
+    def _matches(self):
+        # Only the primary match is kept
+        if self._primary_match is None:
+            return []
+        return [self._primary_match]
+
     @property
     def built(self):
         return self._built
@@ -236,8 +347,9 @@ class AbstractSequence(collections.Mapping):
         Returns:
             str
         """
-        if len(self.items):
-            return self[self.items.keys()[0]]
+        number = self.firstItemNumber
+        if number is not None:
+            return self[number]
         return None
 
     @property
@@ -248,9 +360,7 @@ class AbstractSequence(collections.Mapping):
         Returns:
             int
         """
-        if len(self.items):
-            return self.items.keys()[0]
-        return None
+        return self.items.frames.first
 
     @property
     def midItem(self):
@@ -260,8 +370,9 @@ class AbstractSequence(collections.Mapping):
         Returns:
             str
         """
-        if len(self.items):
-            return self[self.items.keys()[len(self.items.keys())/2]]
+        number = self.midItemNumber
+        if number is not None:
+            return self[number]
         return None
 
     @property
@@ -272,8 +383,9 @@ class AbstractSequence(collections.Mapping):
         Returns:
             int
         """
-        if len(self.items):
-            return self.items.keys()[len(self.items.keys())/2]
+        frames = self.items.frames
+        if len(frames):
+            return frames.at(len(frames) // 2)
         return None
 
     @property
@@ -284,8 +396,9 @@ class AbstractSequence(collections.Mapping):
         Returns:
             str
         """
-        if len(self.items):
-            return self[self.items.keys()[-1]]
+        number = self.lastItemNumber
+        if number is not None:
+            return self[number]
         return None
 
     @property
@@ -296,9 +409,7 @@ class AbstractSequence(collections.Mapping):
         Returns:
             int
         """
-        if len(self.items):
-            return self.items.keys()[-1]
-        return None
+        return self.items.frames.last
 
     @property
     def string(self):
@@ -438,139 +549,223 @@ class AbstractSequence(collections.Mapping):
 
         if not self._built:
             self._loadSequenceItems()
-        result = [self.num(s[1]) for s in self.items.items()]
+        result = self.items.frames.numbers.tolist()
         return result
 
-        # return sorted(self.items.keys())
-
     @property
     def range(self):
         """
         Range of item numbers
 
         Returns:
-            tuple of ints: (firstItemNumber, lastItemNumber)
+            list of lists of ints: [firstItemNumber, lastItemNumber] for each run of items
+                or [itemNumber] for runs of a single item
         """
-        if self._range is not None:
-            return self._range
         if not self._parsed:
             self._parse_values()
+        return [[start] if start == end else [start, end] for start, end in self.items.frames.runs]
 
-        def as_range(g):
-            l = list(g)
-            if l[0] == l[-1]:
-                return [l[0]]
-            return [l[0], l[-1]]
+    @property
+    def frameRange(self):
+        """
+        Frame range expression of the item numbers, steps are detected automatically
+        Ex:
+            '1-10,12,15-21x2'
 
-        grouped_numbers = [as_range(x) for _, x in groupby(self.numbers, lambda x, c=count(): next(c)-x)]
-        self._range = grouped_numbers
-        return self._range
+        Returns:
+            str
+        """
+        return format_frame_range(self.items.frames)
 
     @property
     def missing(self):
-        from itertools import imap, chain
-        from operator import sub
-        results = list(chain.from_iterable((self.numbers[i] + d for d in xrange(1, diff))
-            for i, diff in enumerate(imap(sub, self.numbers[1:], self.numbers))
-            if diff > 1))
-        return results
-
-    def rename(self, padding=None, startFrame=None, ignoreMissing=False, replace=False, dryrun=False, progressCB=None):
+        """
+        Item numbers missing between the first and last item
+
+        Returns:
+            list of int
+        """
+        return list(self.items.frames.missing())
+
+    def rename(self, padding=None, startFrame=None, ignoreMissing=False, replace=False, dryrun=False, progressCB=None, workers=1, journal=False):
+        """
+        Rename the items to a new padding and/or start frame
+
+        Plans the renames with plan_rename and applies the plan.
+
+        Args:
+            padding (int, optional): New padding
+            startFrame (int, optional): New first item number, the other items keep their offset to it
+            ignoreMissing (bool, optional): Whether to rename sequences with missing items
+            replace (bool, optional): Whether to replace existing files with the new names
+                Replaced files can't be restored if the rename is undone
+            dryrun (bool, optional): Only log the renames
+            progressCB (callable, optional): Called with (completed renames, total renames)
+            workers (int, optional): Number of renames done at once
+            journal (bool or str, optional): Whether to keep a RenameJournal next to the sequence, or its path
+
+        Returns:
+            bool: True if the items were renamed, False if it failed and was undone
+                None if there is nothing to rename
+
+        Raises:
+            ValueError: if the sequence is not a FileSequence
+                or if the sequence has missing items and ignoreMissing is False
+        """
+        plan = self.plan_rename(padding=padding, startFrame=startFrame, ignoreMissing=ignoreMissing, replace=replace)
+        if plan is None:
+            return
+        return self.apply(plan, dryrun=dryrun, progressCB=progressCB, workers=workers, journal=journal)
+
+    def plan_rename(self, padding=None, startFrame=None, ignoreMissing=False, replace=False):
+        """
+        Plan the renames giving the items a new padding and/or start frame without renaming anything
+
+        Collisions are found from a single listing of the folder the items
+        are renamed to.
+
+        Args:
+            padding (int, optional): New padding
+            startFrame (int, optional): New first item number, the other items keep their offset to it
+            ignoreMissing (bool, optional): Whether to rename sequences with missing items
+            replace (bool, optional): Whether to replace existing files with the new names
+
+        Returns:
+            RenamePlan: None if there is nothing to rename
+
+        Raises:
+            ValueError: if the sequence is not a FileSequence, its items aren't files
+                or if the sequence has missing items and ignoreMissing is False
+        """
+        # Items of other sequences are strings, not paths that can be listed or renamed
+        if not isinstance(self, FileSequence):
+            raise ValueError("Only file sequences can be renamed: {0}".format(self.string))
         # Validate we have something to rename
         if padding is None and startFrame is None:
             return
-        elif not self.items or not self.numbers:
+        elif not self.items:
             LOG.debug("Sequence has no items")
             return
-        elif startFrame is None and int(padding) == int(self.padding):
-            LOG.debug("Sequence padding already matches, nothing to rename")
-            return
-        elif padding is None and int(startFrame) == int(self.firstItemNumber):
-            LOG.warning("Sequence startframe already matches, nothing to rename")
-            return
-        elif int(padding) == int(self.padding) and int(startFrame) == int(self.firstItemNumber):
+        if padding is None:
+            padding = self.padding
+        if startFrame is None:
+            startFrame = self.firstItemNumber
+        if int(padding) == int(self.padding) and int(startFrame) == int(self.firstItemNumber):
             LOG.warning("Sequence already matches, nothing to rename")
             return
         if not ignoreMissing and len(self.range) > 1:
             raise ValueError("Cannot rename sequences with missing frames")
-
-        # Set defaults if not defined
-        if padding is None:
-            padding = self.padding
-        if startFrame is None:
-            startFrame = self.numbers[0]
+        padding = int(padding)
 
         # Get the offset/change from current startFrame and new startFrame
-        frameOffset = 0
-        if startFrame:
-            frameOffset = startFrame - self.numbers[0]
+        frameOffset = int(startFrame) - self.firstItemNumber
 
         # Build list of paths of new rename paths
         renamePaths = []
-        for item, num in zip(self.items, self.numbers):
-            newNum = num + frameOffset
-            newPath = self.prefix + ".%0{0}d".format(padding) % newNum + self.suffix
-            renamePaths.append((item.path, newPath))
-
-        # Reverse the order of renaming so we don't overwrite as we rename
-        reverse = True
-        if not startFrame or startFrame < self.numbers[0]:
-            reverse = False
-        if reverse:
-            renamePaths = list(reversed(renamePaths))
-
-        # Rename the files
-        completedOps = {}
-        errored = False
-        for index, paths in enumerate(renamePaths):
-            oldPath, newPath = paths
-            if dryrun and newPath in completedOps.keys():
-                # Since dryrun isn't actually renaming the files, check if the newPath was something previously renamed
-                # That way we don't error for something that exists, that wouldn't exist had dryRun been turned off
-                pass
-            elif os.path.exists(newPath) and not replace:
-                LOG.error("Error already exists while copying {0} -> {1}".format(oldPath, newPath))
-                errored = True
-                break
-            if dryrun:
-                LOG.info("Copying {0} -> {1}".format(os.path.basename(oldPath), os.path.basename(newPath)))
-                completedOps[oldPath] = (oldPath, newPath)
-                continue
-            try:
-                os.rename(oldPath, newPath)
-            except Exception, e:
-                LOG.exception(e)
-                errored = True
-                break
-            else:
-                completedOps[oldPath] = (oldPath, newPath)
-                progressCB(index, len(renamePaths))
-
-        # If it errored Undo what we managed to rename
-        if errored:
-            for oldPath, newPath in completedOps.values():
-                if dryrun:
-                    continue
-                os.rename(newPath, oldPath)
+        for num, path in self.items.iteritems():
+            renamePaths.append((path, self.get_string(num + frameOffset, padding=padding)))
+
+        # New names can be the current name of another item, anything else is a collision
+        oldPaths = set(oldPath for oldPath, newPath in renamePaths)
+        existing = set()
+        for folder in set(os.path.dirname(newPath) for oldPath, newPath in renamePaths):
+            files, folders = _list_folder(folder)
+            existing.update(files)
+            existing.update(folders)
+        collisions = []
+        twoPhase = False
+        for oldPath, newPath in renamePaths:
+            if newPath in oldPaths:
+                twoPhase = True
+            elif newPath in existing:
+                collisions.append(newPath)
 
         # Change source sequence path
+        if self._format_type == 'nums':
+            newNum = self.sourceNumber + frameOffset
+            newSource = self.get_string(newNum, padding=padding)
+        elif self._format_type == 'pounds':
+            newSource = self.get_pound_string(padding=padding)
+        elif self._format_type == 'regex':
+            newSource = self.get_regex_string(padding=padding)
+        elif self._format_type == 'formatstring':
+            newSource = self.get_format_string(padding=padding)
+        elif self._format_type == 'percent':
+            newSource = self.get_percent_string(padding=padding)
+        elif self._format_type == 'dollar':
+            newSource = self.get_dollar_string(padding=padding)
         else:
-            if self._format_type == 'nums':
-                newNum = self.sourceNumber + frameOffset
-                newPath = self.get_string(newNum, padding=padding)
-            elif self._format_type == 'pounds':
-                newPath = self.get_pound_string(padding=padding)
-            elif self._format_type == 'regex':
-                newPath = self.get_regex_string(padding=padding)
-            elif self._format_type == 'formatstring':
-                newPath = self.get_format_string(padding=padding)
-            elif self._format_type == 'percent':
-                newPath = self.get_percent_string(padding=padding)
-            elif self._format_type == 'dollar':
-                newPath = self.get_dollar_string(padding=padding)
-            else:
-                raise ValueError("Invalid Format Type Found")
-            self.setSource(newPath)
+            raise ValueError("Invalid Format Type Found")
+
+        return RenamePlan(self.string, newSource, renamePaths, collisions, twoPhase, replace)
+
+    def apply(self, plan, dryrun=False, progressCB=None, workers=1, journal=False):
+        """
+        Rename the items following a plan from plan_rename
+
+        If some new paths are the old paths of other items, every item is
+        first moved to a unique temporary name and then to its new name, so
+        the renames can run in any order. Renames run in a thread pool and
+        if any of them fails every rename is undone.
+
+        With a journal the renames can be resumed or rolled back from
+        RenameJournal if the process dies before they are done, it's
+        removed once they are.
+
+        Args:
+            plan (RenamePlan): Plan made for this sequence
+            dryrun (bool, optional): Only log the renames
+            progressCB (callable, optional): Called with (completed renames, total renames)
+                Items are renamed twice when the plan needs temporary names
+            workers (int, optional): Number of renames done at once
+            journal (bool or str, optional): Whether to keep a RenameJournal next to the sequence, or its path
+
+        Returns:
+            bool: True if the items were renamed, False if the plan has collisions or it failed and was undone
+
+        Raises:
+            ValueError: if the plan was made for another sequence
+                or a journal of an interrupted rename of the sequence exists, resume or roll it back first
+        """
+        if plan.source != self.string:
+            raise ValueError("Rename plan was made for another sequence: {0}".format(plan.source))
+        if not plan.valid:
+            for newPath in plan.collisions:
+                LOG.error("Error already exists while renaming to {0}".format(newPath))
+            return False
+
+        if dryrun:
+            for oldPath, newPath in plan.renames:
+                LOG.info("Renaming {0} -> {1}".format(os.path.basename(oldPath), os.path.basename(newPath)))
+            return True
+        # Items parked at temporary names by an interrupted rename are only known to its journal
+        journals = RenameJournal.find(os.path.dirname(plan.source) or os.curdir)
+        if journal and journal is not True and os.path.lexists(journal):
+            journals.append(RenameJournal(journal))
+        for interrupted in journals:
+            interrupted.load()
+            if any(self.is_part_of_sequence(entry[0]) or self.is_part_of_sequence(entry[2]) for entry in interrupted.entries):
+                raise ValueError("Sequence has an interrupted rename, resume or roll back its journal first: {0}".format(
+                    interrupted.path))
+
+        renameJournal = None
+        if journal:
+            renameJournal = RenameJournal.for_plan(plan)
+            if journal is not True:
+                renameJournal.path = journal
+        try:
+            _rename_paths(plan.renames, workers=workers, progressCB=progressCB, twoPhase=plan.twoPhase, journal=renameJournal)
+        except OSError, e:
+            LOG.exception(e)
+            return False
+
+        directoryIndex = getattr(self, '_directoryIndex', None)
+        if directoryIndex is not None:
+            directoryIndex.refresh()
+        if self._input_items is not None:
+            self._input_items = [newPath for oldPath, newPath in plan.renames]
+        self.setSource(plan.newSource)
+        return True
 
     def get_string(self, itemNumber, padding=None):
         """
@@ -782,6 +977,114 @@ class AbstractSequence(collections.Mapping):
 
         return True
 
+    def extract_numbers(self, paths, useNumpy=None):
+        """
+        Find which strings are items of this sequence and get their item numbers
+
+        An item matches the sequence string everywhere except the item number,
+        which must be digits with the same padding as the sequence.
+
+        Args:
+            paths (list of str): Strings to check
+            useNumpy (bool, optional): Whether to use the NumPy implementation
+                By default it's used when NumPy is installed and there are
+                at least NUMPY_MIN_ITEMS strings
+
+        Returns:
+            tuple: (member mask, numbers)
+                The mask has a bool for every string and numbers has the
+                item number of every member in order. Both are NumPy arrays
+                when the NumPy implementation is used.
+
+        >> seq = AbstractSequence('apples.012')
+        >> seq.extract_numbers(['apples.001', 'pears.002', 'apples.003'])
+        ([True, False, True], [1, 3])
+        """
+        if not self._parsed:
+            self._parse_values()
+
+        if useNumpy is None:
+            useNumpy = numpy is not None and len(paths) >= NUMPY_MIN_ITEMS
+        elif useNumpy and numpy is None:
+            raise ImportError("NumPy is not installed")
+
+        if useNumpy:
+            result = self._extract_numbers_numpy(paths)
+            if result is not None:
+                return result
+
+        head, tail = self._base_sequence_items
+        start = len(head)
+        end = start + self.padding
+        length = end + len(tail)
+        if tail[:1].isdigit():
+            # Item numbers would run into the suffix and have a different padding
+            return [False] * len(paths), []
+
+        mask = []
+        numbers = []
+        for path in paths:
+            if len(path) == length and path.startswith(head) and path.endswith(tail):
+                num = path[start:end]
+                if num.isdigit():
+                    mask.append(True)
+                    numbers.append(int(num))
+                    continue
+            mask.append(False)
+        return mask, numbers
+
+    def _extract_numbers_numpy(self, paths):
+        """
+        NumPy implementation of extract_numbers
+
+        The strings are laid out as the rows of a byte array and every
+        check is done on whole columns at once.
+
+        Returns:
+            tuple: None if the strings can't be represented as ascii bytes
+        """
+        head, tail = self._base_sequence_items
+        if not isinstance(head, str) or not isinstance(tail, str) or self.padding > 18:
+            # Item numbers longer than 18 digits don't fit in an int64
+            return None
+        start = len(head)
+        end = start + self.padding
+        length = end + len(tail)
+        width = length + 1
+
+        # Every row ends with a null column so longer strings don't match after being truncated
+        try:
+            joined = '\0'.join(paths) + '\0'
+        except UnicodeError:
+            return None
+        if joined.count('\0') != len(paths):
+            # Null characters in the strings would be taken for row ends
+            return None
+        if (isinstance(joined, str) and len(joined) == len(paths) * width and
+                joined[width - 1::width].count('\0') == len(paths)):
+            # All strings have the sequence length, the joined bytes already are the rows
+            chars = numpy.frombuffer(joined, numpy.uint8).reshape(-1, width)
+        else:
+            try:
+                chars = numpy.array(paths, dtype='S{0}'.format(width)).view(numpy.uint8).reshape(-1, width)
+            except UnicodeError:
+                return None
+
+        # Every digit of the item numbers becomes '0', then whole rows are compared at once
+        template = head + '0' * (end - start) + tail + '\0'
+        digits = chars[:, start:end]
+        rows = chars.copy()
+        rows[:, start:end] = _DIGIT_ZERO_TABLE.take(digits)
+        mask = rows.view('S{0}'.format(width)).ravel() == template
+        if tail[:1].isdigit():
+            mask[:] = False
+
+        numbers = numpy.zeros(mask.sum(), numpy.int64)
+        for column in digits[mask].T:
+            numbers *= 10
+            numbers += column - ord('0')
+        return mask, numbers
+
     def get_next_item(self, itemNumber=None):
         """
         Get the next item in the sequence.
@@ -802,15 +1105,14 @@ class AbstractSequence(collections.Mapping):
                 raise ValueError("No item number supplied, and no current item number set")
         else:
             itemNumber = int(itemNumber)
-        nums = self.numbers
-        if itemNumber not in nums:
+        frames = self.items.frames
+        if itemNumber not in frames:
             raise ValueError("Invalid item number, missing item: {0}".format(itemNumber))
-        itemIndex = nums.index(itemNumber)
-        if itemIndex == (len(nums) - 1):
+        nextNumber = frames.after(itemNumber)
+        if nextNumber is None:
             # Already last item in the sequence
             return None
-        return self.get_string(self.items.items()[itemIndex][0] + 1)
-        # return self.items.items()[itemIndex][0] + 1
+        return self.get_string(nextNumber)
 
     def get_previous_item(self, itemNumber=None):
         """
@@ -832,22 +1134,24 @@ class AbstractSequence(collections.Mapping):
                 raise ValueError("No item number supplied, and no current item number set")
         else:
             itemNumber = int(itemNumber)
-        nums = self.numbers
-        if itemNumber not in nums:
+        frames = self.items.frames
+        if itemNumber not in frames:
             raise ValueError("Invalid item number, missing item: {0}".format(itemNumber))
-        itemIndex = nums.index(itemNumber)
-        if itemIndex == 0:
+        previousNumber = frames.before(itemNumber)
+        if previousNumber is None:
             # Already first item in the sequence
             return None
-        return self.get_string(self.items.items()[itemIndex][0] - 1)
-        # return self.items[itemIndex - 1]
+        return self.get_string(previousNumber)
 
     def refresh(self):
         """
         Refresh the list of sequence items
         Not implemented in base class
+
+        Returns:
+            tuple: (FrameSet of added item numbers, FrameSet of removed item numbers)
         """
-        pass
+        return FrameSet(), FrameSet()
 
     def validate(self):
         """
@@ -898,11 +1202,9 @@ class AbstractSequence(collections.Mapping):
         self._ext = None
         self._prefix = None
         self._suffix = None
-        self._range = None
 
         if not match:
             match, groups, formatType = self.validate_path(self.string)
-        self._matches.append(match)
         self._primary_match = match
         self._format_type = formatType
 
@@ -913,7 +1215,7 @@ class AbstractSequence(collections.Mapping):
         self._padding = self._parse_padding_from_match(match, self._format_type)
 
         # Used to build all other formats
-        self._base_sequence_items = [self.string[:match.start('sequence')], self.string[match.end('sequence'):]]
+        self._base_sequence_items = (self.string[:match.start('sequence')], self.string[match.end('sequence'):])
 
         self._parsed = True
 
@@ -921,15 +1223,12 @@ class AbstractSequence(collections.Mapping):
         """
         Based on the type of string supplied, get the level of padding the sequence contains
         """
-        matchGrps = match.groupdict()
+        if formatType in ('nums', 'pounds'):
+            return match.end(formatType) - match.start(formatType)
 
-        if formatType == 'nums':
-            return len(matchGrps['nums'])
-
-        elif formatType == 'pounds':
-            return len(matchGrps['pounds'])
+        matchGrps = match.groupdict()
 
-        elif formatType == 'dollar':
+        if formatType == 'dollar':
             match = matchGrps['dollar'].lstrip('$F')
             return int(match)
 
@@ -964,6 +1263,8 @@ class AbstractSequence(collections.Mapping):
         result = {}
         for item in self._input_items:
             num = self.num(item)
+            if num is None:
+                continue
             result[num] = item
 
         # Add the initial item
@@ -1033,15 +1334,16 @@ class BaseSequence(AbstractSequence, collections.MutableMapping):
         allowNegative (bool): Whether to allow negative item numbers
 
     """
+    __slots__ = ()
 
     def __delitem__(self, index):
         if isinstance(index, slice):
             start, end, step = self._parse_slice_indices(index)
             for x in range(start, end+1, step):
-                if x in self.items.keys():
+                if x in self.items:
                     del self.items[x]
         else:
-            if index in self.items.keys():
+            if index in self.items:
                 del self.items[index]
 
     def __setitem__(self, index, value):
@@ -1050,25 +1352,24 @@ class BaseSequence(AbstractSequence, collections.MutableMapping):
         if self.num(value) != index:
             raise ValueError("Can't assign sequence to index of different value than the item number")
 
-        updated = False
-
-        for key in self.items.keys():
-            if index == key:
-                self.items[key] = value
-                updated = True
-                break
-
-        items = self.items.items()
-        if not updated:
-            items.append((index, value))
-
-        self._sequence_items = collections.OrderedDict(sorted(items, key=lambda i: i[0]))
+        self.items[index] = value
 
 
 class FileSequence(AbstractSequence):
     regex = DEFAULT_FILE_SEQUENCE_PATTERN
+    # Only hold item numbers and generate paths on access
+    templateItems = True
+
+    __slots__ = (
+        '_sourcePath',
+        '_sourceFile',
+        '_directoryIndex',
+        '_folderStamp',
+        '_frameStats',
+        'validateExists',
+    )
 
-    def __init__(self, path, items=None, skipValidate=False, allowNegative=False, validateExists=True, fileInstance=None, normalizeInput=True):
+    def __init__(self, path, items=None, skipValidate=False, allowNegative=False, validateExists=True, fileInstance=None, normalizeInput=True, directoryIndex=None):
         """
         File Sequence
 
@@ -1113,19 +1414,173 @@ class FileSequence(AbstractSequence):
                 These items must be in the numbers format
             skipValidate (bool): Whether to skip validation on init
             allowNegative (bool): Whether to allow negative item numbers
+            directoryIndex (DirectoryIndex, optional): Shared listing of the sequence folder
+                Items are looked up in the index instead of scanning the folder
 
         """
         if normalizeInput:
             path = path_normalize(path)
         self._sourcePath = path
         self._sourceFile = fileInstance
+        self._directoryIndex = directoryIndex
         self.validateExists = validateExists
         # path = path_normalize(os.path.abspath(path))
         super(FileSequence, self).__init__(self._sourcePath, items=items, skipValidate=skipValidate, allowNegative=allowNegative)
 
+    def _new_sequence_items(self):
+        if self.templateItems:
+            return TemplateFrameMap(self.get_path, bulkTemplate=self.paths_for)
+        return super(FileSequence, self)._new_sequence_items()
+
+    def _clearProperties(self):
+        super(FileSequence, self)._clearProperties()
+        # Folder times of the last scan, see refresh
+        self._folderStamp = None
+        # (item numbers, sizes, modification times) of the items, see frameSizes
+        self._frameStats = None
+
     def reload(self):
         self._clearProperties()
 
+    def refresh(self):
+        """
+        Update the items in place from the files on disk
+
+        The sequence folder is only scanned again when its modification or
+        change time differs from the last scan, so refreshing an unchanged
+        sequence costs a single stat.
+
+        Returns:
+            tuple: (FrameSet of added item numbers, FrameSet of removed item numbers)
+        """
+        items = self.items
+        if self.isInPerforce(self.sourcePath):
+            newItems = self._build_sequence_items_from_perforce()
+        else:
+            stamp = self._get_folder_stamp()
+            if stamp is None:
+                # Folder was removed
+                self._folderStamp = None
+                newItems = {}
+            elif stamp == self._folderStamp:
+                return FrameSet(), FrameSet()
+            else:
+                newItems = self._scan_sequence_items(stamp)
+
+        frames = items.frames
+        newFrames = FrameSet(newItems)
+        added = newFrames - frames
+        removed = frames - newFrames
+        for number in removed:
+            del items[number]
+        items.update(dict((n, newItems[n]) for n in added))
+        return added, removed
+
+    def aload(self, callback=None):
+        """
+        Load the items in the shared thread pool without blocking the caller
+
+        The sequence shouldn't be used until the result is ready.
+
+        Args:
+            callback (callable, optional): Called with this sequence once loaded, from a pool thread
+
+        Returns:
+            PendingResult: its value is this sequence
+        """
+        return _run_async(_load_sequence, (self,), callback=callback)
+
+    def copy_to(self, destination, workers=TRANSFER_WORKERS, progressCB=None, replace=False, hardlink=False):
+        """
+        Copy the items to a new sequence
+
+        Files are copied by the kernel where possible, see utils.copy_file,
+        and keep their permissions and modification times. The free space
+        of the destination is checked before anything is copied.
+
+        Args:
+            destination (str): Sequence string of the copies, or a folder to copy the items into with their names
+                Items keep their numbers, with the padding of the destination
+            workers (int, optional): Number of items copied at once
+            progressCB (callable, optional): Called with (completed items, total items)
+            replace (bool, optional): Whether to replace existing files
+            hardlink (bool, optional): Whether to hardlink the items instead when the destination is on the same filesystem
+                Hardlinked items share their contents with the source items
+
+        Returns:
+            FileSequence: Sequence of the copies, built without scanning the destination
+
+        Raises:
+            OSError: if the destination exists and replace is False, there isn't enough free space or a copy fails
+                Items copied before the error are kept
+        """
+        return self._transfer_to(destination, 'copy', workers, progressCB, replace, hardlink=hardlink)
+
+    def link_to(self, destination, workers=TRANSFER_WORKERS, progressCB=None, replace=False):
+        """
+        Hardlink the items to a new sequence on the same filesystem
+
+        Takes the same arguments as copy_to.
+
+        Returns:
+            FileSequence
+        """
+        return self._transfer_to(destination, 'link', workers, progressCB, replace)
+
+    def symlink_to(self, destination, workers=TRANSFER_WORKERS, progressCB=None, replace=False):
+        """
+        Symlink the items to a new sequence, links point to the absolute item paths
+
+        Takes the same arguments as copy_to.
+
+        Returns:
+            FileSequence
+        """
+        return self._transfer_to(destination, 'symlink', workers, progressCB, replace)
+
+    def _transfer_to(self, destination, method, workers, progressCB, replace, hardlink=False):
+        # Destination paths from the destination sequence or folder
+        items = sorted(self.items.iteritems())
+        destination = path_normalize(destination)
+        if destination.endswith('/') or os.path.isdir(destination):
+            folder = destination.rstrip('/') or '/'
+            newPaths = [join_paths(folder, os.path.basename(path)) for number, path in items]
+        else:
+            folder = os.path.dirname(destination)
+            template = self.__class__(destination, validateExists=False)
+            newPaths = list(template.paths_for([number for number, path in items]))
+        transfers = [(path, newPath) for (number, path), newPath in izip(items, newPaths)]
+
+        # Relative sequences in the current folder have no folder
+        folder = folder or os.curdir
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        if not replace:
+            files, folders = _list_folder(folder)
+            existing = set(os.path.basename(p) for p in files) | set(os.path.basename(p) for p in folders)
+            for oldPath, newPath in transfers:
+                if os.path.basename(newPath) in existing:
+                    raise OSError(errno.EEXIST, "Sequence item already exists", newPath)
+
+        stats = self._frameStats
+        if method == 'copy':
+            if hardlink and os.stat(self.folder or os.curdir).st_dev == os.stat(folder).st_dev:
+                method = 'link'
+            else:
+                stats = self._load_item_stats()
+                required = sum(size for size in stats[1] if size > 0)
+                available = _get_free_space(folder)
+                if available is not None and required > available:
+                    raise OSError(errno.ENOSPC, "Sequence needs {0} bytes, {1} are free".format(required, available), folder)
+
+        _transfer_paths(transfers, method, workers=workers, progressCB=progressCB, replace=replace)
+
+        result = self.__class__(newPaths[0] if newPaths else destination, items=newPaths, validateExists=False)
+        # Copies and links have the stats of the items
+        if stats is not None and stats[0] == self.items.frames:
+            result._frameStats = stats
+        return result
+
     def setSource(self, path, fileInstance=None):
         self._sourcePath = path_normalize(path)
         self._sourceFile = fileInstance
@@ -1157,7 +1612,7 @@ class FileSequence(AbstractSequence):
         if not isinstance(path, basestring):
             raise TypeError("Input sequence must be a string, got {0}".format(type(path)))
 
-        match = cls.regex.search(path)
+        match = cls._match_path(path)
         REGEX_COUNTER += 1      # Profiling
 
         if not match:
@@ -1165,14 +1620,22 @@ class FileSequence(AbstractSequence):
 
         groups = match.groupdict()
 
-        format_type = None
-        for key in groups:
-            if key in cls.sequenceFormatTypes and groups[key]:
-                if key == 'formatstring':
-                    formatKey = groups[key][1:].split(':')[0]
-                    if formatKey != cls.formatStringKey:
-                        raise ValueError("Wrong format key for sequence: {0}".format(groups[key]))
-                format_type = key
+        format_type = getattr(match, 'formatType', None)
+        if format_type is not None:
+            if format_type not in cls.sequenceFormatTypes:
+                format_type = None
+            elif format_type == 'formatstring':
+                formatKey = groups[format_type][1:].split(':')[0]
+                if formatKey != cls.formatStringKey:
+                    raise ValueError("Wrong format key for sequence: {0}".format(groups[format_type]))
+        else:
+            for key in groups:
+                if key in cls.sequenceFormatTypes and groups[key]:
+                    if key == 'formatstring':
+                        formatKey = groups[key][1:].split(':')[0]
+                        if formatKey != cls.formatStringKey:
+                            raise ValueError("Wrong format key for sequence: {0}".format(groups[key]))
+                    format_type = key
         if format_type is None:
             raise ValueError("Invalid sequence, no valid format type matched")
 
@@ -1182,6 +1645,37 @@ class FileSequence(AbstractSequence):
 
         return match, groups, format_type
 
+    @classmethod
+    def _match_path(cls, path):
+        """
+        Match the path against the sequence pattern
+
+        Paths of a sequence that was already parsed only differ in their
+        item number, they reuse the parsed template from TEMPLATE_CACHE.
+        """
+        if cls.regex is not DEFAULT_FILE_SEQUENCE_PATTERN:
+            return cls.regex.search(path)
+
+        if isinstance(path, str):
+            marked = path.translate(_DIGIT_RUN_TABLE)
+            end = marked.rfind('0') + 1
+            start = marked.rfind('-', 0, end) + 1
+        else:
+            start, end = _get_last_digits_span(path)
+        if not end:
+            return match_file_sequence(path)
+
+        key = (cls, path[:start], end - start, path[end:])
+        extStart = TEMPLATE_CACHE.get(key)
+        if extStart is not None:
+            return SequenceMatch(path, start - 1, end, 'nums', extStart)
+
+        match = match_file_sequence(path)
+        # Only cache paths whose item number is the last digits, other paths would never share a key
+        if isinstance(match, SequenceMatch) and match.formatType == 'nums' and match.span('sequence') == (start, end):
+            TEMPLATE_CACHE.set(key, match.start('ext'))
+        return match
+
     @classmethod
     def from_fileInstance(cls, instance, items=None, skipValidate=False, validateExists=True, allowNegative=False, p4=None, clientData=None):
         result = cls(instance.path, items=items, skipValidate=skipValidate, allowNegative=allowNegative, validateExists=validateExists, fileInstance=instance)
@@ -1210,6 +1704,10 @@ class FileSequence(AbstractSequence):
         result._parse_values(match, groups, formatType)
         return result
 
+    @property
+    def directoryIndex(self):
+        return self._directoryIndex
+
     @property
     def sourceFile(self):
         if self._sourceFile is None:
@@ -1238,13 +1736,15 @@ class FileSequence(AbstractSequence):
     # Last
     @property
     def lastFile(self):
-        if not self.files:
+        if not self.items:
             return self.sourceFile
-        return self.files[-1]
+        return fileStructure.FilestructurePath.from_path(self.lastPath)
 
     @property
     def lastPath(self):
-        return self.lastFile.path
+        if not self.items:
+            return self.sourcePath
+        return self.lastItem
 
     @property
     def lastLocalPath(self):
@@ -1258,15 +1758,15 @@ class FileSequence(AbstractSequence):
     # First
     @property
     def firstFile(self):
-        if not self.files:
+        if not self.items:
             return self.sourceFile
-        return self.files[0]
+        return fileStructure.FilestructurePath.from_path(self.firstPath)
 
     @property
     def firstPath(self):
-        if not self.paths:
+        if not self.items:
             return self.sourcePath
-        return self.paths[0]
+        return self.firstItem
 
     @property
     def firstLocalPath(self):
@@ -1280,15 +1780,15 @@ class FileSequence(AbstractSequence):
     # Middle
     @property
     def middleFile(self):
-        if not self.files:
+        if not self.items:
             return self.sourceFile
-        return self.files[len(self.files) / 2]
+        return fileStructure.FilestructurePath.from_path(self.middlePath)
 
     @property
     def middlePath(self):
-        if not self.paths:
+        if not self.items:
             return self.sourcePath
-        return self.paths[len(self.paths) / 2]
+        return self.midItem
 
     @property
     def middleLocalPath(self):
@@ -1309,7 +1809,7 @@ class FileSequence(AbstractSequence):
         """
         if not self._built:
             self._loadSequenceItems()
-        result = [fileStructure.FilestructurePath.from_path(s[1]) for s in self._sequence_items.items()]
+        result = [fileStructure.FilestructurePath.from_path(s) for s in self._sequence_items.itervalues()]
         return result
 
     @property
@@ -1322,7 +1822,7 @@ class FileSequence(AbstractSequence):
         """
         if not self._built:
             self._loadSequenceItems()
-        result = [s[1] for s in self._sequence_items.items()]
+        result = self._sequence_items.values()
         return result
 
     @property
@@ -1335,20 +1835,20 @@ class FileSequence(AbstractSequence):
         """
         if not self._built:
             self._loadSequenceItems()
-        result = [fileStructure.FilestructurePath.from_path(s[1]).local_path for s in self._sequence_items.items()]
+        result = [fileStructure.FilestructurePath.from_path(s).local_path for s in self._sequence_items.itervalues()]
         return result
 
     @property
     def numbers(self):
         """
-        List of files in the sequence
+        List of item numbers in the sequence
 
         Returns:
-            list of str: paths
+            list of int
         """
         if not self._built:
             self._loadSequenceItems()
-        result = [self.num(s[1]) for s in self._sequence_items.items()]
+        result = self._sequence_items.frames.numbers.tolist()
         return result
 
     def get_file(self, number, padding=None):
@@ -1379,55 +1879,195 @@ class FileSequence(AbstractSequence):
         result = template.format(**{self.formatStringKey: number})
         return result
 
-    def isInPerforce(self, file):
-        if not P4:
-            return False
-        if isinstance(file, fileStructure.PerforcePath):
-            # Checking is tracked prevents finding files for sequences when the source path isn't tracked
-            # I.e. if frame 1 is provided but only 101-105 exist, 101-105 should still be found or vice versa
-            return True
-        else:
-            return False
-
-    def _parse_values(self, match=None, groups=None, formatType=None):
+    def paths_for(self, numbers, padding=None):
         """
-        Process the input string through the sequence regex
-        and parse all the base sequence information out of it
+        Generate the paths for many item numbers
+
+        Faster than calling get_path for each number, the padded number is
+        built from a cached string per hundred items.
+
+        Args:
+            numbers (iterable of int): Item numbers
+            padding (int, optional): Custom padding level to use
+                If not supplied, uses the padding from the input sequence
+
+        Returns:
+            generator of str
         """
-        global REGEX_COUNTER    # Profiling
+        if not self._parsed:
+            self._parse_values()
+        if padding is None:
+            padding = self.padding
+        head, tail = self._base_sequence_items
+        return _iter_padded_strings(head, tail, int(padding), numbers)
 
-        # Clear cached properties
-        self._ext = None
-        self._prefix = None
-        self._suffix = None
-        self._range = None
+    @property
+    def frameSizes(self):
+        """
+        Size in bytes of every item in item number order
 
-        if not match:
-            match, groups, formatType = self.validate_path(self.string, validateExists=self.validateExists)
-        self._matches.append(match)
-        self._primary_match = match
-        self._format_type = formatType
+        Sizes and modification times come from the scan when the listing
+        includes them, otherwise every item is stat'd once on first access.
+        They are kept until the items change, refresh or reload to update them.
+        Items that no longer exist have a size of -1.
 
-        self._current_item = groups['sequence']
-        if self._format_type == 'nums':
-            self._current_item_number = int(self._current_item)
+        Returns:
+            array
+        """
+        return self._load_item_stats()[1]
 
-        self._padding = self._parse_padding_from_match(match, self._format_type)
+    @property
+    def frameMtimes(self):
+        """
+        Modification time of every item in item number order, 0 for items that no longer exist
 
-        # Used to build all other formats
-        self._base_sequence_items = [self.string[:match.start('sequence')], self.string[match.end('sequence'):]]
+        Returns:
+            array of float
+        """
+        return self._load_item_stats()[2]
 
-        self._parsed = True
+    @property
+    def totalSize(self):
+        """
+        Size in bytes of all the items
 
-    def _loadSequenceItems(self):
+        Returns:
+            int
         """
-        List of all items in the current sequence
+        return int(sum(size for size in self.frameSizes if size > 0))
 
-        Args:
-            value (list of str): List of sequence items
+    @property
+    def newestMtime(self):
+        """
+        Latest modification time of the items, None if there are none
 
         Returns:
-            dict: keys are #'s and values are the items
+            float
+        """
+        mtimes = self.frameMtimes
+        return max(mtimes) if mtimes else None
+
+    @property
+    def oldestMtime(self):
+        """
+        Earliest modification time of the existing items, None if there are none
+
+        Returns:
+            float
+        """
+        mtimes = [mtime for size, mtime in izip(self.frameSizes, self.frameMtimes) if size >= 0]
+        return min(mtimes) if mtimes else None
+
+    def get_empty_numbers(self):
+        """
+        Item numbers of the zero byte items
+
+        Returns:
+            list of int
+        """
+        numbers, sizes, mtimes = self._load_item_stats()
+        return [number for number, size in izip(numbers, sizes) if size == 0]
+
+    def get_truncated_numbers(self, ratio=0.5):
+        """
+        Item numbers of the items much smaller than the others
+
+        Args:
+            ratio (float, optional): Items smaller than this ratio of the median item size are truncated
+
+        Returns:
+            list of int: Includes the zero byte items and the items that no longer exist
+        """
+        numbers, sizes, mtimes = self._load_item_stats()
+        existing = sorted(size for size in sizes if size >= 0)
+        if not existing:
+            return list(numbers)
+        threshold = existing[len(existing) // 2] * ratio
+        return [number for number, size in izip(numbers, sizes) if size < threshold or size <= 0]
+
+    def _load_item_stats(self):
+        frames = self.items.frames
+        if self._frameStats is None or not self._frameStats[0] == frames:
+            self._frameStats = self._get_item_stats(self.items.iteritems(), {})
+        return self._frameStats
+
+    def _get_item_stats(self, items, stats):
+        """
+        Sizes and modification times of items
+
+        Args:
+            items (iterable of tuple): (item number, path) in item number order
+            stats (dict): (size, mtime) of paths that don't need to be stat'd
+
+        Returns:
+            tuple: (FrameSet of item numbers, array of sizes, array of mtimes)
+        """
+        global SYSCALL_COUNTER  # Profiling
+
+        numbers = []
+        sizes = array(_SIZE_TYPECODE)
+        mtimes = array('d')
+        for number, path in items:
+            stat = stats.get(path)
+            if stat is None:
+                SYSCALL_COUNTER += 1    # Profiling
+                try:
+                    result = os.stat(path)
+                    stat = (result.st_size, result.st_mtime)
+                except OSError:
+                    stat = (-1, 0.0)
+            numbers.append(number)
+            sizes.append(stat[0])
+            mtimes.append(stat[1])
+        return FrameSet(numbers), sizes, mtimes
+
+    def isInPerforce(self, file):
+        if not P4:
+            return False
+        if isinstance(file, fileStructure.PerforcePath):
+            # Checking is tracked prevents finding files for sequences when the source path isn't tracked
+            # I.e. if frame 1 is provided but only 101-105 exist, 101-105 should still be found or vice versa
+            return True
+        else:
+            return False
+
+    def _parse_values(self, match=None, groups=None, formatType=None):
+        """
+        Process the input string through the sequence regex
+        and parse all the base sequence information out of it
+        """
+        global REGEX_COUNTER    # Profiling
+
+        # Clear cached properties
+        self._ext = None
+        self._prefix = None
+        self._suffix = None
+
+        if not match:
+            match, groups, formatType = self.validate_path(self.string, validateExists=self.validateExists)
+        self._primary_match = match
+        self._format_type = formatType
+
+        self._current_item = groups['sequence']
+        if self._format_type == 'nums':
+            self._current_item_number = int(self._current_item)
+
+        self._padding = self._parse_padding_from_match(match, self._format_type)
+
+        # Used to build all other formats
+        self._base_sequence_items = (self.string[:match.start('sequence')], self.string[match.end('sequence'):])
+
+        self._parsed = True
+
+    def _loadSequenceItems(self):
+        """
+        List of all items in the current sequence
+
+        Args:
+            value (list of str): List of sequence items
+
+        Returns:
+            dict: keys are #'s and values are the items
                 Ex:
                     {
                         10: 'path/to/aaa010.0010.png',
@@ -1436,6 +2076,8 @@ class FileSequence(AbstractSequence):
         """
         if not self._parsed:
             self._parse_values()
+        if self._sequence_items is None:
+            self._sequence_items = self._new_sequence_items()
         if not self._built:
             if self._input_items is not None:
                 items = self._build_sequence_items_from_input()
@@ -1446,7 +2088,7 @@ class FileSequence(AbstractSequence):
             else:
                 items = self._build_sequence_items_from_disk()
                 self._built = True
-            self._sequence_items.update(sorted(items.items(), key=lambda i: i[0]))
+            self._sequence_items.update(items)
         return self._sequence_items
 
     @property
@@ -1500,11 +2142,7 @@ class FileSequence(AbstractSequence):
                         '10': 'aaa010.0010.png',
                     }
         """
-        result = {}
-        for path in self._input_items:
-            if self.is_part_of_sequence(path):
-                num = self.num(path)
-                result[num] = path
+        result = self._get_items_from_paths(self._input_items)
 
         # Add the initial item
         if self.is_part_of_sequence(self.sourcePath):
@@ -1522,43 +2160,78 @@ class FileSequence(AbstractSequence):
                         '10': 'path/to/aaa010.0010.png',
                     }
         """
-        global REGEX_COUNTER    # Profiling
-        global SYSCALL_COUNTER  # Profiling
+        if self._directoryIndex is not None:
+            return self._build_sequence_items_from_index()
+        return self._scan_sequence_items(self._get_folder_stamp())
 
-        result = {}
-        folderPath = self.folder
+    def _scan_sequence_items(self, stamp):
+        """
+        Scan the sequence folder for items
 
-        SYSCALL_COUNTER += 1    # Profiling
+        Args:
+            stamp (tuple): Folder times taken before the scan, see _get_folder_stamp
+                The folder is scanned again on the next refresh if None
+
+        Returns:
+            dict: keys are item numbers and values are paths
+        """
+        # A folder modified right before the scan may change again without a new time
+        if stamp is None or time.time() - stamp[0] < FOLDER_STAMP_RESOLUTION:
+            self._folderStamp = None
+        else:
+            self._folderStamp = stamp
+
+        stats = {} if SCAN_STATS else None
+        items = self._get_items_from_paths(_list_files(self.folder, stamp, stats))
+        self._frameStats = None
+        if stats:
+            self._frameStats = self._get_item_stats(sorted(items.iteritems()), stats)
+        return items
+
+    def _get_folder_stamp(self):
+        """
+        Modification and change time of the sequence folder
+
+        Returns:
+            tuple: (mtime, ctime) or None if the folder doesn't exist
+        """
+        global SYSCALL_COUNTER  # Profiling
 
         SYSCALL_COUNTER += 1    # Profiling
-        start = self._primary_match.start('sequence')
-        end = start + self.padding
-        for dirEntry in scandir.scandir(folderPath):
-            dirEntryPath = join_paths(folderPath, dirEntry.name)
-            if not dirEntry.is_file():
-                continue
+        try:
+            stat = os.stat(self.folder)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_ctime
 
-            if not self.is_part_of_sequence(dirEntryPath):
-                continue
+    def _get_items_from_paths(self, paths):
+        """
+        Sequence items found in a list of paths
 
-            # If we've got this far, we know that this sequence item matches
-            # the format of our input sequence exactly.
-            # So we can use the match start and end of our primary match
-            # to extract the number from this path
-            if end > len(dirEntryPath):
-                continue
-            num = dirEntryPath[start:end]
-            if not num.isdigit():
-                # Not a digit in the same spot so not part of sequence
-                continue
-            if dirEntryPath[start:end+1].isdigit():
-                # Extra numbers found, has different padding, not part of sequence
-                continue
-            num = int(num)
+        Returns:
+            dict: keys are item numbers and values are paths
+        """
+        mask, numbers = self.extract_numbers(paths)
+        if numpy is not None and isinstance(numbers, numpy.ndarray):
+            numbers = numbers.tolist()
+        return dict(izip(numbers, compress(paths, mask)))
 
-            path = self.get_path(num)
-            result[num] = path
-        return result
+    def _build_sequence_items_from_index(self):
+        """
+        Build disk items from the shared directory index of the sequence folder
+
+        Returns:
+            dict: sequence items
+                Ex:
+                    {
+                        '10': 'path/to/aaa010.0010.png',
+                    }
+        """
+        if self._directoryIndex.folder != self.folder:
+            raise ValueError("Directory index does not match sequence folder: {0}".format(self._directoryIndex.folder))
+        # The sequence string may hold a format like %05d, the paths have the padding instead
+        head, tail = self._base_sequence_items
+        return self._directoryIndex.get_items(self.prefix, self.suffix, len(head) + self.padding + len(tail))
 
     def _build_sequence_items_from_perforce(self):
         """
@@ -1623,6 +2296,8 @@ class ImageSequence(FileSequence):
     imageExtensions = IMAGE_EXTENSIONS
     formatStringKey = 'frame'
 
+    __slots__ = ()
+
     @classmethod
     def validate_path(cls, path, validateExists=True):
         """
@@ -1640,22 +2315,1233 @@ class ImageSequence(FileSequence):
         return match, groups, format_type
 
 
-def scan_for_files(path, recursive=False, groupFolders=False, _result=None):
+class DirectoryIndex(object):
+    """
+    Directory Index
+
+    Single listing of a folder shared between all the sequences inside it.
+    The folder is scanned once and every file is bucketed by the
+    (prefix, suffix, length) key of each item number in its name, so building
+    another sequence from the same folder is a dictionary lookup.
+
+    Args:
+        folder (str): Path to the folder to index
+    """
+
+    def __init__(self, folder):
+        folder = path_normalize(folder)
+        if len(folder) > 1:
+            folder = folder.rstrip('/')
+        self._folder = folder
+        self._paths = None
+        self._buckets = None
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __contains__(self, path):
+        return path in self.paths
+
+    @property
+    def folder(self):
+        return self._folder
+
+    @property
+    def paths(self):
+        """
+        List of all file paths in the folder
+
+        Returns:
+            list of str
+        """
+        if self._paths is None:
+            self._build_index()
+        return self._paths
+
+    @property
+    def buckets(self):
+        """
+        File paths grouped by sequence key
+
+        Returns:
+            dict: keys are (prefix, suffix, length) and values are dicts of item numbers to paths
+                Ex:
+                    {
+                        ('path/to/aaa010', '.png', 24): {10: 'path/to/aaa010.0010.png'},
+                    }
+        """
+        if self._buckets is None:
+            self._build_index()
+        return self._buckets
+
+    def refresh(self):
+        """
+        Discard the current listing, the folder is scanned again on next access
+        """
+        self._paths = None
+        self._buckets = None
+
+    def get_items(self, prefix, suffix, length):
+        """
+        Items of the sequence with the given key
+
+        Args:
+            prefix (str): Sequence prefix, without the period before the item number
+            suffix (str): Sequence suffix
+            length (int): Length of every path in the sequence
+
+        Returns:
+            dict: keys are item numbers and values are paths
+        """
+        return self.buckets.get((prefix, suffix, length), {})
+
+    @classmethod
+    def from_paths(cls, folder, paths):
+        """
+        Index a folder from an existing listing of its files instead of scanning it
+
+        Args:
+            folder (str): Path to the folder
+            paths (list of str): Paths of every file in the folder
+        """
+        result = cls(folder)
+        result._index_paths(list(paths))
+        return result
+
+    def _build_index(self):
+        self._index_paths(_list_files(self._folder))
+
+    def _index_paths(self, paths):
+        buckets = {}
+        for path in paths:
+            length = len(path)
+            # A name like 'a.0001.0010.png' could belong to either sequence
+            for match in FILE_NUMBER_PATTERN.finditer(path, path.rfind('/') + 1):
+                start, end = match.span(1)
+                key = (path[:start - 1], path[end:], length)
+                buckets.setdefault(key, {})[int(path[start:end])] = path
+
+        self._paths = paths
+        self._buckets = buckets
+
+
+def _iter_padded_strings(head, tail, padding, numbers):
+    """
+    Generate head + zero padded number + tail for each number
+
+    The last two digits and the tail are cached for every value, so only one
+    string format is needed per hundred consecutive numbers.
+    """
+    template = head.replace('%', '%%') + '%0{0}d'.format(padding) + tail.replace('%', '%%')
+    if padding < 3:
+        for number in numbers:
+            yield template % number
+        return
+
+    blockTemplate = head.replace('%', '%%') + '%0{0}d'.format(padding - 2)
+    tails = ['%02d' % i + tail for i in xrange(100)]
+    lastBlock = None
+    blockHead = None
+    for number in numbers:
+        if number < 0:
+            yield template % number
+            continue
+        block = number // 100
+        if block != lastBlock:
+            blockHead = blockTemplate % block
+            lastBlock = block
+        yield blockHead + tails[number - block * 100]
+
+
+class ListingCache(object):
+    """
+    Listing Cache
+
+    Folder listings persisted in a SQLite database shared between processes.
+    A stored listing is used as long as the modification and change time of
+    its folder are unchanged, so revalidating a folder costs a single stat.
+    Folders modified less than FOLDER_STAMP_RESOLUTION seconds before they
+    are listed are not stored.
+
+    Lookups are counted in `hits` and `misses`.
+
+    Args:
+        path (str): Path to the database file, created if it doesn't exist
+        timeout (float, optional): Seconds to wait for another process writing to the database
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self._path = path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        # Names are stored as bytes so any file name round trips
+        self._connection.text_factory = str
+        with self._lock:
+            try:
+                self._connection.execute('PRAGMA journal_mode=WAL')
+            except sqlite3.DatabaseError:
+                pass
+            with self._connection:
+                self._connection.execute(
+                    'CREATE TABLE IF NOT EXISTS listings ('
+                    'folder TEXT PRIMARY KEY, mtime REAL, ctime REAL, files TEXT, folders TEXT)'
+                )
+
+    @property
+    def path(self):
+        return self._path
+
+    def get_listing(self, folder, stamp=None, fileFilter=None, folderFilter=None):
+        """
+        Files and folders directly under a folder, scanning it only if it changed
+
+        Args:
+            folder (str): Path to the folder
+            stamp (tuple, optional): (mtime, ctime) of the folder if it was already stat'd
+            fileFilter (callable, optional): Only files with a name it matches are returned, see compile_filter
+            folderFilter (callable, optional): Only folders with a name it matches are returned
+
+        Returns:
+            tuple: (file paths, folder paths)
+
+        Raises:
+            OSError: if the folder can't be listed
+        """
+        global SYSCALL_COUNTER  # Profiling
+
+        if stamp is None:
+            SYSCALL_COUNTER += 1    # Profiling
+            stat = os.stat(folder)
+            stamp = (stat.st_mtime, stat.st_ctime)
+        key = os.path.abspath(folder)
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+
+        row = None
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    'SELECT mtime, ctime, files, folders FROM listings WHERE folder = ?', (key,)).fetchone()
+        except sqlite3.Error, e:
+            LOG.warning("Couldn't read listing cache {0}: {1}".format(self._path, e))
+
+        if row is not None and (row[0], row[1]) == stamp:
+            self.hits += 1
+            files, folders = row[2], row[3]
+            if isinstance(folder, unicode):
+                files, folders = files.decode('utf-8'), folders.decode('utf-8')
+            # Names can't contain a slash so they are stored joined by one
+            return (
+                [join_paths(folder, name) for name in files.split('/') if name and (fileFilter is None or fileFilter(name))],
+                [join_paths(folder, name) for name in folders.split('/') if name and (folderFilter is None or folderFilter(name))],
+            )
+
+        self.misses += 1
+        files, folders = _read_folder(folder)
+        offset = len(join_paths(folder, ''))
+        if time.time() - stamp[0] >= FOLDER_STAMP_RESOLUTION:
+            fileNames = '/'.join(p[offset:] for p in files)
+            folderNames = '/'.join(p[offset:] for p in folders)
+            if isinstance(folder, unicode):
+                fileNames, folderNames = fileNames.encode('utf-8'), folderNames.encode('utf-8')
+            try:
+                with self._lock:
+                    with self._connection:
+                        self._connection.execute(
+                            'INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?)',
+                            (key, stamp[0], stamp[1], fileNames, folderNames))
+            except sqlite3.Error, e:
+                LOG.warning("Couldn't write listing cache {0}: {1}".format(self._path, e))
+        # The whole listing is stored, filters only apply to the result
+        if fileFilter is not None:
+            files = [p for p in files if fileFilter(p[offset:])]
+        if folderFilter is not None:
+            folders = [p for p in folders if folderFilter(p[offset:])]
+        return files, folders
+
+    def clear(self):
+        """
+        Remove all stored listings and reset the counters
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.execute('DELETE FROM listings')
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def set_listing_cache(cache):
+    """
+    Use a listing cache for every folder scan
+
+    Args:
+        cache (ListingCache or str): Cache or path to its database file
+            None stops using a cache
+
+    Returns:
+        ListingCache: the cache now in use
+    """
+    global LISTING_CACHE
+    if isinstance(cache, basestring):
+        cache = ListingCache(cache)
+    LISTING_CACHE = cache
+    return cache
+
+
+class RenamePlan(object):
+    """
+    Rename Plan
+
+    Every rename giving the items of a sequence a new padding or start frame,
+    planned before anything is renamed. See AbstractSequence.plan_rename.
+
+    Args:
+        source (str): Sequence string the plan was made for
+        newSource (str): Sequence string once renamed
+        renames (list of tuple): (old path, new path) of every item
+        collisions (list of str): New paths that already exist and aren't items of the sequence
+        twoPhase (bool): Whether some new paths are old paths of other items
+        replace (bool): Whether existing files are replaced by the new paths
+    """
+
+    __slots__ = ('source', 'newSource', 'renames', 'collisions', 'twoPhase', 'replace')
+
+    def __init__(self, source, newSource, renames, collisions, twoPhase, replace=False):
+        self.source = source
+        self.newSource = newSource
+        self.renames = renames
+        self.collisions = collisions
+        self.twoPhase = twoPhase
+        self.replace = replace
+
+    def __len__(self):
+        return len(self.renames)
+
+    def __repr__(self):
+        return '{0}({1!r} -> {2!r}, {3} renames, {4} collisions)'.format(
+            self.__class__.__name__, self.source, self.newSource, len(self.renames), len(self.collisions))
+
+    @property
+    def valid(self):
+        """
+        Whether the plan can be applied, it has no collisions or replaces them
+        """
+        return self.replace or not self.collisions
+
+
+class PendingResult(object):
+    """
+    Pending Result
+
+    Result of a function running in the shared thread pool, like the
+    AsyncResult of a multiprocessing pool. Event loops can be notified
+    through the callback, for example by scheduling a call on the loop.
+
+    Args:
+        callback (callable, optional): Called with the value once it's set, from the thread setting it
+    """
+
+    def __init__(self, callback=None):
+        self._callback = callback
+        self._event = threading.Event()
+        self._value = None
+        self._excInfo = None
+
+    def ready(self):
+        return self._event.is_set()
+
+    def successful(self):
+        """
+        Whether the function returned without raising
+
+        Raises:
+            ValueError: if the result is not ready
+        """
+        if not self.ready():
+            raise ValueError("Result is not ready")
+        return self._excInfo is None
+
+    def wait(self, timeout=None):
+        self._event.wait(timeout)
+
+    def get(self, timeout=None):
+        """
+        Value of the result, waiting for it if needed
+
+        Raises:
+            TimeoutError: if the result is not ready within timeout seconds
+            Exception: whatever the function raised
+        """
+        self.wait(timeout)
+        if not self.ready():
+            raise TimeoutError
+        if self._excInfo is not None:
+            raise self._excInfo[0], self._excInfo[1], self._excInfo[2]
+        return self._value
+
+    def _set(self, value):
+        self._value = value
+        self._event.set()
+        if self._callback is not None:
+            try:
+                self._callback(value)
+            except Exception:
+                LOG.exception("Error in result callback")
+
+    def _set_exception(self, excInfo):
+        self._excInfo = excInfo
+        self._event.set()
+
+
+def _get_async_pool():
+    global _ASYNC_POOL
+    with _ASYNC_POOL_LOCK:
+        if _ASYNC_POOL is None:
+            _ASYNC_POOL = ThreadPool(ASYNC_WORKERS)
+    return _ASYNC_POOL
+
+
+def _run_async(func, args=(), kwargs=None, callback=None):
+    """
+    Run func in the shared thread pool
+
+    Returns:
+        PendingResult
+    """
+    result = PendingResult(callback)
+
+    def run():
+        # The pool drops anything raised by the task, so nothing may escape
+        try:
+            value = func(*args, **(kwargs or {}))
+        except BaseException:
+            result._set_exception(sys.exc_info())
+        else:
+            result._set(value)
+    _get_async_pool().apply_async(run)
+    return result
+
+
+def _load_sequence(sequence):
+    sequence.items
+    return sequence
+
+
+def _rename_paths(renames, workers=1, progressCB=None, twoPhase=True, journal=None):
+    """
+    Rename many paths in a thread pool, undoing every rename if any fails
+
+    Args:
+        renames (list of tuple): (old path, new path)
+        workers (int, optional): Number of renames done at once
+        progressCB (callable, optional): Called with (completed renames, total renames)
+        twoPhase (bool, optional): Whether to move every path to a unique temporary name in its folder first
+            Needed when a new path is the old path of another rename, the renames can then run in any order
+        journal (RenameJournal, optional): Journal recording the renames while they run
+
+    Raises:
+        OSError: the first error, once the renames are undone
+    """
+    token = uuid.uuid4().hex[:12]
+    entries = []
+    for oldPath, newPath in renames:
+        tempPath = None
+        if twoPhase:
+            folder, name = os.path.split(oldPath)
+            tempPath = join_paths(folder, '.{0}.{1}'.format(token, name))
+        entries.append((oldPath, tempPath, newPath))
+
+    if journal is not None:
+        journal.begin(entries, twoPhase)
+    phases = ['temporary', 'final'] if twoPhase else ['direct']
+    _run_rename_phases(entries, [0] * len(entries), phases, workers, progressCB, journal, undoOnError=True)
+
+
+def _run_rename_phases(entries, locations, phases, workers, progressCB, journal, undoOnError):
+    """
+    Move renames through phases, each phase moves the renames at its source location to its destination
+
+    Args:
+        entries (list of tuple): (old path, temporary path, new path) of each rename
+        locations (list of int): Index in its entry of the current path of each rename, updated as they move
+        phases (list of str): Keys of RENAME_PHASES
+        undoOnError (bool): Whether to undo the moves done by these phases if one fails
+
+    Raises:
+        OSError: the first error
+    """
+    # Every move is counted in the total even if an earlier phase fails
+    total = 0
+    planned = list(locations)
+    for phase in phases:
+        source, destination = RENAME_PHASES[phase]
+        total += planned.count(source)
+        planned = [destination if l == source else l for l in planned]
+
+    pool = ThreadPool(workers) if workers > 1 else None
+    error = None
+    undone = True
+    try:
+        completed = 0
+        executed = []
+        for phase in phases:
+            indexes = [i for i, l in enumerate(locations) if l == RENAME_PHASES[phase][0]]
+            if not indexes:
+                continue
+            done, error = _run_rename_phase(pool, entries, locations, indexes, phase, journal, progressCB, completed, total)
+            executed.append((phase, done))
+            completed += len(done)
+            if error is not None:
+                break
+
+        if error is not None and undoOnError:
+            for phase, done in reversed(executed):
+                undoPhase = 'undo-' + phase
+                _, undoError = _run_rename_phase(pool, entries, locations, done, undoPhase, journal, None, 0, 0)
+                if undoError is not None:
+                    undone = False
+                    break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if journal is not None:
+        journal.flush()
+        if set(locations) <= set([0]) or set(locations) <= set([2]):
+            journal.finish()
+        else:
+            journal.close()
+            if error is not None:
+                LOG.error("Renames are incomplete, they can be resumed or rolled back from the journal {0}".format(journal.path))
+    elif not undone:
+        LOG.error("Couldn't undo every rename")
+    if error is not None:
+        raise error
+
+
+def _run_rename_phase(pool, entries, locations, indexes, phase, journal, progressCB, completed, total):
+    """
+    Move the given renames for a phase, every move is attempted even if one fails
+
+    Returns:
+        tuple: (list of indexes of the moved renames, first error or None)
+    """
+    source, destination = RENAME_PHASES[phase]
+    if journal is not None:
+        journal.start_phase(phase)
+    moves = [(i, entries[i][source], entries[i][destination]) for i in indexes]
+    results = imap(_move_path, moves) if pool is None else pool.imap_unordered(_move_path, moves, chunksize=64)
+    done = []
+    error = None
+    for index, moveError in results:
+        if moveError is not None:
+            if phase.startswith('undo'):
+                LOG.error("Couldn't undo rename {0}: {1}".format(entries[index][0], moveError))
+            if error is None:
+                error = moveError
+            continue
+        locations[index] = destination
+        done.append(index)
+        if journal is not None:
+            journal.record(index)
+        if progressCB is not None:
+            progressCB(completed + len(done), total)
+    if journal is not None:
+        journal.flush()
+    return done, error
+
+
+def _move_path(move):
+    index, sourcePath, destinationPath = move
+    try:
+        os.rename(sourcePath, destinationPath)
+    except OSError, e:
+        return index, e
+    return index, None
+
+
+def _fsync_folder(folder):
+    """
+    Flush the entries of a folder to disk, where folders can be opened
+    """
+    try:
+        fd = os.open(folder or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _get_free_space(folder):
+    """
+    Bytes available in a folder, None where statvfs isn't available
+    """
+    if not hasattr(os, 'statvfs'):
+        return None
+    stat = os.statvfs(folder)
+    return stat.f_bavail * stat.f_frsize
+
+
+def _transfer_paths(transfers, method, workers=1, progressCB=None, replace=False):
+    """
+    Copy or link many paths in a thread pool
+
+    Every transfer is attempted even if one fails.
+
+    Args:
+        transfers (list of tuple): (source path, destination path)
+        method (str): copy, link or symlink
+        workers (int, optional): Number of transfers done at once
+        progressCB (callable, optional): Called with (completed transfers, total transfers)
+        replace (bool, optional): Whether to replace existing destination paths
+
+    Raises:
+        OSError: if a destination path is its source path, nothing is transferred then
+            Otherwise the first error
+    """
+    # A replaced destination is removed first, which would remove its source
+    realFolders = {}
+
+    def realPath(path):
+        folder, name = os.path.split(path)
+        if folder not in realFolders:
+            realFolders[folder] = os.path.normcase(os.path.realpath(folder or os.curdir))
+        return os.path.join(realFolders[folder], os.path.normcase(name))
+
+    for sourcePath, destinationPath in transfers:
+        if realPath(sourcePath) == realPath(destinationPath):
+            raise OSError(errno.EINVAL, "Destination is the source path", destinationPath)
+
+    jobs = [(method, sourcePath, destinationPath, replace) for sourcePath, destinationPath in transfers]
+    pool = ThreadPool(workers) if workers > 1 else None
+    completed = 0
+    error = None
+    try:
+        results = imap(_transfer_path, jobs) if pool is None else pool.imap_unordered(_transfer_path, jobs, chunksize=16)
+        for transferError in results:
+            if transferError is not None:
+                LOG.error(transferError)
+                if error is None:
+                    error = transferError
+                continue
+            completed += 1
+            if progressCB is not None:
+                progressCB(completed, len(jobs))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if error is not None:
+        raise error
+
+
+def _transfer_path(job):
+    method, sourcePath, destinationPath, replace = job
+    try:
+        # Replaced links are removed so their targets aren't written to
+        if replace and os.path.lexists(destinationPath):
+            os.remove(destinationPath)
+        if method == 'copy':
+            copy_file(sourcePath, destinationPath)
+        elif method == 'link':
+            os.link(sourcePath, destinationPath)
+        else:
+            # Relative paths would be resolved from the link's folder
+            os.symlink(os.path.abspath(sourcePath), destinationPath)
+    except (OSError, IOError), e:
+        if isinstance(e, IOError):
+            e = OSError(e.errno, e.strerror, e.filename)
+        return e
+
+
+class RenameJournal(object):
+    """
+    Rename Journal
+
+    Write-ahead journal of the renames of a rename plan. It's kept in a file
+    next to the sequence while the renames run, so a rename interrupted by a
+    crash can be resumed or rolled back by another process.
+
+    The planned renames are written and synced before anything is renamed,
+    then each phase is written before it starts and completed renames are
+    appended in batches, synced with a single fsync per batch. Renames that
+    completed after the last batch are found by checking which of their
+    paths exists. The file is removed once every item is at its old or at
+    its new path.
+
+    Args:
+        path (str): Path to the journal file
+        batchSize (int, optional): Number of completed renames written at once
+    """
+    extension = '.renamejournal'
+
+    def __init__(self, path, batchSize=None):
+        self.path = path
+        self.batchSize = batchSize or JOURNAL_BATCH_SIZE
+        self.source = None
+        self.newSource = None
+        self.entries = None
+        self.twoPhase = None
+        self._file = None
+        self._pending = []
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self.path)
+
+    @classmethod
+    def for_plan(cls, plan, batchSize=None):
+        """
+        Journal next to the sequence of a rename plan
+        """
+        folder, name = os.path.split(plan.source)
+        result = cls(join_paths(folder, '.' + name + cls.extension), batchSize=batchSize)
+        result.source = plan.source
+        result.newSource = plan.newSource
+        return result
+
+    @classmethod
+    def find(cls, folder):
+        """
+        Journals of the renames that were interrupted in a folder
+
+        Returns:
+            list of RenameJournal
+        """
+        return [cls(path) for path in sorted(_list_files(folder)) if path.endswith(cls.extension)]
+
+    def begin(self, entries, twoPhase):
+        """
+        Write the planned renames, before anything is renamed
+
+        Args:
+            entries (list of tuple): (old path, temporary path, new path) of each rename
+            twoPhase (bool): Whether the renames go through temporary paths
+
+        Raises:
+            OSError: if the journal file already exists
+        """
+        self.entries = entries
+        self.twoPhase = twoPhase
+        isUnicode = any(isinstance(path, unicode) for path in entries[0]) if entries else False
+        # Byte string paths are written as latin-1 so names that aren't utf-8 round trip
+        convert = lambda path: path.decode('latin-1') if isinstance(path, str) else path
+        header = {
+            'source': convert(self.source),
+            'newSource': convert(self.newSource),
+            'twoPhase': twoPhase,
+            'unicode': isUnicode,
+            'encoding': 'latin-1',
+            'entries': [tuple(convert(path) for path in entry) for entry in entries],
+        }
+        # Never replace the journal of another rename
+        self._file = os.fdopen(os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), 'wb')
+        self._write(header)
+        _fsync_folder(os.path.dirname(self.path))
+
+    def start_phase(self, phase):
+        self.flush()
+        self._write({'phase': phase})
+
+    def record(self, index):
+        self._pending.append(index)
+        if len(self._pending) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._write({'done': self._pending})
+            self._pending = []
+
+    def finish(self):
+        """
+        Close and remove the journal, the renames are complete or undone
+        """
+        self.close()
+        os.remove(self.path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def load(self):
+        """
+        Read the journal
+
+        Returns:
+            tuple: (last phase or None, set of indexes of the renames completed in it)
+        """
+        phase = None
+        done = set()
+        with open(self.path, 'rb') as f:
+            lines = f.read().split('\n')
+        header = json.loads(lines[0])
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Last line may be incomplete
+                break
+            if 'phase' in record:
+                phase = record['phase']
+                done = set()
+            else:
+                done.update(record['done'])
+
+        encoding = header.get('encoding', 'utf-8')
+        convert = (lambda path: path) if header['unicode'] else (lambda path: path if path is None else path.encode(encoding))
+        self.entries = [tuple(convert(path) for path in entry) for entry in header['entries']]
+        self.twoPhase = header['twoPhase']
+        self.source = header['source'] and convert(header['source'])
+        self.newSource = header['newSource'] and convert(header['newSource'])
+        return phase, done
+
+    def get_locations(self):
+        """
+        Current path of each rename, as the index of the path in its entry
+
+        Returns:
+            list of int: 0 for the old path, 1 for the temporary path and 2 for the new path
+        """
+        global SYSCALL_COUNTER  # Profiling
+
+        phase, done = self.load()
+        if phase is None:
+            return [0] * len(self.entries)
+        source, destination = RENAME_PHASES[phase]
+        locations = []
+        for index, entry in enumerate(self.entries):
+            if index in done:
+                locations.append(destination)
+                continue
+            SYSCALL_COUNTER += 1    # Profiling
+            # Temporary paths are unique, otherwise old paths are never new paths
+            if 1 in (source, destination):
+                other = destination if source == 1 else source
+                locations.append(1 if os.path.lexists(entry[1]) else other)
+            else:
+                locations.append(0 if os.path.lexists(entry[0]) else 2)
+        return locations
+
+    def resume(self, workers=1, progressCB=None):
+        """
+        Complete the interrupted renames
+
+        Returns:
+            str: Sequence string of the renamed sequence
+
+        Raises:
+            OSError: if a rename fails, the renames done by this call are undone
+        """
+        locations = self.get_locations()
+        phases = ['temporary', 'final'] if self.twoPhase else ['direct']
+        self._file = open(self.path, 'ab')
+        _run_rename_phases(self.entries, locations, phases, workers, progressCB, self, undoOnError=True)
+        return self.newSource
+
+    def rollback(self, workers=1, progressCB=None):
+        """
+        Undo the interrupted renames
+
+        Returns:
+            str: Sequence string of the original sequence
+
+        Raises:
+            OSError: if a rename fails, rollback can be called again
+        """
+        locations = self.get_locations()
+        phases = ['undo-final', 'undo-temporary'] if self.twoPhase else ['undo-direct']
+        self._file = open(self.path, 'ab')
+        _run_rename_phases(self.entries, locations, phases, workers, progressCB, self, undoOnError=False)
+        return self.source
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+class SequenceMatch(object):
+    """
+    Sequence Match
+
+    Result of match_file_sequence, exposes the same groups and methods as the
+    match objects of DEFAULT_FILE_SEQUENCE_PATTERN.
+
+    Args:
+        string (str): Path that was matched
+        period (int): Index of the period before the item number
+        end (int): Index after the last character of the item number
+        formatType (str): Name of the sequence format group that matched
+        extStart (int): Index of the extension period, -1 if there is no extension
+    """
+    __slots__ = ('string', 'formatType', '_period', '_end', '_extStart')
+    groupNames = tuple(DEFAULT_FILE_SEQUENCE_PATTERN.groupindex)
+
+    def __init__(self, string, period, end, formatType, extStart=-1):
+        self.string = string
+        self.formatType = formatType
+        self._period = period
+        self._end = end
+        self._extStart = extStart
+
+    def __repr__(self):
+        return '<SequenceMatch {0!r}>'.format(self.string)
+
+    def span(self, group=0):
+        if group == 0:
+            return (0, len(self.string))
+        if group == 'prefix':
+            return (0, self._period)
+        if group == 'sequence' or group == self.formatType:
+            return (self._period + 1, self._end)
+        if group == 'suffix':
+            return (self._end, len(self.string))
+        if group == 'ext':
+            if self._extStart < 0:
+                return (-1, -1)
+            return (self._extStart, len(self.string))
+        if group not in self.groupNames:
+            raise IndexError("no such group")
+        return (-1, -1)
+
+    def start(self, group=0):
+        return self.span(group)[0]
+
+    def end(self, group=0):
+        return self.span(group)[1]
+
+    def group(self, *groups):
+        if not groups:
+            groups = (0,)
+        result = []
+        for group in groups:
+            start, end = self.span(group)
+            result.append(self.string[start:end] if start >= 0 else None)
+        if len(result) == 1:
+            return result[0]
+        return tuple(result)
+
+    def groupdict(self, default=None):
+        path = self.string
+        sequence = path[self._period + 1:self._end]
+        result = {
+            'prefix': path[:self._period],
+            'sequence': sequence,
+            'nums': default,
+            'pounds': default,
+            'regex': default,
+            'formatstring': default,
+            'percent': default,
+            'dollar': default,
+            'suffix': path[self._end:],
+            'ext': path[self._extStart:] if self._extStart >= 0 else default,
+        }
+        result[self.formatType] = sequence
+        return result
+
+
+_DIGIT_CHARACTERS = frozenset('0123456789')
+_WORD_CHARACTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_')
+_TOKEN_START_CHARACTERS = '0123456789#%$\\{'
+# Marks every character that can start a sequence token as '0'
+_TOKEN_START_TABLE = ''.join('0' if chr(i) in _TOKEN_START_CHARACTERS else chr(i) for i in range(256))
+_UNICODE_TOKEN_START_TABLE = dict((ord(char), u'0') for char in _TOKEN_START_CHARACTERS)
+# Marks digits as '0' and everything else as '-'
+_DIGIT_RUN_TABLE = ''.join('0' if chr(i) in _DIGIT_CHARACTERS else '-' for i in range(256))
+
+
+def _get_last_digits_span(path):
+    """
+    Start and end index of the last run of ascii digits in path, (0, 0) if there are none
+    """
+    end = len(path)
+    while end and path[end - 1] not in _DIGIT_CHARACTERS:
+        end -= 1
+    start = end
+    while start and path[start - 1] in _DIGIT_CHARACTERS:
+        start -= 1
+    return start, end
+
+
+def _scan_digits(string, index, length):
+    while index < length and string[index] in _DIGIT_CHARACTERS:
+        index += 1
+    return index
+
+
+def _scan_sequence_token(string, index, length):
+    """
+    Classify the sequence token starting at index
+
+    Returns:
+        tuple: (format type, end index), (None, None) if there is no token
+    """
+    char = string[index]
+
+    if char in _DIGIT_CHARACTERS:
+        return 'nums', _scan_digits(string, index + 1, length)
+
+    if char == '#':
+        end = index + 1
+        while end < length and string[end] == '#':
+            end += 1
+        return 'pounds', end
+
+    if char == '%':
+        end = _scan_digits(string, index + 1, length)
+        if end > index + 1 and string.startswith('d', end):
+            return 'percent', end + 1
+
+    elif char == '$':
+        if string.startswith('F', index + 1):
+            end = _scan_digits(string, index + 2, length)
+            if end > index + 2:
+                return 'dollar', end
+
+    elif char == '\\':
+        if string.startswith('d{', index + 1):
+            end = _scan_digits(string, index + 3, length)
+            if end > index + 3 and string.startswith('}', end):
+                return 'regex', end + 1
+
+    elif char == '{':
+        end = index + 1
+        while end < length and string[end] in _WORD_CHARACTERS:
+            end += 1
+        if end > index + 1 and string.startswith(':', end):
+            digitsEnd = _scan_digits(string, end + 1, length)
+            if digitsEnd > end + 1 and string.startswith('d}', digitsEnd):
+                return 'formatstring', digitsEnd + 2
+
+    return None, None
+
+
+def match_file_sequence(path):
+    """
+    Match a file sequence path without running DEFAULT_FILE_SEQUENCE_PATTERN
+
+    Gives the same result as DEFAULT_FILE_SEQUENCE_PATTERN.search(path).
+    The extension is found first by scanning from the right, a suffix is
+    only valid if it is empty or reaches the extension. Each period from
+    the left is then checked for a sequence token without backtracking.
+
+    Args:
+        path (str): Path to match
+
+    Returns:
+        SequenceMatch: None if the path is not a sequence
+    """
+    if '\n' in path:
+        # The pattern's '.' does not cross lines, leave that to the regex
+        return DEFAULT_FILE_SEQUENCE_PATTERN.search(path)
+
+    length = len(path)
+    # The extension is the last period followed by at least one character and no whitespace
+    extStart = path.rfind('.', 0, length - 1)
+    if extStart != -1 and not path[extStart + 1:].isalnum():
+        lastSpace = max(path.rfind(' '), path.rfind('\t'), path.rfind('\r'), path.rfind('\f'), path.rfind('\v'))
+        extStart = path.rfind('.', lastSpace + 1, length - 1)
+
+    # Only periods followed by a token character need to be looked at
+    isBytes = isinstance(path, str)
+    if isBytes:
+        marked = path.translate(_TOKEN_START_TABLE)
+    else:
+        marked = path.translate(_UNICODE_TOKEN_START_TABLE)
+
+    period = marked.find('.0')
+    while period != -1:
+        index = period + 1
+        if path[index] in _DIGIT_CHARACTERS:
+            formatType = 'nums'
+            # Usually the digits run up to the next period, str.isdigit is ascii only
+            end = path.find('.', index)
+            if end == -1:
+                end = length
+            if not isBytes or not path[index:end].isdigit():
+                end = _scan_digits(path, index, length)
+        else:
+            formatType, end = _scan_sequence_token(path, period + 1, length)
+        if formatType is not None:
+            if end == length:
+                return SequenceMatch(path, period, end, formatType)
+            if end <= extStart:
+                return SequenceMatch(path, period, end, formatType, extStart)
+        period = marked.find('.0', period + 1)
+    return None
+
+
+def scan_for_files(path, recursive=False, groupFolders=False, workers=1, include=None, exclude=None, extensions=None, prune=None):
     """
     Scans for files under a folder, optionally recursive and optionally grouping based on each directory.
+
+    The filters are compiled once and matched against the names in each
+    listing, so skipped files are never joined into paths and pruned
+    folders are never listed.
+
+    Args:
+        path (str): Folder to scan
+        recursive (bool): Whether to scan sub folders
+        groupFolders (bool): Whether to return a list of files for each folder instead of a flat list
+        workers (int): Number of folders listed at once when scanning recursively
+            Listings are done in a thread pool, which helps on storage with high latency.
+            The result is the same for any number of workers.
+        include (list of str, optional): Glob patterns, only file names matching one of them are kept
+        exclude (list of str, optional): Glob patterns, file names matching any of them are skipped
+        extensions (list of str, optional): Only files with one of these extensions are kept
+        prune (list of str, optional): Glob patterns, folders with a matching name are not scanned
     """
-    if _result is None:
-        _result = []
+    fileFilter, folderFilter = _compile_scan_filters(include, exclude, extensions, prune)
     result = []
-    try:
-        for entry in scandir.scandir(path):
-            entryPath = join_paths(path, entry.name)
-            if entry.is_dir():
-                if not recursive:
-                    continue
-                scan_for_files(entryPath, groupFolders=groupFolders, recursive=recursive, _result=_result)
+    if recursive and workers > 1:
+        listings = _list_folder_tree(path, workers, fileFilter, folderFilter)
+        _collect_listings(path, listings, groupFolders, result)
+    else:
+        _scan_for_files(path, recursive, groupFolders, fileFilter, folderFilter, result)
+    return result
+
+
+def _scan_for_files(path, recursive, groupFolders, fileFilter, folderFilter, result):
+    files, folders = _list_folder(path, fileFilter, folderFilter)
+    if recursive:
+        for folder in folders:
+            _scan_for_files(folder, recursive, groupFolders, fileFilter, folderFilter, result)
+
+    if files:
+        if groupFolders:
+            result.append(files)
+        else:
+            result.extend(files)
+
+
+def _compile_scan_filters(include, exclude, extensions, prune):
+    """
+    Compiled filters for the file and folder names of a scan
+
+    Returns:
+        tuple: (file name filter, folder name filter), either is None if it doesn't filter
+    """
+    return compile_filter(include=include, exclude=exclude, extensions=extensions), compile_filter(exclude=prune)
+
+
+def ascan_for_files(path, recursive=False, groupFolders=False, callback=None, include=None, exclude=None, extensions=None, prune=None):
+    """
+    Scan for files like scan_for_files without blocking the caller
+
+    Every folder is listed as its own task in the shared thread pool, so many
+    scans run together with at most ASYNC_WORKERS listings at once and none of
+    them waits on another. The result is the same as scan_for_files.
+
+    Args:
+        path (str): Folder to scan
+        recursive (bool): Whether to scan sub folders
+        groupFolders (bool): Whether to return a list of files for each folder instead of a flat list
+        callback (callable, optional): Called with the list of files once the scan is done, from a pool thread
+        include (list of str, optional): Glob patterns, only file names matching one of them are kept
+        exclude (list of str, optional): Glob patterns, file names matching any of them are skipped
+        extensions (list of str, optional): Only files with one of these extensions are kept
+        prune (list of str, optional): Glob patterns, folders with a matching name are not scanned
+
+    Returns:
+        PendingResult
+    """
+    fileFilter, folderFilter = _compile_scan_filters(include, exclude, extensions, prune)
+    result = PendingResult(callback)
+    pool = _get_async_pool()
+    listings = {}
+    lock = threading.Lock()
+    pending = [1]
+
+    def listFolder(folder):
+        # Listed in the task instead of a pool callback so errors reach the result
+        try:
+            files, folders = _list_folder(folder, fileFilter, folderFilter)
+            with lock:
+                listings[folder] = (files, folders if recursive else [])
+                if recursive:
+                    pending[0] += len(folders)
+                    for subFolder in folders:
+                        submit(subFolder)
+                pending[0] -= 1
+                done = not pending[0]
+            if done:
+                value = []
+                _collect_listings(path, listings, groupFolders, value)
+                result._set(value)
+        except BaseException:
+            result._set_exception(sys.exc_info())
+
+    def submit(folder):
+        pool.apply_async(listFolder, (folder,))
+
+    submit(path)
+    return result
+
+
+def iter_files(path, recursive=True, groupFolders=False, include=None, exclude=None, extensions=None, prune=None):
+    """
+    Generate the files under a folder, each folder's files are yielded as soon as it's listed
+
+    Unlike scan_for_files nothing is accumulated, only the folders still to
+    be listed are held, so a tree of any size can be walked and its files
+    processed while the walk goes on. Folders are walked depth first, a
+    folder's files come before the files of its sub folders.
+
+    Args:
+        path (str): Folder to scan
+        recursive (bool): Whether to scan sub folders
+        groupFolders (bool): Whether to yield a list of files for each folder instead of single files
+        include (list of str, optional): Glob patterns, only file names matching one of them are kept
+        exclude (list of str, optional): Glob patterns, file names matching any of them are skipped
+        extensions (list of str, optional): Only files with one of these extensions are kept
+        prune (list of str, optional): Glob patterns, folders with a matching name are not scanned
+
+    Yields:
+        str: file path, or list of str for each folder with files if groupFolders is True
+    """
+    fileFilter, folderFilter = _compile_scan_filters(include, exclude, extensions, prune)
+    pending = [path]
+    while pending:
+        files, folders = _list_folder(pending.pop(), fileFilter, folderFilter)
+        if files:
+            if groupFolders:
+                yield files
             else:
-                result.append(entryPath)
+                for filePath in files:
+                    yield filePath
+        if recursive:
+            # Reversed so the folders are popped in listing order
+            pending.extend(reversed(folders))
+
+
+def _list_folder(path, fileFilter=None, folderFilter=None):
+    """
+    Files and folders directly under a folder, in listing order
+
+    Args:
+        fileFilter (callable, optional): Only files with a name it matches are listed, see compile_filter
+        folderFilter (callable, optional): Only folders with a name it matches are listed
+
+    Returns:
+        tuple: (file paths, folder paths)
+    """
+    try:
+        return _scan_folder(path, fileFilter, folderFilter)
 
     # Handle paths that are too long
     except OSError:
@@ -1663,48 +3549,254 @@ def scan_for_files(path, recursive=False, groupFolders=False, _result=None):
         if not path.startswith('\\\\?\\') and path.startswith("\\\\"):
             path = "\\\\?\\UNC\\" + path[2:]
         try:
-
-            for entry in scandir.scandir(path):
-                entryPath = join_paths(path, entry.name)
-                if entry.is_dir():
-                    if not recursive:
-                        continue
-                    scan_for_files(entryPath, groupFolders=groupFolders, recursive=recursive, _result=_result)
-                else:
-                    result.append(entryPath)
+            return _scan_folder(path, fileFilter, folderFilter)
         except Exception, e:
             LOG.warning("Couldn't scan path: {0} - {1}".format(path, e))
+    return [], []
 
-    if result:
+
+def _scan_folder(path, fileFilter=None, folderFilter=None):
+    if LISTING_CACHE is not None:
+        return LISTING_CACHE.get_listing(path, fileFilter=fileFilter, folderFilter=folderFilter)
+    return _read_folder(path, fileFilter, folderFilter)
+
+
+def _list_files(path, stamp=None, stats=None):
+    """
+    Paths of the files directly under a folder
+
+    Args:
+        stamp (tuple, optional): (mtime, ctime) of the folder if it was already stat'd
+        stats (dict, optional): Filled with (size, mtime) of each path from the listing
+            Only worth it where the listing includes them, see SCAN_STATS.
+            Not filled when the listing comes from the listing cache.
+    """
+    global SYSCALL_COUNTER  # Profiling
+
+    if LISTING_CACHE is not None:
+        return LISTING_CACHE.get_listing(path, stamp)[0]
+    SYSCALL_COUNTER += 1    # Profiling
+    paths = []
+    for dirEntry in scandir.scandir(path):
+        # Same test as _read_folder, so listings agree with and without the listing cache
+        if not dirEntry.is_dir():
+            entryPath = join_paths(path, dirEntry.name)
+            paths.append(entryPath)
+            if stats is not None:
+                try:
+                    stat = dirEntry.stat()
+                    stats[entryPath] = (stat.st_size, stat.st_mtime)
+                except OSError:
+                    # Broken links have no size
+                    stats[entryPath] = (-1, 0.0)
+    return paths
+
+
+def _read_folder(path, fileFilter=None, folderFilter=None):
+    global SYSCALL_COUNTER  # Profiling
+
+    files = []
+    folders = []
+    SYSCALL_COUNTER += 1    # Profiling
+    for entry in scandir.scandir(path):
+        name = entry.name
+        if entry.is_dir():
+            if folderFilter is None or folderFilter(name):
+                folders.append(join_paths(path, name))
+        elif fileFilter is None or fileFilter(name):
+            files.append(join_paths(path, name))
+    return files, folders
+
+
+def _list_folder_tree(path, workers, fileFilter=None, folderFilter=None):
+    """
+    List every folder under path, one level of the tree at a time in a thread pool
+
+    Returns:
+        dict: keys are folder paths and values are (file paths, folder paths)
+    """
+    listings = {}
+    pool = ThreadPool(workers)
+    listFolder = lambda folder: _list_folder(folder, fileFilter, folderFilter)
+    try:
+        level = [path]
+        while level:
+            nextLevel = []
+            for folder, listing in izip(level, pool.map(listFolder, level, chunksize=1)):
+                listings[folder] = listing
+                nextLevel.extend(listing[1])
+            level = nextLevel
+    finally:
+        pool.close()
+        pool.join()
+    return listings
+
+
+def _collect_listings(path, listings, groupFolders, result):
+    """
+    Add the files of a listed folder tree to result in the same order as a serial scan
+    """
+    files, folders = listings[path]
+    for folder in folders:
+        _collect_listings(folder, listings, groupFolders, result)
+    if files:
         if groupFolders:
-            _result.append(result)
+            result.append(files)
         else:
-            _result.extend(result)
-    return _result
+            result.extend(files)
+
+
+def find_sequences(folder, sequenceClass=FileSequence, directoryIndex=None, include=None, exclude=None, extensions=None):
+    """
+    Find every sequence in a folder from a single scan
+
+    Each file is hashed into the pound string of its sequence, so the folder
+    is listed once and every path is parsed once.
+
+    Args:
+        folder (str): Path to the folder to search
+        sequenceClass (class, optional): Sequence class to build, FileSequence by default
+        directoryIndex (DirectoryIndex, optional): Existing listing of the folder to use instead of scanning
+        include (list of str, optional): Glob patterns, only file names matching one of them are kept
+        exclude (list of str, optional): Glob patterns, file names matching any of them are skipped
+        extensions (list of str, optional): Only files with one of these extensions are kept
+
+    Returns:
+        tuple: (list of sequences, list of paths that are not part of a sequence)
+    """
+    if directoryIndex is None:
+        directoryIndex = DirectoryIndex(folder)
+    paths = directoryIndex.paths
+    fileFilter = compile_filter(include=include, exclude=exclude, extensions=extensions)
+    if fileFilter is not None:
+        paths = [p for p in paths if fileFilter(p[p.rfind('/') + 1:])]
+    groups, singles = _group_sequence_paths(paths, sequenceClass)
+    sequences = [_build_grouped_sequence(sequenceClass, groups[key], directoryIndex=directoryIndex) for key in sorted(groups)]
+    return sequences, sorted(singles)
+
+
+def afind_sequences(folder, sequenceClass=FileSequence, callback=None, include=None, exclude=None, extensions=None):
+    """
+    Find every sequence in a folder like find_sequences without blocking the caller
+
+    Args:
+        folder (str): Path to the folder to search
+        sequenceClass (class, optional): Sequence class to build, FileSequence by default
+        callback (callable, optional): Called with (sequences, singles) once found, from a pool thread
+        include (list of str, optional): Glob patterns, only file names matching one of them are kept
+        exclude (list of str, optional): Glob patterns, file names matching any of them are skipped
+        extensions (list of str, optional): Only files with one of these extensions are kept
+
+    Returns:
+        PendingResult: its value is (list of sequences, list of paths that are not part of a sequence)
+    """
+    kwargs = dict(include=include, exclude=exclude, extensions=extensions)
+    return _run_async(find_sequences, (folder, sequenceClass), kwargs, callback=callback)
+
+
+def walk_sequences(root, sequenceClass=FileSequence, include=None, exclude=None, extensions=None, prune=None):
+    """
+    Generate the sequences of every folder under root as each folder is listed
+
+    Every folder is listed once, its sequences are built from that listing
+    and the same listing is used to walk into its sub folders. Folders are
+    walked depth first, a folder comes before its sub folders.
+
+    Args:
+        root (str): Path to the top folder
+        sequenceClass (class, optional): Sequence class to build, FileSequence by default
+        include (list of str, optional): Glob patterns, only file names matching one of them are kept
+        exclude (list of str, optional): Glob patterns, file names matching any of them are skipped
+        extensions (list of str, optional): Only files with one of these extensions are kept
+        prune (list of str, optional): Glob patterns, folders with a matching name are not scanned
+
+    Yields:
+        tuple: (folder, list of sequences, list of paths that are not part of a sequence)
+    """
+    root = path_normalize(root)
+    if len(root) > 1:
+        root = root.rstrip('/')
+    fileFilter, folderFilter = _compile_scan_filters(include, exclude, extensions, prune)
+    pending = [root]
+    while pending:
+        folder = pending.pop()
+        files, folders = _list_folder(folder, fileFilter, folderFilter)
+        directoryIndex = DirectoryIndex.from_paths(folder, files)
+        sequences, singles = find_sequences(folder, sequenceClass=sequenceClass, directoryIndex=directoryIndex)
+        yield folder, sequences, singles
+        # Reversed so the folders are popped in listing order
+        pending.extend(reversed(folders))
+
+
+def _group_sequence_paths(paths, sequenceClass=FileSequence):
+    """
+    Group paths by the pound string of the sequence they belong to
+
+    Returns:
+        tuple: (dict of pound string to (match, groups, formatType, paths), list of other paths)
+    """
+    groups = {}
+    singles = []
+    for path in paths:
+        try:
+            match, matchGroups, formatType = sequenceClass.validate_path(path, validateExists=False)
+        except ValueError:
+            singles.append(path)
+            continue
+        if formatType != 'nums':
+            # Only numbered items can be grouped, templates are left as they are
+            singles.append(path)
+            continue
+        start, end = match.span('sequence')
+        key = path[:start] + '#' * (end - start) + path[end:]
+        group = groups.get(key)
+        if group is None:
+            groups[key] = (match, matchGroups, formatType, [path])
+        else:
+            group[3].append(path)
+    return groups, singles
+
+
+def _build_grouped_sequence(sequenceClass, group, validateExists=False, **kwargs):
+    """
+    Build a sequence from a group made by _group_sequence_paths without parsing it again
+    """
+    match, matchGroups, formatType, paths = group
+    result = sequenceClass(paths[0], items=paths, skipValidate=True, validateExists=validateExists, normalizeInput=False, **kwargs)
+    result._parse_values(match, matchGroups, formatType)
+    return result
 
 
 def flatten_sequences(paths, validateExists=False, normalizeInput=False):
     """
     Flatten Sequences from a list of paths
+
+    Every path is parsed once and grouped by the pound string of its sequence,
+    then each sequence is built once from its grouped paths.
+
+    Returns:
+        dict: keys are pound strings for sequences and paths for everything else
+            values are the sequences, or None for paths that are not sequences
     """
+    if normalizeInput:
+        paths = [path_normalize(x) for x in paths]
+    groups, singles = _group_sequence_paths(paths)
+
     results = {}
-    while paths:
-        path = paths.pop()
-        # Check if path is a sequence
+    for key, group in groups.iteritems():
+        if validateExists and not os.path.exists(os.path.dirname(key)):
+            results.update(dict.fromkeys(group[3]))
+            continue
+        results[key] = _build_grouped_sequence(FileSequence, group, validateExists=validateExists)
+
+    # Templates such as path.####.png are still sequences on their own
+    for path in singles:
         try:
-            seq = FileSequence(path, validateExists=validateExists, normalizeInput=normalizeInput)
+            seq = FileSequence(path, validateExists=validateExists, normalizeInput=False)
         except Exception:
             results[path] = None
             continue
-
-        new_path = seq.get_pound_string()
-        if new_path not in results:
-            results[new_path] = seq
-
-        # Filter out other paths of sequence
-        for path in paths:
-            if seq.is_part_of_sequence(path):
-                paths.remove(path)
+        results.setdefault(seq.get_pound_string(), seq)
 
     return results
 
@@ -1731,3 +3823,72 @@ def get_sequence_range(path, validateExists=False):
             if not index == len(seqRange) - 1:
                 sequenceNums += ", "
         return sequenceNums
+
+
+def sync_sequence(sequence, folder, delete=False, workers=TRANSFER_WORKERS, progressCB=None):
+    """
+    Copy the new and changed items of a sequence to another folder
+
+    Both folders are listed once and items are compared by size and
+    modification time, to the second like rsync. The times come from the
+    listings where they include them, see SCAN_STATS, otherwise each item
+    is stat'd. Copies keep the modification time of the items, so items
+    are only copied again once they change.
+
+    Args:
+        sequence (FileSequence): Sequence to copy
+        folder (str): Folder to copy the items into, with their names
+        delete (bool, optional): Whether to remove the items of the copy that are no longer in the sequence
+        workers (int, optional): Number of items copied at once
+        progressCB (callable, optional): Called with (copied items, items to copy)
+
+    Returns:
+        tuple: (FileSequence of the copy, FrameSet of copied item numbers, FrameSet of removed item numbers)
+
+    Raises:
+        OSError: if a copy or removal fails, items copied before the error are kept
+    """
+    folder = path_normalize(folder).rstrip('/') or '/'
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    copySource = join_paths(folder, os.path.basename(sequence.string))
+    items, (numbers, sizes, mtimes) = _list_sequence_stats(sequence)
+    copyItems, copyStats = _list_sequence_stats(sequence.__class__(copySource, validateExists=False))
+
+    known = dict((number, (size, int(mtime))) for number, size, mtime in izip(*copyStats))
+    copied = []
+    transfers = []
+    for number, size, mtime in izip(numbers, sizes, mtimes):
+        # Items removed since the listing have no size
+        if size >= 0 and known.get(number) != (size, int(mtime)):
+            copied.append(number)
+            transfers.append((items[number], join_paths(folder, os.path.basename(items[number]))))
+    _transfer_paths(transfers, 'copy', workers=workers, progressCB=progressCB, replace=True)
+    for number, (oldPath, newPath) in izip(copied, transfers):
+        copyItems[number] = newPath
+
+    removed = []
+    if delete:
+        for number in copyStats[0]:
+            if number not in items:
+                os.remove(copyItems.pop(number))
+                removed.append(number)
+
+    copyPaths = [path for number, path in sorted(copyItems.iteritems())]
+    copy = sequence.__class__(copyPaths[0] if copyPaths else copySource, items=copyPaths, validateExists=False)
+    # Copies have the stats of the items
+    if sorted(copyItems) == list(numbers) and min(sizes or [0]) >= 0:
+        copy._frameStats = (numbers, sizes, mtimes)
+    return copy, FrameSet(copied), FrameSet(removed)
+
+
+def _list_sequence_stats(sequence):
+    """
+    Items of a sequence found with a single listing of its folder, and their stats
+
+    Returns:
+        tuple: (dict of item numbers and paths, (FrameSet of item numbers, array of sizes, array of mtimes))
+    """
+    stats = {} if SCAN_STATS else None
+    items = sequence._get_items_from_paths(_list_files(sequence.folder, stats=stats))
+    return items, sequence._get_item_stats(sorted(items.iteritems()), stats or {})
@@ -0,0 +1,811 @@
+#!/usr/bin/env python
+
+import re
+import bisect
+import collections
+from array import array
+from itertools import chain, imap, izip
+
+__all__ = [
+    'FrameSet',
+    'FrameMap',
+    'TemplateFrameMap',
+    'parse_frame_range',
+    'format_frame_range',
+]
+
+FRAME_RANGE_TOKEN_PATTERN = re.compile(
+    '^\s*(?P<start>-?\d+)'
+    '(?:\s*-\s*(?P<end>-?\d+)'
+        '(?:\s*[xX:]\s*(?P<step>\d+))?'
+    ')?\s*$'
+)  # NOQA
+
+# Most numbers expanded when merging stepped runs that interleave
+MAX_EXPANDED_FRAMES = 1000000
+
+
+class FrameSet(collections.MutableSet):
+    """
+    Frame Set
+
+    Sorted set of item numbers stored as disjoint runs. A run is a start, an
+    end and a step, so a complete sequence is a single run no matter how many
+    items it holds and so is a sequence rendered on every other frame.
+
+    Membership, positional lookups and neighbour lookups are O(log runs),
+    iteration is lazy and range/missing queries work on the runs without
+    expanding them.
+
+    Args:
+        numbers (iterable of int, optional): Item numbers in the set
+    """
+
+    __slots__ = ('_starts', '_ends', '_steps', '_length', '_numbers', '_offsets')
+
+    def __init__(self, numbers=None):
+        self._starts = array('l')
+        self._ends = array('l')
+        self._steps = array('l')
+        self._length = 0
+        self._numbers = None
+        self._offsets = None
+        if numbers is not None:
+            self.update(numbers)
+
+    @classmethod
+    def from_runs(cls, runs):
+        """
+        Build a frame set from runs of consecutive item numbers
+
+        Args:
+            runs (iterable of tuple): (start, end) inclusive pairs, overlapping runs are merged
+
+        Returns:
+            FrameSet
+        """
+        result = cls()
+        for start, end in sorted(runs):
+            result._append_run(start, end)
+        return result
+
+    @classmethod
+    def from_segments(cls, segments):
+        """
+        Build a frame set from stepped runs of item numbers
+
+        Segments that do not overlap are stored as they are. Overlapping
+        segments are merged without expanding them, except for stepped
+        segments that interleave.
+
+        Args:
+            segments (iterable of tuple): (start, end, step) inclusive triples
+
+        Returns:
+            FrameSet
+
+        Raises:
+            ValueError: if a segment is invalid or interleaving stepped
+                segments hold more than MAX_EXPANDED_FRAMES numbers
+        """
+        normalized = []
+        for start, end, step in segments:
+            if step < 1:
+                raise ValueError("Invalid step, must be a positive number: {0}".format(step))
+            if end < start:
+                raise ValueError("Invalid run, end is before start: {0}-{1}".format(start, end))
+            normalized.append((start, start + (end - start) // step * step, step))
+        normalized.sort()
+
+        result = cls()
+        index = 0
+        while index < len(normalized):
+            # Find the cluster of segments overlapping this one
+            clusterEnd = normalized[index][1]
+            last = index
+            while last + 1 < len(normalized) and normalized[last + 1][0] <= clusterEnd:
+                last += 1
+                clusterEnd = max(clusterEnd, normalized[last][1])
+            if last == index:
+                result._append_segment(*normalized[index])
+            else:
+                for segment in cls._merge_segments(normalized[index:last + 1]):
+                    result._append_segment(*segment)
+            index = last + 1
+        return result
+
+    @staticmethod
+    def _merge_segments(segments):
+        """
+        Merge sorted overlapping segments into segments with disjoint spans
+
+        Runs of consecutive numbers are merged by their bounds and stepped
+        runs are clipped to the gaps between them, so a stepped run inside a
+        consecutive run costs nothing. Stepped runs on the same grid are
+        joined the same way and only stepped runs that still interleave are
+        expanded, at most MAX_EXPANDED_FRAMES numbers.
+
+        Raises:
+            ValueError: if interleaving stepped runs hold too many numbers
+        """
+        runs = []
+        for start, end, step in segments:
+            if step != 1:
+                continue
+            if runs and start <= runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], max(runs[-1][1], end), 1)
+            else:
+                runs.append((start, end, 1))
+
+        # Keep the parts of stepped runs that fall between consecutive runs
+        runStarts = [r[0] for r in runs]
+        grids = collections.defaultdict(list)
+        for start, end, step in segments:
+            if step == 1:
+                continue
+            pieces = grids[(step, start % step)]
+            index = max(bisect.bisect_right(runStarts, start) - 1, 0)
+            while start <= end and index < len(runs) and runs[index][0] <= end:
+                runStart, runEnd = runs[index][:2]
+                index += 1
+                if runEnd < start:
+                    continue
+                pieceEnd = start + (min(end, runStart - 1) - start) // step * step
+                if pieceEnd >= start:
+                    pieces.append((start, pieceEnd, step))
+                start += ((runEnd - start) // step + 1) * step
+            if start <= end:
+                pieces.append((start, end, step))
+
+        # Join stepped runs on the same grid
+        stepped = []
+        for (step, _), pieces in grids.iteritems():
+            if not pieces:
+                continue
+            pieces.sort()
+            merged = [pieces[0]]
+            for start, end, _ in pieces[1:]:
+                lastEnd = merged[-1][1]
+                if start <= lastEnd or (start == lastEnd + step and
+                                        bisect.bisect_right(runStarts, lastEnd) == bisect.bisect_left(runStarts, start)):
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end), step)
+                else:
+                    merged.append((start, end, step))
+            stepped.extend(merged)
+        stepped.sort()
+
+        # Expand the stepped runs that still interleave
+        result = runs
+        index = 0
+        while index < len(stepped):
+            clusterEnd = stepped[index][1]
+            last = index
+            while last + 1 < len(stepped) and stepped[last + 1][0] <= clusterEnd:
+                last += 1
+                clusterEnd = max(clusterEnd, stepped[last][1])
+            if last == index:
+                result.append(stepped[index])
+            else:
+                cluster = stepped[index:last + 1]
+                if sum((e - s) // k + 1 for s, e, k in cluster) > MAX_EXPANDED_FRAMES:
+                    raise ValueError("Too many interleaved stepped frames to merge: {0}-{1}".format(
+                        cluster[0][0], clusterEnd))
+                numbers = sorted(set(chain.from_iterable(xrange(s, e + 1, k) for s, e, k in cluster)))
+                result.extend(FrameSet(numbers).segments)
+            index = last + 1
+        result.sort()
+        return result
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, number):
+        if not isinstance(number, (int, long)):
+            return False
+        return self._find_run(number) >= 0
+
+    def __iter__(self):
+        return chain.from_iterable(xrange(s, e + 1, k) for s, e, k in izip(self._starts, self._ends, self._steps))
+
+    def __reversed__(self):
+        return chain.from_iterable(
+            xrange(e, s - 1, -k) for s, e, k in izip(reversed(self._starts), reversed(self._ends), reversed(self._steps)))
+
+    def __eq__(self, other):
+        if isinstance(other, FrameSet):
+            if self._length != other._length:
+                return False
+            if self._starts == other._starts and self._ends == other._ends and self._steps == other._steps:
+                return True
+            if not self.stepped and not other.stepped:
+                return False
+            # Stepped runs can describe the same numbers in different ways
+            return all(n in other for n in self)
+        return super(FrameSet, self).__eq__(other)
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(self.__class__.__name__, self)
+
+    def __str__(self):
+        return format_frame_range(self)
+
+    def __getstate__(self):
+        return self._starts, self._ends, self._steps, self._length
+
+    def __setstate__(self, state):
+        self._starts, self._ends, self._steps, self._length = state
+        self._invalidate()
+
+    @property
+    def segments(self):
+        """
+        Runs of item numbers as stored
+
+        Returns:
+            list of tuple: (start, end, step) inclusive triples
+        """
+        return zip(self._starts, self._ends, self._steps)
+
+    @property
+    def stepped(self):
+        """
+        Whether any run has a step greater than one
+
+        Returns:
+            bool
+        """
+        return any(k > 1 for k in self._steps)
+
+    @property
+    def runs(self):
+        """
+        Runs of consecutive item numbers
+
+        Returns:
+            list of tuple: (start, end) inclusive pairs
+        """
+        if not self.stepped:
+            return zip(self._starts, self._ends)
+        result = []
+        for start, end, step in izip(self._starts, self._ends, self._steps):
+            if step == 1:
+                pieces = [(start, end)]
+            else:
+                pieces = ((n, n) for n in xrange(start, end + 1, step))
+            for piece in pieces:
+                if result and result[-1][1] + 1 == piece[0]:
+                    result[-1] = (result[-1][0], piece[1])
+                else:
+                    result.append(piece)
+        return result
+
+    @property
+    def gaps(self):
+        """
+        Runs of item numbers missing between the first and last item
+
+        Returns:
+            list of tuple: (start, end) inclusive pairs
+        """
+        runs = self.runs
+        return [(runs[i - 1][1] + 1, runs[i][0] - 1) for i in xrange(1, len(runs))]
+
+    @property
+    def numbers(self):
+        """
+        All item numbers in order, cached until the set changes
+
+        Returns:
+            array of int
+        """
+        if self._numbers is None:
+            numbers = array('l')
+            for start, end, step in izip(self._starts, self._ends, self._steps):
+                numbers.extend(xrange(start, end + 1, step))
+            self._numbers = numbers
+        return self._numbers
+
+    @property
+    def first(self):
+        if not self._length:
+            return None
+        return self._starts[0]
+
+    @property
+    def last(self):
+        if not self._length:
+            return None
+        return self._ends[-1]
+
+    def at(self, position):
+        """
+        Item number at a position in the sorted set
+
+        Args:
+            position (int): Position of the item, negative positions count from the end
+
+        Returns:
+            int
+
+        Raises:
+            IndexError: if the position is out of range
+        """
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError("FrameSet position out of range: {0}".format(position))
+        offsets = self._get_offsets()
+        index = bisect.bisect_right(offsets, position) - 1
+        return self._starts[index] + (position - offsets[index]) * self._steps[index]
+
+    def index(self, number):
+        """
+        Position of an item number in the sorted set
+
+        Raises:
+            ValueError: if the number is not in the set
+        """
+        index = self._find_run(number)
+        if index < 0:
+            raise ValueError("{0} is not in the frame set".format(number))
+        return self._get_offsets()[index] + (number - self._starts[index]) // self._steps[index]
+
+    def after(self, number):
+        """
+        Smallest item number greater than the given number
+
+        Returns:
+            int or None: None if there is no greater item number
+        """
+        index = bisect.bisect_right(self._starts, number) - 1
+        if index >= 0 and number < self._ends[index]:
+            start, step = self._starts[index], self._steps[index]
+            return start + ((number - start) // step + 1) * step
+        if index + 1 < len(self._starts):
+            return self._starts[index + 1]
+        return None
+
+    def before(self, number):
+        """
+        Greatest item number smaller than the given number
+
+        Returns:
+            int or None: None if there is no smaller item number
+        """
+        index = bisect.bisect_left(self._starts, number) - 1
+        if index < 0:
+            return None
+        if number > self._ends[index]:
+            return self._ends[index]
+        start, step = self._starts[index], self._steps[index]
+        return start + (number - 1 - start) // step * step
+
+    def missing(self):
+        """
+        Iterate the item numbers missing between the first and last item
+        """
+        return chain.from_iterable(xrange(start, end + 1) for start, end in self.gaps)
+
+    def add(self, number):
+        index = bisect.bisect_right(self._starts, number) - 1
+        if index >= 0 and number <= self._ends[index]:
+            if (number - self._starts[index]) % self._steps[index] == 0:
+                return
+            # Inside the span of a stepped run, split it around the number
+            start, end, step = self._starts[index], self._ends[index], self._steps[index]
+            before = start + (number - start) // step * step
+            self._replace_runs(index, index + 1, [
+                self._make_run(start, before, step),
+                (number, number, 1),
+                self._make_run(before + step, end, step),
+            ])
+            self._length += 1
+            return
+        self._invalidate()
+        joinPrevious = index >= 0 and self._ends[index] == number - 1 and self._steps[index] == 1
+        joinNext = index + 1 < len(self._starts) and self._starts[index + 1] == number + 1 and self._steps[index + 1] == 1
+        if joinPrevious and joinNext:
+            self._ends[index] = self._ends[index + 1]
+            del self._starts[index + 1]
+            del self._ends[index + 1]
+            del self._steps[index + 1]
+        elif joinPrevious:
+            self._ends[index] = number
+        elif joinNext:
+            self._starts[index + 1] = number
+        else:
+            self._starts.insert(index + 1, number)
+            self._ends.insert(index + 1, number)
+            self._steps.insert(index + 1, 1)
+            self._join_runs(index, index + 3)
+        self._length += 1
+
+    def discard(self, number):
+        index = self._find_run(number)
+        if index < 0:
+            return
+        start, end, step = self._starts[index], self._ends[index], self._steps[index]
+        runs = []
+        if number > start:
+            runs.append(self._make_run(start, number - step, step))
+        if number < end:
+            runs.append(self._make_run(number + step, end, step))
+        self._replace_runs(index, index + 1, runs)
+        self._length -= 1
+
+    def update(self, numbers):
+        """
+        Add many item numbers at once
+
+        Stepped runs are kept when the set is empty, otherwise the numbers
+        are merged into runs of consecutive numbers.
+
+        Args:
+            numbers (iterable of int): Item numbers to add
+        """
+        if isinstance(numbers, FrameSet):
+            if not self._length:
+                self.__setstate__(numbers.copy().__getstate__())
+                return
+            runs = numbers.runs
+        else:
+            runs = [(n, n) for n in numbers]
+        if not runs:
+            return
+        runs.extend(self.runs)
+        self.clear()
+        for start, end in sorted(runs):
+            self._append_run(start, end)
+
+    def clear(self):
+        self._starts = array('l')
+        self._ends = array('l')
+        self._steps = array('l')
+        self._length = 0
+        self._invalidate()
+
+    def copy(self):
+        result = self.__class__()
+        result.__setstate__((array('l', self._starts), array('l', self._ends), array('l', self._steps), self._length))
+        return result
+
+    def _find_run(self, number):
+        """
+        Index of the run containing the number, or -1
+        """
+        index = bisect.bisect_right(self._starts, number) - 1
+        if index >= 0 and number <= self._ends[index] and (number - self._starts[index]) % self._steps[index] == 0:
+            return index
+        return -1
+
+    def _get_offsets(self):
+        """
+        Position of the first item of each run, cached until the set changes
+        """
+        if self._offsets is None:
+            offsets = array('l')
+            total = 0
+            for start, end, step in izip(self._starts, self._ends, self._steps):
+                offsets.append(total)
+                total += (end - start) // step + 1
+            self._offsets = offsets
+        return self._offsets
+
+    def _invalidate(self):
+        self._numbers = None
+        self._offsets = None
+
+    @staticmethod
+    def _make_run(start, end, step):
+        if start == end:
+            step = 1
+        return start, end, step
+
+    def _replace_runs(self, first, last, runs):
+        """
+        Replace the runs between two indices, the length is left to the caller
+        """
+        self._invalidate()
+        self._starts[first:last] = array('l', [r[0] for r in runs])
+        self._ends[first:last] = array('l', [r[1] for r in runs])
+        self._steps[first:last] = array('l', [r[2] for r in runs])
+        self._join_runs(first - 1, first + len(runs) + 1)
+
+    def _join_runs(self, first, last):
+        """
+        Join the runs between two indices that continue each other, the way _append_segment does
+        """
+        first = max(first, 0)
+        last = min(last, len(self._starts))
+        joined = []
+        for run in izip(self._starts[first:last], self._ends[first:last], self._steps[first:last]):
+            if joined and self._continues(joined[-1], run):
+                joined[-1] = (joined[-1][0], run[1], run[0] - joined[-1][1])
+            else:
+                joined.append(run)
+        if len(joined) < last - first:
+            self._invalidate()
+            self._starts[first:last] = array('l', [r[0] for r in joined])
+            self._ends[first:last] = array('l', [r[1] for r in joined])
+            self._steps[first:last] = array('l', [r[2] for r in joined])
+
+    @staticmethod
+    def _continues(previous, run):
+        """
+        Whether a run continues the previous run with the same step
+        """
+        lastStart, lastEnd, lastStep = previous
+        start, end, step = run
+        gap = start - lastEnd
+        if lastStart == lastEnd and start == end:
+            return gap == 1
+        elif lastStart == lastEnd:
+            return gap == step
+        elif start == end:
+            return gap == lastStep
+        return gap == step == lastStep
+
+    def _append_run(self, start, end):
+        """
+        Append a run of consecutive numbers that starts at or after the start of the last run
+        """
+        if end < start:
+            raise ValueError("Invalid run, end is before start: {0}-{1}".format(start, end))
+        self._invalidate()
+        if self._starts and start <= self._ends[-1] + 1:
+            if end > self._ends[-1]:
+                self._length += end - self._ends[-1]
+                self._ends[-1] = end
+            return
+        self._starts.append(start)
+        self._ends.append(end)
+        self._steps.append(1)
+        self._length += end - start + 1
+
+    def _append_segment(self, start, end, step):
+        """
+        Append a stepped run that starts after the end of the last run
+        """
+        start, end, step = self._make_run(start, end, step)
+        self._invalidate()
+        self._length += (end - start) // step + 1
+        if self._starts and self._continues((self._starts[-1], self._ends[-1], self._steps[-1]), (start, end, step)):
+            self._steps[-1] = start - self._ends[-1]
+            self._ends[-1] = end
+            return
+        self._starts.append(start)
+        self._ends.append(end)
+        self._steps.append(step)
+
+
+class FrameMap(collections.MutableMapping):
+    """
+    Frame Map
+
+    Mapping of item numbers to items, iterated in item number order.
+    The item numbers are held in a FrameSet so ordering does not need
+    a linked list per item.
+
+    Args:
+        items (dict or iterable of tuple, optional): Item numbers and items
+    """
+
+    __slots__ = ('_frames', '_values')
+
+    def __init__(self, items=None):
+        self._frames = FrameSet()
+        self._values = {}
+        if items is not None:
+            self.update(items)
+
+    @property
+    def frames(self):
+        """
+        Item numbers of the map
+
+        Returns:
+            FrameSet
+        """
+        return self._frames
+
+    def __getitem__(self, number):
+        return self._values[number]
+
+    def __setitem__(self, number, value):
+        if number not in self._values:
+            self._frames.add(number)
+        self._values[number] = value
+
+    def __delitem__(self, number):
+        del self._values[number]
+        self._frames.discard(number)
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def __reversed__(self):
+        return reversed(self._frames)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, number):
+        return number in self._frames
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self.items())
+
+    def update(self, items):
+        """
+        Add many items at once
+
+        Args:
+            items (dict or iterable of tuple): Item numbers and items
+        """
+        values = dict(items)
+        self._frames.update([n for n in values if n not in self._values])
+        self._values.update(values)
+
+    def clear(self):
+        self._frames.clear()
+        self._values.clear()
+
+
+class TemplateFrameMap(FrameMap):
+    """
+    Template Frame Map
+
+    Frame map that only holds the item numbers. Items are generated from
+    their number on access, so no string is stored per item.
+
+    Args:
+        template (callable): Returns the item for an item number
+        numbers (iterable of int, optional): Item numbers in the map
+        bulkTemplate (callable, optional): Returns an iterator of items for an iterable of item numbers
+            Used when iterating all the values, falls back to calling template for each number
+    """
+
+    __slots__ = ('_template', '_bulkTemplate')
+
+    def __init__(self, template, numbers=None, bulkTemplate=None):
+        self._frames = FrameSet()
+        self._template = template
+        self._bulkTemplate = bulkTemplate
+        if numbers is not None:
+            self.update(numbers)
+
+    def __getitem__(self, number):
+        if number not in self._frames:
+            raise KeyError(number)
+        return self._template(number)
+
+    def __setitem__(self, number, value):
+        if value != self._template(number):
+            raise ValueError("Item does not match the template for {0}: {1}".format(number, value))
+        self._frames.add(number)
+
+    def __delitem__(self, number):
+        if number not in self._frames:
+            raise KeyError(number)
+        self._frames.discard(number)
+
+    def itervalues(self):
+        if self._bulkTemplate is None:
+            return imap(self._template, self._frames)
+        return self._bulkTemplate(self._frames)
+
+    def iteritems(self):
+        return izip(self._frames, self.itervalues())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def update(self, items):
+        """
+        Add many item numbers at once
+
+        Args:
+            items (dict or iterable of int): Item numbers, the values of a dict are ignored
+                since they are generated from the template
+        """
+        self._frames.update(items)
+
+    def clear(self):
+        self._frames.clear()
+
+
+def parse_frame_range(expression):
+    """
+    Parse a frame range expression into a FrameSet
+
+    Ranges are stored as stepped runs and never expanded, so the memory used
+    depends on the length of the expression and not on the number of frames.
+
+    Ex:
+        '1-100x2, 150, 200-210'
+        '-10--1'
+
+    Args:
+        expression (str): Comma separated frame numbers and ranges
+            Ranges are start-end with an optional step: start-endxstep
+
+    Returns:
+        FrameSet
+
+    Raises:
+        ValueError: if the expression is invalid
+    """
+    segments = []
+    for token in expression.split(','):
+        if not token.strip():
+            continue
+        match = FRAME_RANGE_TOKEN_PATTERN.match(token)
+        if not match:
+            raise ValueError("Invalid frame range: {0}".format(token.strip()))
+        start = int(match.group('start'))
+        end = match.group('end')
+        end = start if end is None else int(end)
+        step = int(match.group('step') or 1)
+        if end < start:
+            raise ValueError("Invalid frame range, end is before start: {0}".format(token.strip()))
+        if step < 1:
+            raise ValueError("Invalid frame range, step must be positive: {0}".format(token.strip()))
+        segments.append((start, end, step))
+    return FrameSet.from_segments(segments)
+
+
+def format_frame_range(frames, separator=','):
+    """
+    Format item numbers as a frame range expression
+
+    Steps are detected automatically, three or more single frames with the
+    same distance between them are written as a stepped range.
+
+    Ex:
+        [1, 2, 3, 5, 7, 9, 20]
+        ->
+        '1-3,5-9x2,20'
+
+    Args:
+        frames (FrameSet or iterable of int): Item numbers
+        separator (str, optional): String used between ranges
+
+    Returns:
+        str
+    """
+    if not isinstance(frames, FrameSet):
+        frames = FrameSet(frames)
+
+    tokens = []
+    singles = []
+
+    def flush():
+        index = 0
+        while index < len(singles):
+            last = index
+            if index + 2 < len(singles):
+                step = singles[index + 1] - singles[index]
+                while last + 1 < len(singles) and singles[last + 1] - singles[last] == step:
+                    last += 1
+            if last - index >= 2:
+                tokens.append('{0}-{1}x{2}'.format(singles[index], singles[last], step))
+                index = last + 1
+            else:
+                tokens.append(str(singles[index]))
+                index += 1
+        del singles[:]
+
+    for start, end, step in frames.segments:
+        if start == end or (step > 1 and end - start == step):
+            singles.extend(xrange(start, end + 1, step))
+            continue
+        flush()
+        if step == 1:
+            tokens.append('{0}-{1}'.format(start, end))
+        else:
+            tokens.append('{0}-{1}x{2}'.format(start, end, step))
+    flush()
+    return separator.join(tokens)
@@ -1,19 +1,34 @@
 #!/usr/bin/env python
 import sys
 import os
-from fnmatch import fnmatch
+import re
+import errno
+import shutil
+import ctypes
+import threading
+import ctypes.util
+from fnmatch import translate
 import scandir
 
 _OS = None
 
+# Bytes copied per system call by copy_file
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# Errors of the kernel copy calls that mean they can't copy these files
+_KERNEL_COPY_UNSUPPORTED = frozenset([errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF])
+_KERNEL_COPY = None
+
 
 __all__ = [
     'get_os',
     'path_normalize',
     'path_contains',
     'join_paths',
+    'compile_filter',
     'filter_item',
     'get_folder_contents',
+    'copy_file',
+    'LRUCache',
 ]
 
 
@@ -89,27 +104,258 @@ def join_paths(*paths):
     return os.path.join(*paths).replace('\\', '/')
 
 
+def compile_filter(include=None, exclude=None, extensions=None):
+    """
+    Compile glob filters on names into a single regex
+
+    Patterns are matched like fnmatch, case insensitive on platforms
+    with case insensitive paths.
+
+    Args:
+        include (list of str, optional): Names must match one of these patterns
+        exclude (list of str, optional): Names must not match any of these patterns
+        extensions (list of str, optional): Names must end with one of these extensions, with or without the period
+
+    Returns:
+        callable: Returns a match for names that pass the filters and None for others
+            None if nothing is filtered
+    """
+    parts = []
+    if exclude:
+        parts.append('(?!(?:{0})\\Z)'.format('|'.join(_translate_glob(p) for p in exclude)))
+    if extensions:
+        parts.append('(?=.*\\.(?:{0})\\Z)'.format('|'.join(re.escape(e.lstrip('.')) for e in extensions)))
+    if include is not None:
+        if not include:
+            # Nothing can pass
+            parts.append('(?!)')
+        elif '*' not in include:
+            parts.append('(?:{0})\\Z'.format('|'.join(_translate_glob(p) for p in include)))
+    if not parts:
+        return None
+    flags = re.DOTALL
+    if os.path.normcase('A') != 'A':
+        flags |= re.IGNORECASE
+    return re.compile(''.join(parts), flags).match
+
+
+def _translate_glob(pattern):
+    """
+    Regex for a glob pattern without the end anchor and flags added by fnmatch
+    """
+    result = translate(pattern)
+    for suffix in ('\\Z(?ms)', '\\Z'):
+        if result.endswith(suffix):
+            return result[:-len(suffix)]
+    return result
+
+
 def filter_item(item, include=['*'], exclude=[]):
     """
     Return True if the given item passes the given filters, False if it doesn't
 
-    `key` - can be given an attrgetter or itemgetter to be used on item
+    The filters are compiled with compile_filter once and reused for the same patterns.
     """
-    if not any([fnmatch(item, p) for p in include]):
-        return False
-    if any([fnmatch(item, p) for p in exclude]):
-        return False
-    return True
+    key = (tuple(include), tuple(exclude))
+    nameFilter = _FILTER_CACHE.get(key, _FILTER_CACHE)
+    if nameFilter is _FILTER_CACHE:
+        nameFilter = compile_filter(include=include, exclude=exclude)
+        _FILTER_CACHE.set(key, nameFilter)
+    return nameFilter is None or nameFilter(item) is not None
 
 
 def get_folder_contents(path, includeFiles=True, includeDirs=True, **kwargs):
+    """
+    Paths directly under a folder
+
+    Kwargs are passed to compile_filter and matched against the names
+    before they are joined to the folder.
+    """
     paths = []
+    nameFilter = compile_filter(**kwargs)
     if os.path.isdir(path):
         for entry in scandir.scandir(path):
+            if nameFilter is not None and not nameFilter(entry.name):
+                continue
             if not includeFiles and entry.is_file():
                 continue
             if not includeDirs and entry.is_dir():
                 continue
-            if filter_item(entry.name, **kwargs):
-                paths.append(join_paths(path, entry.name))
+            paths.append(join_paths(path, entry.name))
     return paths
+
+
+def copy_file(source, destination, copyStat=True):
+    """
+    Copy a file without reading it into python
+
+    The data is copied by the kernel with copy_file_range or sendfile
+    where they're available, the GIL is released while they run.
+    Otherwise it's copied in large chunks.
+
+    Args:
+        source (str): File to copy
+        destination (str): File to create or replace
+        copyStat (bool, optional): Whether to copy the permissions and times like shutil.copy2
+    """
+    with open(source, 'rb') as sourceFile:
+        with open(destination, 'wb') as destinationFile:
+            if not _kernel_copy(sourceFile.fileno(), destinationFile.fileno()):
+                shutil.copyfileobj(sourceFile, destinationFile, COPY_CHUNK_SIZE)
+    if copyStat:
+        shutil.copystat(source, destination)
+
+
+def _get_kernel_copy():
+    """
+    libc copy_file_range and sendfile, None for the ones that aren't available
+    """
+    global _KERNEL_COPY
+    if _KERNEL_COPY is None:
+        copyRange = sendFile = None
+        if get_os() == 'linux':
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            except OSError:
+                libc = None
+            if hasattr(libc, 'copy_file_range'):
+                copyRange = libc.copy_file_range
+                copyRange.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint]
+                copyRange.restype = ctypes.c_ssize_t
+            if hasattr(libc, 'sendfile'):
+                sendFile = libc.sendfile
+                sendFile.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t]
+                sendFile.restype = ctypes.c_ssize_t
+        _KERNEL_COPY = (copyRange, sendFile)
+    return _KERNEL_COPY
+
+
+def _kernel_copy(sourceFd, destinationFd):
+    """
+    Copy the rest of a file between file descriptors in the kernel
+
+    Returns:
+        bool: False if the kernel can't copy these files and nothing was copied
+    """
+    copyRange, sendFile = _get_kernel_copy()
+    calls = []
+    if copyRange is not None:
+        calls.append(lambda: copyRange(sourceFd, None, destinationFd, None, COPY_CHUNK_SIZE, 0))
+    if sendFile is not None:
+        calls.append(lambda: sendFile(destinationFd, sourceFd, None, COPY_CHUNK_SIZE))
+    for call in calls:
+        copied = 0
+        while True:
+            result = call()
+            if result < 0:
+                code = ctypes.get_errno()
+                if code == errno.EINTR:
+                    continue
+                if not copied and code in _KERNEL_COPY_UNSUPPORTED:
+                    break
+                raise OSError(code, os.strerror(code))
+            if result == 0:
+                return True
+            copied += result
+    return False
+
+
+class LRUCache(object):
+    """
+    Bounded mapping that discards the least recently used entry when full
+
+    Lookups are counted in `hits` and `misses`. The cache can be shared
+    between threads, lookups and updates hold a lock.
+
+    Args:
+        maxSize (int): Maximum number of entries to keep
+    """
+    def __init__(self, maxSize=128):
+        if maxSize < 1:
+            raise ValueError("Cache size must be at least 1, got {0}".format(maxSize))
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Entries are kept in a circular linked list, oldest first
+        # Each link is [previous, next, key, value]
+        self._links = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+
+    def __len__(self):
+        return len(self._links)
+
+    def __contains__(self, key):
+        return key in self._links
+
+    def get(self, key, default=None):
+        """
+        Value stored for key, marking it as the most recently used
+        """
+        with self._lock:
+            link = self._links.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            if self._root[0] is not link:
+                self._unlink(link)
+                self._append(link)
+            return link[3]
+
+    def set(self, key, value):
+        """
+        Store value for key, discarding the least recently used entry if the cache is full
+        """
+        with self._lock:
+            link = self._links.get(key)
+            if link is not None:
+                self._unlink(link)
+            elif len(self._links) >= self.maxSize:
+                oldest = self._root[1]
+                self._unlink(oldest)
+                del self._links[oldest[2]]
+            link = [None, None, key, value]
+            self._links[key] = link
+            self._append(link)
+
+    def clear(self):
+        """
+        Remove all entries and reset the counters
+        """
+        with self._lock:
+            self._links.clear()
+            self._root[:] = [self._root, self._root, None, None]
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Cache statistics
+
+        Returns:
+            dict: hits, misses, size and maxSize
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._links),
+            'maxSize': self.maxSize,
+        }
+
+    def _unlink(self, link):
+        previous, following = link[0], link[1]
+        previous[1] = following
+        following[0] = previous
+
+    def _append(self, link):
+        root = self._root
+        last = root[0]
+        last[1] = root[0] = link
+        link[0] = last
+        link[1] = root
+
+
+# Compiled filters of filter_item
+_FILTER_CACHE = LRUCache(64)
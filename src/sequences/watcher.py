@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+import os
+import sys
+import stat
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+
+from utils import get_os, join_paths
+from frameset import FrameSet, parse_frame_range
+
+LOG = logging.getLogger(__name__)
+
+
+__all__ = [
+    'SequenceWatcher',
+]
+
+
+# Event masks from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+REMOVED_MASK = IN_MOVED_FROM | IN_DELETE
+FOLDER_GONE_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+# struct inotify_event without the name that follows it
+_EVENT_HEADER = struct.Struct('iIII')
+_READ_SIZE = 64 * 1024
+
+_LIBC = None
+
+
+def _get_libc():
+    global _LIBC
+    if _LIBC is None:
+        if get_os() != 'linux':
+            raise OSError("inotify is only available on linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _LIBC = libc
+    return _LIBC
+
+
+def _check_result(result):
+    if result < 0:
+        code = ctypes.get_errno()
+        raise OSError(code, os.strerror(code))
+    return result
+
+
+def _is_link(path):
+    """
+    Whether a path is a symlink or a hardlink, which get no close event after writing
+    """
+    try:
+        pathStat = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISLNK(pathStat.st_mode) or pathStat.st_nlink > 1
+
+
+class _WatchedSequence(object):
+    __slots__ = ('sequence', 'expected', 'missing')
+
+    def __init__(self, sequence, expected):
+        self.sequence = sequence
+        self.expected = expected
+        self.missing = None
+
+
+class SequenceWatcher(object):
+    """
+    Sequence Watcher
+
+    Keeps the items of file sequences up to date from inotify events on their
+    folders, so sequences that are still being written are followed without
+    scanning their folders again. Linux only.
+
+    Events are read by process_events or run, callbacks are called from there.
+
+    Args:
+        addedCB (callable, optional): Called with (sequence, item number) when an item is added
+        removedCB (callable, optional): Called with (sequence, item number) when an item is removed
+        completeCB (callable, optional): Called with (sequence) when a sequence has every expected item
+        waitForClose (bool, optional): Add items once they are closed after writing or moved into the folder
+            If False items are added as soon as they are created. Hardlinks and symlinks
+            are never written, they are always added once created.
+
+    Raises:
+        OSError: if inotify is not available
+    """
+
+    def __init__(self, addedCB=None, removedCB=None, completeCB=None, waitForClose=True):
+        self._libc = _get_libc()
+        self._fd = _check_result(self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+        self.addedCB = addedCB
+        self.removedCB = removedCB
+        self.completeCB = completeCB
+        self._addedMask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if not waitForClose:
+            self._addedMask |= IN_CREATE
+        # Keys are watch descriptors and values are (folder, list of _WatchedSequence)
+        self._watches = {}
+        self._folders = {}
+        self._stopped = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def fileno(self):
+        """
+        File descriptor to wait on for events, it's readable when events are pending
+        """
+        return self._fd
+
+    @property
+    def sequences(self):
+        """
+        List of the watched sequences
+        """
+        return [w.sequence for folder, watched in self._watches.values() for w in watched]
+
+    def add(self, sequence, expected=None):
+        """
+        Start watching a sequence
+
+        The sequence is loaded or refreshed once the folder is watched,
+        so no item written in between is missed.
+
+        Args:
+            sequence (FileSequence): Sequence to keep up to date
+            expected (FrameSet or str or list of int, optional): Item numbers the sequence is complete with
+                A string is parsed as a frame range expression. completeCB is called once
+                every expected item exists, right away if it already does.
+        """
+        if isinstance(expected, basestring):
+            expected = parse_frame_range(expected)
+        elif expected is not None and not isinstance(expected, FrameSet):
+            expected = FrameSet(expected)
+
+        folder = sequence.folder
+        wd = self._folders.get(folder)
+        if wd is None:
+            encodedFolder = folder
+            if isinstance(encodedFolder, unicode):
+                encodedFolder = encodedFolder.encode(sys.getfilesystemencoding())
+            wd = _check_result(self._libc.inotify_add_watch(self._fd, encodedFolder, WATCH_MASK))
+            self._folders[folder] = wd
+            self._watches[wd] = (folder, [])
+        watched = _WatchedSequence(sequence, expected)
+        self._watches[wd][1].append(watched)
+
+        if sequence.built:
+            self._apply_refresh(watched)
+        else:
+            sequence.items
+        if expected is not None:
+            items = sequence.items
+            watched.missing = FrameSet([n for n in expected if n not in items])
+            if not watched.missing and self.completeCB is not None:
+                self.completeCB(sequence)
+
+    def remove(self, sequence):
+        """
+        Stop watching a sequence
+
+        Raises:
+            ValueError: if the sequence is not watched
+        """
+        for wd, (folder, watched) in self._watches.items():
+            for w in watched:
+                if w.sequence is sequence:
+                    watched.remove(w)
+                    if not watched:
+                        self._remove_watch(wd)
+                    return
+        raise ValueError("Sequence is not watched: {0}".format(sequence))
+
+    def process_events(self, timeout=0):
+        """
+        Apply pending events to the watched sequences
+
+        Args:
+            timeout (float, optional): Seconds to wait for events, None waits until there are some
+
+        Returns:
+            int: Number of events read
+        """
+        try:
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+        except select.error, e:
+            if e.args[0] == errno.EINTR:
+                return 0
+            raise
+        if not readable:
+            return 0
+
+        count = 0
+        while True:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except OSError, e:
+                if e.errno in (errno.EAGAIN, errno.EINTR):
+                    break
+                raise
+            offset = 0
+            headerSize = _EVENT_HEADER.size
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += headerSize
+                name = data[offset:offset + length].rstrip('\0')
+                offset += length
+                self._handle_event(wd, mask, name)
+                count += 1
+        return count
+
+    def run(self, pollInterval=1.0):
+        """
+        Process events until stop is called
+
+        Args:
+            pollInterval (float, optional): Seconds between checks for stop
+        """
+        self._stopped = False
+        while not self._stopped and self._watches:
+            self.process_events(pollInterval)
+
+    def stop(self):
+        """
+        Make run return, can be called from a callback or another thread
+        """
+        self._stopped = True
+
+    def close(self):
+        """
+        Remove all the watches and close the inotify instance
+        """
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        self._fd = None
+        self._watches = {}
+        self._folders = {}
+
+    def _remove_watch(self, wd):
+        folder, watched = self._watches.pop(wd)
+        del self._folders[folder]
+        # Fails if the folder is already gone
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            LOG.warning("Watcher event queue overflowed, refreshing all watched sequences")
+            for folder, watched in self._watches.values():
+                for w in watched:
+                    self._apply_refresh(w)
+            return
+
+        watch = self._watches.get(wd)
+        if watch is None:
+            return
+        folder, watched = watch
+
+        if mask & FOLDER_GONE_MASK:
+            # Folder was removed or moved, the sequences lose every item
+            for w in watched:
+                self._apply_refresh(w)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd)
+                del self._folders[folder]
+            return
+        if mask & IN_ISDIR:
+            return
+
+        if mask & self._addedMask:
+            added = True
+        elif mask & REMOVED_MASK:
+            added = False
+        elif mask & IN_CREATE:
+            # Only links, they are complete once created
+            added = None
+        else:
+            return
+        if isinstance(folder, unicode):
+            name = name.decode(sys.getfilesystemencoding())
+        path = join_paths(folder, name)
+        for w in watched:
+            members, numbers = w.sequence.extract_numbers([path])
+            if not numbers:
+                continue
+            if added is None:
+                added = _is_link(path)
+                if not added:
+                    return
+            if added:
+                self._add_item(w, numbers[0], path)
+            else:
+                self._remove_item(w, numbers[0])
+
+    def _add_item(self, watched, number, path):
+        items = watched.sequence.items
+        if number in items:
+            return
+        items[number] = path
+        if self.addedCB is not None:
+            self.addedCB(watched.sequence, number)
+        if watched.missing and number in watched.missing:
+            watched.missing.discard(number)
+            if not watched.missing and self.completeCB is not None:
+                self.completeCB(watched.sequence)
+
+    def _remove_item(self, watched, number):
+        items = watched.sequence.items
+        if number not in items:
+            return
+        del items[number]
+        if self.removedCB is not None:
+            self.removedCB(watched.sequence, number)
+        if watched.expected is not None and number in watched.expected:
+            watched.missing.add(number)
+
+    def _apply_refresh(self, watched):
+        """
+        Refresh a sequence from disk and call the callbacks for the changes
+        """
+        sequence = watched.sequence
+        added, removed = sequence.refresh()
+        for number in removed:
+            if self.removedCB is not None:
+                self.removedCB(sequence, number)
+            if watched.missing is not None and number in watched.expected:
+                watched.missing.add(number)
+        for number in added:
+            if self.addedCB is not None:
+                self.addedCB(sequence, number)
+            if watched.missing and number in watched.missing:
+                watched.missing.discard(number)
+                if not watched.missing and self.completeCB is not None:
+                    self.completeCB(sequence)
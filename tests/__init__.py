@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
 
 import test_filestructure             # NOQA
+import test_frameset                  # NOQA
 import test_sequences                 # NOQA
+import test_watcher                   # NOQA
@@ -0,0 +1,254 @@
+import unittest
+
+import sequences
+
+
+class TestFrameSet(unittest.TestCase):
+
+    def test_runs(self):
+        frames = sequences.FrameSet([5, 1, 2, 3, 10, 11, 3])
+        self.assertEqual(frames.runs, [(1, 3), (5, 5), (10, 11)])
+        self.assertEqual(len(frames), 6)
+        self.assertEqual(list(frames), [1, 2, 3, 5, 10, 11])
+        self.assertEqual(list(reversed(frames)), [11, 10, 5, 3, 2, 1])
+
+    def test_from_runs(self):
+        frames = sequences.FrameSet.from_runs([(10, 20), (1, 5), (4, 8), (21, 21)])
+        self.assertEqual(frames.runs, [(1, 8), (10, 21)])
+        self.assertEqual(len(frames), 20)
+        self.assertRaises(ValueError, sequences.FrameSet.from_runs, [(5, 1)])
+
+    def test_contains(self):
+        frames = sequences.FrameSet.from_runs([(1, 100), (200, 300)])
+        self.assertIn(1, frames)
+        self.assertIn(250, frames)
+        self.assertNotIn(0, frames)
+        self.assertNotIn(150, frames)
+        self.assertNotIn(301, frames)
+        self.assertNotIn('1', frames)
+
+    def test_add(self):
+        frames = sequences.FrameSet([1, 3])
+        frames.add(5)
+        self.assertEqual(frames.runs, [(1, 1), (3, 3), (5, 5)])
+        frames.add(2)
+        self.assertEqual(frames.runs, [(1, 3), (5, 5)])
+        frames.add(4)
+        self.assertEqual(frames.runs, [(1, 5)])
+        frames.add(0)
+        frames.add(3)
+        self.assertEqual(frames.runs, [(0, 5)])
+        self.assertEqual(len(frames), 6)
+
+    def test_discard(self):
+        frames = sequences.FrameSet(range(1, 11))
+        frames.discard(5)
+        self.assertEqual(frames.runs, [(1, 4), (6, 10)])
+        frames.discard(1)
+        frames.discard(10)
+        frames.discard(50)
+        self.assertEqual(frames.runs, [(2, 4), (6, 9)])
+        self.assertEqual(len(frames), 7)
+        self.assertRaises(KeyError, frames.remove, 5)
+
+    def test_missing(self):
+        frames = sequences.FrameSet([1, 2, 5, 9])
+        self.assertEqual(frames.gaps, [(3, 4), (6, 8)])
+        self.assertEqual(list(frames.missing()), [3, 4, 6, 7, 8])
+
+    def test_first_last(self):
+        frames = sequences.FrameSet()
+        self.assertIsNone(frames.first)
+        self.assertIsNone(frames.last)
+        frames.update([7, 3, 9])
+        self.assertEqual(frames.first, 3)
+        self.assertEqual(frames.last, 9)
+
+    def test_positions(self):
+        frames = sequences.FrameSet.from_runs([(1, 3), (10, 12), (20, 20)])
+        self.assertEqual([frames.at(i) for i in range(len(frames))], list(frames))
+        self.assertEqual(frames.at(-1), 20)
+        self.assertRaises(IndexError, frames.at, 7)
+        self.assertEqual(frames.index(11), 4)
+        self.assertRaises(ValueError, frames.index, 5)
+
+    def test_neighbours(self):
+        frames = sequences.FrameSet.from_runs([(1, 3), (10, 12)])
+        self.assertEqual(frames.after(2), 3)
+        self.assertEqual(frames.after(3), 10)
+        self.assertEqual(frames.after(5), 10)
+        self.assertIsNone(frames.after(12))
+        self.assertEqual(frames.before(10), 3)
+        self.assertEqual(frames.before(12), 11)
+        self.assertIsNone(frames.before(1))
+
+    def test_numbers_cache(self):
+        frames = sequences.FrameSet([1, 2, 3])
+        numbers = frames.numbers
+        self.assertEqual(numbers.tolist(), [1, 2, 3])
+        self.assertIs(frames.numbers, numbers)
+        frames.add(5)
+        self.assertEqual(frames.numbers.tolist(), [1, 2, 3, 5])
+        self.assertEqual(frames.at(3), 5)
+        frames.discard(2)
+        self.assertEqual(frames.numbers.tolist(), [1, 3, 5])
+        self.assertEqual(frames.at(1), 3)
+
+    def test_set_operations(self):
+        a = sequences.FrameSet(range(1, 11))
+        b = sequences.FrameSet(range(5, 16))
+        self.assertEqual(a & b, sequences.FrameSet(range(5, 11)))
+        self.assertEqual(a | b, sequences.FrameSet(range(1, 16)))
+        self.assertEqual(a, set(range(1, 11)))
+
+
+class TestSteppedFrameSet(unittest.TestCase):
+
+    def test_from_segments(self):
+        frames = sequences.FrameSet.from_segments([(1, 10, 2), (20, 30, 1)])
+        self.assertEqual(frames.segments, [(1, 9, 2), (20, 30, 1)])
+        self.assertEqual(len(frames), 16)
+        self.assertEqual(list(frames), [1, 3, 5, 7, 9] + range(20, 31))
+        self.assertEqual(frames.runs, [(1, 1), (3, 3), (5, 5), (7, 7), (9, 9), (20, 30)])
+        self.assertIn(7, frames)
+        self.assertNotIn(8, frames)
+
+    def test_overlapping_segments(self):
+        frames = sequences.FrameSet.from_segments([(1, 10, 1), (5, 15, 2)])
+        self.assertEqual(list(frames), range(1, 12) + [13, 15])
+
+    def test_positions(self):
+        frames = sequences.FrameSet.from_segments([(1, 9, 2), (20, 22, 1)])
+        self.assertEqual([frames.at(i) for i in range(len(frames))], list(frames))
+        self.assertEqual(frames.index(7), 3)
+        self.assertEqual(frames.after(4), 5)
+        self.assertEqual(frames.after(9), 20)
+        self.assertEqual(frames.before(8), 7)
+        self.assertEqual(frames.before(20), 9)
+
+    def test_mutation(self):
+        frames = sequences.FrameSet.from_segments([(1, 9, 2)])
+        frames.add(4)
+        frames.discard(7)
+        self.assertEqual(list(frames), [1, 3, 4, 5, 9])
+        self.assertEqual(frames, sequences.FrameSet([1, 3, 4, 5, 9]))
+        frames.update([2])
+        self.assertEqual(frames.runs, [(1, 5), (9, 9)])
+
+    def test_mutation_joins_runs(self):
+        frames = sequences.parse_frame_range('1-5x2')
+        frames.add(2)
+        frames.add(4)
+        self.assertEqual(frames.segments, [(1, 5, 1)])
+        self.assertEqual(frames.runs, [(1, 5)])
+        self.assertEqual(frames, sequences.FrameSet([1, 2, 3, 4, 5]))
+        self.assertEqual(str(frames), '1-5')
+
+        frames = sequences.parse_frame_range('1-9x2,20')
+        frames.discard(20)
+        frames.add(11)
+        frames.add(10)
+        frames.discard(10)
+        self.assertEqual(frames.segments, [(1, 11, 2)])
+        self.assertEqual(str(frames), '1-11x2')
+
+
+class TestFrameRange(unittest.TestCase):
+
+    def test_parse(self):
+        frames = sequences.parse_frame_range('1-100x2, 150,200-210')
+        self.assertEqual(frames.segments, [(1, 99, 2), (150, 150, 1), (200, 210, 1)])
+        self.assertEqual(len(frames), 62)
+
+    def test_parse_negative(self):
+        frames = sequences.parse_frame_range('-10--8,-1-1')
+        self.assertEqual(list(frames), [-10, -9, -8, -1, 0, 1])
+
+    def test_parse_invalid(self):
+        for expression in ('1-', 'a', '10-1', '1-10x0', '1x2'):
+            self.assertRaises(ValueError, sequences.parse_frame_range, expression)
+
+    def test_parse_large(self):
+        frames = sequences.parse_frame_range('1-10000000,20000001-40000000x2')
+        self.assertEqual(len(frames), 20000000)
+        self.assertEqual(len(frames.segments), 2)
+        self.assertEqual(frames.at(-1), 39999999)
+
+    def test_parse_large_overlapping(self):
+        frames = sequences.parse_frame_range('1-10000000,5')
+        self.assertEqual(frames.segments, [(1, 10000000, 1)])
+        frames = sequences.parse_frame_range('1-5000000,2500000-10000000,20-9000000x3')
+        self.assertEqual(frames.segments, [(1, 10000000, 1)])
+        frames = sequences.parse_frame_range('1-10000000x2,5-30000001x2,10000001-10000003')
+        self.assertEqual(len(frames), 15000002)
+        self.assertEqual(frames.segments, [(1, 9999999, 2), (10000001, 10000003, 1), (10000005, 30000001, 2)])
+        self.assertEqual(list(sequences.parse_frame_range('1-10x2,2-10x4')), [1, 2, 3, 5, 6, 7, 9, 10])
+        self.assertRaises(ValueError, sequences.parse_frame_range, '1-10000000x2,2-10000000x2')
+
+    def test_format(self):
+        self.assertEqual(sequences.format_frame_range([1, 2, 3, 5, 7, 9, 20, 22]), '1-3,5-9x2,20,22')
+        self.assertEqual(sequences.format_frame_range([-3, -2, -1]), '-3--1')
+        self.assertEqual(sequences.format_frame_range([]), '')
+        self.assertEqual(sequences.format_frame_range([1, 5], separator=', '), '1, 5')
+
+    def test_round_trip(self):
+        for expression in ('1-99x2,150,200-210', '-20--10x5,0', '1-3,10-40x10'):
+            frames = sequences.parse_frame_range(expression)
+            self.assertEqual(str(frames), expression)
+            self.assertEqual(sequences.parse_frame_range(str(frames)), frames)
+
+
+class TestFrameMap(unittest.TestCase):
+
+    def test_ordering(self):
+        items = sequences.FrameMap({3: 'c', 1: 'a', 2: 'b'})
+        self.assertEqual(items.keys(), [1, 2, 3])
+        self.assertEqual(items.values(), ['a', 'b', 'c'])
+        self.assertEqual(items.frames.runs, [(1, 3)])
+
+    def test_mutation(self):
+        items = sequences.FrameMap()
+        items[5] = 'e'
+        items[1] = 'a'
+        items[5] = 'E'
+        self.assertEqual(items.items(), [(1, 'a'), (5, 'E')])
+        del items[1]
+        self.assertEqual(items.keys(), [5])
+        self.assertRaises(KeyError, items.__delitem__, 1)
+        items.update([(6, 'f')])
+        self.assertEqual(items.frames.runs, [(5, 6)])
+        items.clear()
+        self.assertEqual(len(items), 0)
+
+
+class TestTemplateFrameMap(unittest.TestCase):
+
+    def test_generated_items(self):
+        items = sequences.TemplateFrameMap('item.{0:03d}'.format, numbers=[3, 1, 2])
+        self.assertEqual(items.keys(), [1, 2, 3])
+        self.assertEqual(items.values(), ['item.001', 'item.002', 'item.003'])
+        self.assertEqual(items[2], 'item.002')
+        self.assertRaises(KeyError, items.__getitem__, 4)
+
+    def test_mutation(self):
+        items = sequences.TemplateFrameMap('item.{0:03d}'.format)
+        items.update({5: None, 6: None})
+        items[7] = 'item.007'
+        self.assertRaises(ValueError, items.__setitem__, 8, 'other.008')
+        del items[5]
+        self.assertEqual(items.items(), [(6, 'item.006'), (7, 'item.007')])
+
+    def test_bulk_template(self):
+        calls = []
+
+        def bulk(numbers):
+            calls.append(numbers)
+            return ('bulk.{0}'.format(n) for n in numbers)
+
+        items = sequences.TemplateFrameMap('item.{0}'.format, numbers=[1, 2], bulkTemplate=bulk)
+        self.assertEqual(items.values(), ['bulk.1', 'bulk.2'])
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
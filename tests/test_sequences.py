@@ -1,4 +1,8 @@
 import os
+import time
+import shutil
+import tempfile
+import threading
 import unittest
 
 import sequences
@@ -345,6 +349,14 @@ class TestAbstractSequence(unittest.TestCase):
         seq = self.sequenceClass(seqStr, seqStrItems, skipValidate=True)
         self.assertEqual(seq.get_previous_item(), None)
 
+    def test_get_next_previous_item_missing(self):
+        seqStr = 'aaa010.0001'
+        seqStrItems = ['aaa010.0001', 'aaa010.0002', 'aaa010.0005']
+        seq = self.sequenceClass(seqStr, seqStrItems)
+        self.assertEqual(seq.get_next_item(2), 'aaa010.0005')
+        self.assertEqual(seq.get_previous_item(5), 'aaa010.0002')
+        self.assertRaises(ValueError, seq.get_next_item, 3)
+
     def test_sequence_items(self):
         seqStr = 'aaa010.####'
         seqStrItems = ['aaa010.0001', 'aaa010.0002', 'aaa010.0003']
@@ -449,6 +461,14 @@ class TestAbstractSequence(unittest.TestCase):
         seq = self.sequenceClass(seqStr, seqStrItems)
         self.assertEqual(seq.range, [[1, 3]])
 
+    def test_missing(self):
+        seqStr = 'aaa010.####'
+        seqStrItems = ['aaa010.0007', 'aaa010.0001', 'aaa010.0002', 'aaa010.0005']
+        seq = self.sequenceClass(seqStr, seqStrItems)
+        self.assertEqual(seq.range, [[1, 2], [5], [7]])
+        self.assertEqual(seq.missing, [3, 4, 6])
+        self.assertEqual(seq.frameRange, '1-2,5,7')
+
     def test_input_formats(self):
         seqStr = '0001'
         seq = self.sequenceClass(seqStr)
@@ -480,6 +500,11 @@ class TestBaseSequence(unittest.TestCase):
         path = '/path/to/non_existant_file.txt'
         self.assertRaises(ValueError, self.sequenceClass, path)
 
+    def test_plan_rename(self):
+        seq = self.sequenceClass('aaa010.####', ['aaa010.0001', 'aaa010.0002'])
+        self.assertRaises(ValueError, seq.plan_rename, startFrame=5)
+        self.assertRaises(ValueError, seq.rename, padding=5)
+
     def test_delitem(self):
         seqStr = 'aaa010.####'
         seqStrItems = ['aaa010.0003', 'aaa010.0001', 'aaa010.0002', 'aaa010.0005', 'aaa010.0007']
@@ -620,6 +645,702 @@ class TestFileSequence(unittest.TestCase):
         seq = sequences.FileSequence(path, skipValidate=True)
         self.assertFalse(seq.isInPerforce(seq.sourceFile))
 
+    def test_paths_for(self):
+        path = os.path.join(TEST_FILES_PATH, 'VersionSequence', 'TestFile_v01.001.jpg')
+        seq = sequences.FileSequence(path)
+        numbers = [-12, -1, 0, 1, 99, 100, 101, 999, 1000, 12345]
+        for padding in (None, 1, 2, 3, 5):
+            expected = [seq.get_path(n, padding=padding) for n in numbers]
+            self.assertEqual(list(seq.paths_for(numbers, padding=padding)), expected)
+
+    def test_extract_numbers(self):
+        seq = sequences.FileSequence('/show/aaa010.0001.exr', validateExists=False)
+        paths = [
+            '/show/aaa010.0002.exr',
+            '/show/aaa010.0003.png',
+            '/show/aaa010.00040.exr',
+            '/show/aaa010.00a5.exr',
+            '/show/aaa020.0006.exr',
+            u'/show/aaa010.0007.exr',
+            '/show/aaa010.1008.exr',
+        ]
+        mask, numbers = seq.extract_numbers(paths, useNumpy=False)
+        self.assertEqual(mask, [True, False, False, False, False, True, True])
+        self.assertEqual(numbers, [2, 7, 1008])
+
+    @unittest.skipIf(sequences.core.numpy is None, "NumPy is not installed")
+    def test_extract_numbers_numpy(self):
+        seq = sequences.FileSequence('/show/aaa010.0001.exr', validateExists=False)
+        paths = ['/show/aaa010.{0:04d}.exr'.format(i) for i in range(0, 3000, 7)]
+        paths += ['/show/aaa010.{0:05d}.exr'.format(i) for i in range(5)]
+        paths += ['/show/aaa010.0001.exr.bak', '/show/aaa010.001.exr', '/show/aaa010.0a01.exr', '/show/bbb010.0001.exr']
+        expected = seq.extract_numbers(paths, useNumpy=False)
+        mask, numbers = seq.extract_numbers(paths, useNumpy=True)
+        self.assertEqual(mask.tolist(), expected[0])
+        self.assertEqual(numbers.tolist(), expected[1])
+
+        # Strings that aren't ascii fall back to the python implementation
+        paths.append(u'/show/aaa010.0001.\xe9xr')
+        mask, numbers = seq.extract_numbers(paths, useNumpy=True)
+        self.assertEqual(mask, expected[0] + [False])
+
+        # Shorter and longer strings whose lengths add up to whole rows
+        paths = []
+        for i in range(1000):
+            paths += ['/show/abc.{0:04d}.exr'.format(i), '/show/aaa010.{0:04d}.exr'.format(i), '/show/aaa010_v2.{0:04d}.exr'.format(i)]
+        mask, numbers = seq.extract_numbers(paths, useNumpy=True)
+        self.assertEqual(mask.tolist(), seq.extract_numbers(paths, useNumpy=False)[0])
+        self.assertEqual(numbers.tolist(), range(1000))
+
+    def test_compact_state(self):
+        path = os.path.join(TEST_FILES_PATH, 'VersionSequence', 'TestFile_v01.001.jpg')
+        seq = sequences.ImageSequence(path)
+        self.assertIsNone(seq._sequence_items)
+        self.assertEqual(seq.numbers, [1, 2, 3])
+        self.assertEqual(seq.prefix, seq.string[:-8])
+        self.assertEqual(vars(seq), {})
+        self.assertEqual(vars(seq.items), {})
+
+    def test_template_items(self):
+        path = os.path.join(TEST_FILES_PATH, 'VersionSequence', 'TestFile_v01.001.jpg')
+        path = sequences.utils.path_normalize(path)
+        seq = sequences.FileSequence(path)
+        self.assertIsInstance(seq.items, sequences.TemplateFrameMap)
+        self.assertEqual(seq.paths, [seq.get_path(n) for n in (1, 2, 3)])
+        self.assertEqual(seq[1], path)
+        self.assertRaises(KeyError, seq.__getitem__, 4)
+
+    def test_directory_index(self):
+        folder = os.path.join(TEST_FILES_PATH, 'VersionSequence')
+        names = ('TestFile_v01.001.jpg', 'TestFile_v02.002.jpg', 'TestFile_v06_asdf.003.jpg', 'TestFile_v04.001.py')
+        expected = [sequences.FileSequence(os.path.join(folder, n)).paths for n in names]
+        counter = sequences.core.SYSCALL_COUNTER
+        index = sequences.DirectoryIndex(folder)
+        for name, paths in zip(names, expected):
+            seq = sequences.FileSequence(os.path.join(folder, name), directoryIndex=index)
+            self.assertEqual(seq.paths, paths)
+        self.assertEqual(len(index), 19)
+        # One scan for all the sequences in the folder
+        self.assertEqual(sequences.core.SYSCALL_COUNTER - counter, 1)
+
+    def test_directory_index_formats(self):
+        folder = tempfile.mkdtemp()
+        try:
+            for number in (1, 2, 3):
+                open(os.path.join(folder, 'shot.{0:05d}.exr'.format(number)), 'w').close()
+            index = sequences.DirectoryIndex(folder)
+            for name in ('shot.00001.exr', 'shot.#####.exr', 'shot.%05d.exr', 'shot.$F5.exr', 'shot.{item:05d}.exr'):
+                path = os.path.join(folder, name)
+                self.assertEqual(sequences.FileSequence(path).numbers, [1, 2, 3])
+                self.assertEqual(sequences.FileSequence(path, directoryIndex=index).numbers, [1, 2, 3])
+        finally:
+            shutil.rmtree(folder)
+
+    def test_directory_index_wrong_folder(self):
+        index = sequences.DirectoryIndex(os.path.join(TEST_FILES_PATH, 'Sequences'))
+        path = os.path.join(TEST_FILES_PATH, 'VersionSequence', 'TestFile_v01.001.jpg')
+        seq = sequences.FileSequence(path, directoryIndex=index)
+        self.assertRaises(ValueError, len, seq)
+
+
+class TestFileSequenceRename(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for number in range(1, 11):
+            with open(self.path(number), 'w') as f:
+                f.write(str(number))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, number, padding=4):
+        return sequences.utils.join_paths(self.folder, 'render.{0:0{1}d}.exr'.format(number, padding))
+
+    def contents(self):
+        result = {}
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if os.path.isfile(path):
+                with open(path) as f:
+                    result[name] = f.read()
+        return result
+
+    def test_rename_padding(self):
+        seq = sequences.FileSequence(self.path(1))
+        progress = []
+        self.assertTrue(seq.rename(padding=5, workers=4, progressCB=lambda *args: progress.append(args)))
+        self.assertEqual(self.contents(), dict(('render.{0:05d}.exr'.format(n), str(n)) for n in range(1, 11)))
+        # New names don't overlap the old ones, no temporary names needed
+        self.assertEqual(progress[-1], (10, 10))
+        self.assertEqual(seq.padding, 5)
+        self.assertEqual(seq.numbers, range(1, 11))
+
+    def test_rename_overlapping(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.assertTrue(seq.rename(startFrame=5, workers=4))
+        self.assertEqual(self.contents(), dict(('render.{0:04d}.exr'.format(n + 4), str(n)) for n in range(1, 11)))
+        self.assertEqual(seq.numbers, range(5, 15))
+        self.assertTrue(seq.rename(startFrame=3))
+        self.assertEqual(self.contents(), dict(('render.{0:04d}.exr'.format(n + 2), str(n)) for n in range(1, 11)))
+
+    def test_rename_from_input_items(self):
+        seqs, singles = sequences.find_sequences(self.folder)
+        self.assertTrue(seqs[0].rename(startFrame=101))
+        self.assertEqual(seqs[0].numbers, range(101, 111))
+        self.assertEqual(seqs[0].paths, [self.path(n) for n in range(101, 111)])
+
+    def test_plan_rename(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.assertEqual(len(seq), 10)
+        expected = self.contents()
+        counter = sequences.core.SYSCALL_COUNTER
+        plan = seq.plan_rename(startFrame=6)
+        # A single listing of the folder
+        self.assertEqual(sequences.core.SYSCALL_COUNTER - counter, 1)
+        self.assertEqual(self.contents(), expected)
+        self.assertEqual(len(plan), 10)
+        self.assertEqual(plan.renames[0], (self.path(1), self.path(6)))
+        self.assertTrue(plan.twoPhase)
+        self.assertTrue(plan.valid)
+        self.assertEqual(plan.newSource, self.path(6))
+        self.assertFalse(seq.plan_rename(padding=5).twoPhase)
+        self.assertIsNone(seq.plan_rename(startFrame=1))
+
+        other = sequences.FileSequence(self.path(2))
+        self.assertRaises(ValueError, other.apply, plan)
+        self.assertTrue(seq.apply(plan, workers=4))
+        self.assertEqual(self.contents(), dict(('render.{0:04d}.exr'.format(n + 5), str(n)) for n in range(1, 11)))
+        self.assertRaises(ValueError, seq.apply, plan)
+
+    def test_rename_existing(self):
+        open(self.path(2, padding=5), 'w').close()
+        expected = self.contents()
+        seq = sequences.FileSequence(self.path(1))
+        self.assertEqual(seq.plan_rename(padding=5).collisions, [self.path(2, padding=5)])
+        self.assertFalse(seq.rename(padding=5))
+        self.assertEqual(self.contents(), expected)
+
+    def test_rename_undo(self):
+        expected = self.contents()
+        # Files can't replace a folder that isn't empty
+        os.mkdir(self.path(5, padding=5))
+        open(os.path.join(self.path(5, padding=5), 'file'), 'w').close()
+        seq = sequences.FileSequence(self.path(1))
+        self.assertFalse(seq.rename(padding=5, replace=True, workers=4))
+        self.assertEqual(self.contents(), expected)
+        self.assertEqual(seq.padding, 4)
+
+    def test_rename_journal(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.assertTrue(seq.rename(startFrame=6, journal=True))
+        # Removed once the renames are done
+        self.assertEqual(self.contents(), dict(('render.{0:04d}.exr'.format(n + 5), str(n)) for n in range(1, 11)))
+        self.assertEqual(sequences.RenameJournal.find(self.folder), [])
+
+    def crash_rename(self, seq, crashAfter, **kwargs):
+        # Interrupt the renames like a killed process, without undoing anything
+        rename = os.rename
+        calls = []
+
+        def crashingRename(src, dst):
+            if len(calls) == crashAfter:
+                raise KeyboardInterrupt()
+            calls.append(src)
+            rename(src, dst)
+
+        os.rename = crashingRename
+        try:
+            self.assertRaises(KeyboardInterrupt, seq.rename, journal=True, **kwargs)
+        finally:
+            os.rename = rename
+        journals = sequences.RenameJournal.find(self.folder)
+        self.assertEqual(len(journals), 1)
+        return journals[0]
+
+    def test_rename_journal_resume(self):
+        for crashAfter in (4, 13):
+            seq = sequences.FileSequence(self.path(1))
+            journal = self.crash_rename(seq, crashAfter, startFrame=6)
+            self.assertEqual(journal.resume(workers=4), self.path(6))
+            self.assertEqual(self.contents(), dict(('render.{0:04d}.exr'.format(n + 5), str(n)) for n in range(1, 11)))
+            # Back to the original names for the next crash
+            self.assertTrue(sequences.FileSequence(self.path(6)).rename(startFrame=1))
+
+    def test_rename_journal_rollback(self):
+        expected = self.contents()
+        for crashAfter, kwargs in ((4, {'startFrame': 6}), (13, {'startFrame': 6}), (6, {'padding': 5})):
+            seq = sequences.FileSequence(self.path(1))
+            journal = self.crash_rename(seq, crashAfter, **kwargs)
+            self.assertEqual(journal.rollback(), self.path(1))
+            self.assertEqual(self.contents(), expected)
+
+    def test_rename_journal_exists(self):
+        expected = self.contents()
+        journal = self.crash_rename(sequences.FileSequence(self.path(1)), 4, startFrame=6)
+        parked = self.contents()
+        # Renaming again would lose the items at temporary names
+        seq = sequences.FileSequence(self.path(5))
+        for kwargs in ({}, {'journal': True}):
+            self.assertRaises(ValueError, seq.rename, startFrame=20, **kwargs)
+        self.assertEqual(self.contents(), parked)
+        self.assertEqual([j.path for j in sequences.RenameJournal.find(self.folder)], [journal.path])
+        self.assertEqual(journal.rollback(), self.path(1))
+        self.assertEqual(self.contents(), expected)
+
+    def test_rename_journal_bytes(self):
+        # Names that aren't valid utf-8
+        for number in range(1, 4):
+            open(os.path.join(self.folder, 'caf\xe9.{0:04d}.exr'.format(number)), 'w').close()
+        path = os.path.join(self.folder, 'caf\xe9.0001.exr')
+        self.assertTrue(sequences.FileSequence(path).rename(startFrame=6, journal=True))
+        self.assertEqual(sequences.FileSequence(os.path.join(self.folder, 'caf\xe9.0006.exr')).numbers, [6, 7, 8])
+
+        seq = sequences.FileSequence(os.path.join(self.folder, 'caf\xe9.0006.exr'))
+        journal = self.crash_rename(seq, 2, startFrame=1)
+        self.assertEqual(journal.rollback(), os.path.join(self.folder, 'caf\xe9.0006.exr'))
+        journal = self.crash_rename(seq, 2, startFrame=1)
+        self.assertEqual(journal.resume(), path)
+        self.assertEqual(sequences.FileSequence(path).numbers, [1, 2, 3])
+
+    def test_rename_dryrun(self):
+        expected = self.contents()
+        seq = sequences.FileSequence(self.path(1))
+        self.assertTrue(seq.rename(padding=5, dryrun=True))
+        self.assertEqual(self.contents(), expected)
+        self.assertIsNone(seq.rename(padding=4))
+
+
+class TestFileSequenceCopy(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'source')
+        os.mkdir(self.source)
+        for number in range(1, 6):
+            with open(self.path(number), 'w') as f:
+                f.write(str(number) * number)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, number):
+        return sequences.utils.join_paths(self.source, 'render.{0:04d}.exr'.format(number))
+
+    def test_copy_to(self):
+        seq = sequences.FileSequence(self.path(1))
+        progress = []
+        destination = sequences.utils.join_paths(self.folder, 'publish', 'shot.#####.exr')
+        copies = seq.copy_to(destination, workers=4, progressCB=lambda *args: progress.append(args))
+        self.assertEqual(copies.numbers, [1, 2, 3, 4, 5])
+        self.assertEqual(copies.padding, 5)
+        self.assertEqual(copies[3], sequences.utils.join_paths(self.folder, 'publish', 'shot.00003.exr'))
+        for number, path in copies.iteritems():
+            with open(path) as f:
+                self.assertEqual(f.read(), str(number) * number)
+            self.assertFalse(os.path.samefile(path, self.path(number)))
+        self.assertEqual(sorted(progress)[-1], (5, 5))
+        # Built from the copies with the stats of the items
+        counter = sequences.core.SYSCALL_COUNTER
+        self.assertEqual(copies.totalSize, 15)
+        self.assertEqual(list(copies.frameMtimes), list(seq.frameMtimes))
+        self.assertEqual(sequences.core.SYSCALL_COUNTER, counter)
+
+        self.assertRaises(OSError, seq.copy_to, destination)
+        with open(copies[1], 'w') as f:
+            f.write('old')
+        seq.copy_to(destination, replace=True)
+        with open(copies[1]) as f:
+            self.assertEqual(f.read(), '1')
+
+    def test_copy_to_folder(self):
+        seq = sequences.FileSequence(self.path(1))
+        destination = os.path.join(self.folder, 'publish')
+        os.mkdir(destination)
+        copies = seq.copy_to(destination, workers=1)
+        self.assertEqual(copies.string, sequences.utils.join_paths(destination, 'render.0001.exr'))
+        self.assertEqual(sorted(os.listdir(destination)), sorted(os.listdir(self.source)))
+
+    def test_copy_to_hardlink(self):
+        seq = sequences.FileSequence(self.path(1))
+        copies = seq.copy_to(os.path.join(self.folder, 'publish', 'shot.####.exr'), hardlink=True)
+        for number, path in copies.iteritems():
+            self.assertTrue(os.path.samefile(path, self.path(number)))
+
+    def test_copy_to_relative(self):
+        cwd = os.getcwd()
+        os.chdir(self.source)
+        try:
+            names = sorted(os.listdir(os.curdir))
+            seq = sequences.FileSequence(names[0], items=names, validateExists=False)
+            self.assertEqual(seq.folder, '')
+            copies = seq.copy_to('shot.####.exr', hardlink=True)
+            self.assertRaises(OSError, seq.copy_to, 'shot.####.exr')
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(copies.numbers, [1, 2, 3, 4, 5])
+        self.assertTrue(os.path.samefile(os.path.join(self.source, 'shot.0002.exr'), self.path(2)))
+
+    def test_link_to(self):
+        seq = sequences.FileSequence(self.path(1))
+        links = seq.link_to(os.path.join(self.folder, 'shot.####.exr'))
+        self.assertEqual(links.numbers, [1, 2, 3, 4, 5])
+        self.assertTrue(os.path.samefile(links[2], self.path(2)))
+        self.assertFalse(os.path.islink(links[2]))
+
+    def test_symlink_to(self):
+        seq = sequences.FileSequence(self.path(1))
+        links = seq.symlink_to(os.path.join(self.folder, 'shot.####.exr'))
+        self.assertEqual(os.readlink(links[2]), self.path(2))
+        # Replacing a link doesn't write to the item it points to
+        seq.copy_to(os.path.join(self.folder, 'shot.####.exr'), replace=True)
+        self.assertFalse(os.path.islink(links[2]))
+        with open(self.path(2)) as f:
+            self.assertEqual(f.read(), '22')
+
+    def test_symlink_to_relative(self):
+        cwd = os.getcwd()
+        os.chdir(self.folder)
+        try:
+            seq = sequences.FileSequence(os.path.join('source', 'render.0001.exr'))
+            links = seq.symlink_to(os.path.join('publish', 'shot.####.exr'))
+        finally:
+            os.chdir(cwd)
+        path = os.path.join(self.folder, links[2])
+        self.assertTrue(os.path.isabs(os.readlink(path)))
+        with open(path) as f:
+            self.assertEqual(f.read(), '22')
+
+    def test_transfer_to_source(self):
+        seq = sequences.FileSequence(self.path(1))
+        expected = sorted(os.listdir(self.source))
+        os.symlink(self.source, os.path.join(self.folder, 'alias'))
+        for destination in (self.source, self.path(1), os.path.join(self.folder, 'alias', 'render.####.exr')):
+            for method in (seq.copy_to, seq.link_to, seq.symlink_to):
+                self.assertRaises(OSError, method, destination, replace=True)
+        self.assertEqual(sorted(os.listdir(self.source)), expected)
+        with open(self.path(3)) as f:
+            self.assertEqual(f.read(), '333')
+
+    def test_copy_to_free_space(self):
+        seq = sequences.FileSequence(self.path(1))
+        getFreeSpace = sequences.core._get_free_space
+        sequences.core._get_free_space = lambda folder: 10
+        try:
+            self.assertRaises(OSError, seq.copy_to, os.path.join(self.folder, 'shot.####.exr'))
+        finally:
+            sequences.core._get_free_space = getFreeSpace
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 'shot.0001.exr')))
+
+
+class TestSyncSequence(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.source = os.path.join(self.folder, 'scratch')
+        self.destination = os.path.join(self.folder, 'nas')
+        os.mkdir(self.source)
+        self.write(1, 2, 3, 4)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, number, folder=None):
+        return sequences.utils.join_paths(folder or self.source, 'render.{0:04d}.exr'.format(number))
+
+    def write(self, *numbers, **kwargs):
+        for number in numbers:
+            with open(self.path(number), 'w') as f:
+                f.write(kwargs.get('data', str(number)))
+        # Old enough to be trusted by refresh
+        stamp = time.time() - 10
+        for number in numbers:
+            os.utime(self.path(number), (stamp, stamp))
+        os.utime(self.source, (stamp, stamp))
+
+    def test_sync(self):
+        seq = sequences.FileSequence(self.path(1))
+        copy, copied, removed = sequences.sync_sequence(seq, self.destination, workers=4)
+        self.assertEqual(list(copied), [1, 2, 3, 4])
+        self.assertEqual(list(removed), [])
+        self.assertEqual(copy.numbers, [1, 2, 3, 4])
+        self.assertEqual(copy[2], self.path(2, self.destination))
+        with open(copy[2]) as f:
+            self.assertEqual(f.read(), '2')
+
+        copy, copied, removed = sequences.sync_sequence(seq, self.destination)
+        self.assertEqual(list(copied), [])
+        self.assertEqual(copy.numbers, [1, 2, 3, 4])
+
+        self.write(2, data='changed')
+        self.write(5)
+        copy, copied, removed = sequences.sync_sequence(seq, self.destination)
+        self.assertEqual(list(copied), [2, 5])
+        self.assertEqual(copy.numbers, [1, 2, 3, 4, 5])
+        with open(copy[2]) as f:
+            self.assertEqual(f.read(), 'changed')
+
+    def test_sync_delete(self):
+        seq = sequences.FileSequence(self.path(1))
+        sequences.sync_sequence(seq, self.destination)
+        os.remove(self.path(3))
+        self.write()
+        copy, copied, removed = sequences.sync_sequence(seq, self.destination)
+        self.assertEqual(list(removed), [])
+        self.assertEqual(copy.numbers, [1, 2, 3, 4])
+        copy, copied, removed = sequences.sync_sequence(seq, self.destination, delete=True)
+        self.assertEqual(list(copied), [])
+        self.assertEqual(list(removed), [3])
+        self.assertEqual(copy.numbers, [1, 2, 4])
+        self.assertFalse(os.path.exists(self.path(3, self.destination)))
+
+
+class TestFileSequenceRefresh(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.touch(1, 2, 3, 4)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, number):
+        return sequences.utils.join_paths(self.folder, 'render.{0:04d}.exr'.format(number))
+
+    def touch(self, *numbers):
+        for number in numbers:
+            open(self.path(number), 'w').close()
+        # Old enough to be trusted by refresh
+        stamp = time.time() - 10
+        os.utime(self.folder, (stamp, stamp))
+
+    def test_refresh_unchanged(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.assertEqual(seq.numbers, [1, 2, 3, 4])
+        counter = sequences.core.SYSCALL_COUNTER
+        added, removed = seq.refresh()
+        self.assertEqual((list(added), list(removed)), ([], []))
+        # A single stat
+        self.assertEqual(sequences.core.SYSCALL_COUNTER - counter, 1)
+
+    def test_refresh_delta(self):
+        seq = sequences.FileSequence(self.path(1))
+        items = seq.items
+        os.remove(self.path(2))
+        self.touch(5, 6)
+        added, removed = seq.refresh()
+        self.assertEqual(list(added), [5, 6])
+        self.assertEqual(list(removed), [2])
+        self.assertIs(seq.items, items)
+        self.assertEqual(seq.numbers, [1, 3, 4, 5, 6])
+        self.assertEqual(seq[6], self.path(6))
+
+    def test_refresh_recent_folder(self):
+        seq = sequences.FileSequence(self.path(1))
+        os.utime(self.folder, None)
+        self.assertEqual(len(seq), 4)
+        # Folder changed right before the scan is not trusted
+        self.assertIsNone(seq._folderStamp)
+        open(self.path(5), 'w').close()
+        added, removed = seq.refresh()
+        self.assertEqual(list(added), [5])
+        self.assertIsNone(seq._folderStamp)
+
+    def test_refresh_removed_folder(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.assertEqual(len(seq), 4)
+        shutil.rmtree(self.folder)
+        added, removed = seq.refresh()
+        self.assertEqual(list(removed), [1, 2, 3, 4])
+        self.assertEqual(len(seq), 0)
+        os.mkdir(self.folder)
+
+
+class TestFileSequenceStats(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.sizes = {1: 100, 2: 100, 3: 0, 4: 20, 5: 100}
+        for number, size in self.sizes.items():
+            with open(self.path(number), 'w') as f:
+                f.write('x' * size)
+        os.utime(self.path(5), (1000000000, 1000000000))
+        self.scanStats = sequences.core.SCAN_STATS
+
+    def tearDown(self):
+        sequences.core.SCAN_STATS = self.scanStats
+        shutil.rmtree(self.folder)
+
+    def path(self, number):
+        return sequences.utils.join_paths(self.folder, 'render.{0:04d}.exr'.format(number))
+
+    def check_stats(self, seq):
+        self.assertEqual(list(seq.frameSizes), [100, 100, 0, 20, 100])
+        self.assertEqual(seq.totalSize, 320)
+        self.assertEqual(seq.frameMtimes[4], 1000000000)
+        self.assertEqual(seq.oldestMtime, 1000000000)
+        self.assertEqual(seq.newestMtime, max(os.stat(self.path(n)).st_mtime for n in self.sizes))
+        self.assertEqual(seq.get_empty_numbers(), [3])
+        self.assertEqual(seq.get_truncated_numbers(), [3, 4])
+
+    def test_lazy_stats(self):
+        sequences.core.SCAN_STATS = False
+        seq = sequences.FileSequence(self.path(1))
+        self.assertEqual(len(seq), 5)
+        counter = sequences.core.SYSCALL_COUNTER
+        self.check_stats(seq)
+        # Every item is stat'd once
+        self.assertEqual(sequences.core.SYSCALL_COUNTER - counter, 5)
+
+        os.remove(self.path(2))
+        self.assertEqual(list(seq.frameSizes), [100, 100, 0, 20, 100])
+        seq.reload()
+        self.assertEqual(list(seq.frameSizes), [100, 0, 20, 100])
+        seq.items[2] = self.path(2)
+        self.assertEqual(list(seq.frameSizes), [100, -1, 0, 20, 100])
+        self.assertEqual(seq.get_truncated_numbers(), [2, 3, 4])
+
+    def test_scan_stats(self):
+        sequences.core.SCAN_STATS = True
+        seq = sequences.FileSequence(self.path(1))
+        self.assertEqual(len(seq), 5)
+        counter = sequences.core.SYSCALL_COUNTER
+        self.check_stats(seq)
+        self.assertEqual(sequences.core.SYSCALL_COUNTER, counter)
+
+
+class TestListingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.database = os.path.join(self.folder, 'listings.db')
+        self.cache = sequences.set_listing_cache(self.database)
+
+    def tearDown(self):
+        sequences.set_listing_cache(None)
+        self.cache.close()
+        shutil.rmtree(self.folder)
+
+    def test_scan_for_files(self):
+        sequences.set_listing_cache(None)
+        expected = sequences.scan_for_files(TEST_FILES_PATH, recursive=True)
+        sequences.set_listing_cache(self.cache)
+        self.assertEqual(sequences.scan_for_files(TEST_FILES_PATH, recursive=True), expected)
+        folders = self.cache.misses
+        self.assertEqual(self.cache.hits, 0)
+
+        # Another process sharing the database only stats the folders
+        cache = sequences.set_listing_cache(self.database)
+        counter = sequences.core.SYSCALL_COUNTER
+        self.assertEqual(sequences.scan_for_files(TEST_FILES_PATH, recursive=True), expected)
+        self.assertEqual((cache.hits, cache.misses), (folders, 0))
+        self.assertEqual(sequences.core.SYSCALL_COUNTER - counter, folders)
+        cache.close()
+
+    def test_file_sequence(self):
+        folder = os.path.join(self.folder, 'render')
+        os.mkdir(folder)
+        for number in (1, 2, 3):
+            open(os.path.join(folder, 'beauty.{0:04d}.exr'.format(number)), 'w').close()
+        stamp = time.time() - 10
+        os.utime(folder, (stamp, stamp))
+        path = os.path.join(folder, 'beauty.0001.exr')
+
+        self.assertEqual(sequences.FileSequence(path).numbers, [1, 2, 3])
+        self.assertEqual(sequences.FileSequence(path).numbers, [1, 2, 3])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # Changed folders are scanned again
+        open(os.path.join(folder, 'beauty.0004.exr'), 'w').close()
+        self.assertEqual(sequences.FileSequence(path).numbers, [1, 2, 3, 4])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_missing_folder(self):
+        self.assertEqual(sequences.scan_for_files(os.path.join(self.folder, 'missing')), [])
+
+    def test_special_files(self):
+        folder = os.path.join(self.folder, 'render')
+        os.mkdir(folder)
+        for number in (1, 2):
+            open(os.path.join(folder, 'beauty.{0:04d}.exr'.format(number)), 'w').close()
+        os.symlink(os.path.join(folder, 'missing.exr'), os.path.join(folder, 'beauty.0003.exr'))
+        os.mkfifo(os.path.join(folder, 'beauty.0004.exr'))
+        stamp = time.time() - 10
+        os.utime(folder, (stamp, stamp))
+        path = os.path.join(folder, 'beauty.0001.exr')
+        # Everything that isn't a folder is listed, like scans always did
+        files = [os.path.join(folder, 'beauty.{0:04d}.exr'.format(n)) for n in (1, 2, 3, 4)]
+
+        for cache in (None, self.cache, self.cache):
+            sequences.set_listing_cache(cache)
+            self.assertEqual(sequences.FileSequence(path).numbers, [1, 2, 3, 4])
+            self.assertEqual(sorted(sequences.scan_for_files(folder)), files)
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 1))
+
+
+class TestAsync(unittest.TestCase):
+
+    def test_ascan_for_files(self):
+        values = []
+        results = [
+            (sequences.ascan_for_files(TEST_FILES_PATH, recursive=True, callback=values.append), dict(recursive=True)),
+            (sequences.ascan_for_files(TEST_FILES_PATH, recursive=True, groupFolders=True), dict(recursive=True, groupFolders=True)),
+            (sequences.ascan_for_files(TEST_FILES_PATH), dict()),
+        ]
+        for result, kwargs in results:
+            self.assertEqual(result.get(10), sequences.scan_for_files(TEST_FILES_PATH, **kwargs))
+            self.assertTrue(result.successful())
+        self.assertEqual(values, [results[0][0].get()])
+
+    def test_afind_sequences(self):
+        folder = sequences.utils.join_paths(TEST_FILES_PATH, 'SequencesPadding')
+        seqs, singles = sequences.afind_sequences(folder).get(10)
+        expectedSeqs, expectedSingles = sequences.find_sequences(folder)
+        self.assertEqual([s.numbers for s in seqs], [s.numbers for s in expectedSeqs])
+        self.assertEqual(singles, expectedSingles)
+
+        result = sequences.afind_sequences(os.path.join(TEST_FILES_PATH, 'missing'))
+        self.assertRaises(OSError, result.get, 10)
+        self.assertFalse(result.successful())
+
+    def test_aload(self):
+        path = os.path.join(TEST_FILES_PATH, 'Sequences', 'New Text Document_v01.0001.txt')
+        seq = sequences.FileSequence(path)
+        result = seq.aload()
+        self.assertIs(result.get(10), seq)
+        self.assertTrue(seq.built)
+        self.assertEqual(seq.numbers, sequences.FileSequence(path).numbers)
+
+    def test_async_errors(self):
+        class Interrupt(BaseException):
+            pass
+
+        def fail(*args):
+            raise Interrupt()
+
+        seq = sequences.FileSequence(os.path.join(TEST_FILES_PATH, 'Sequences', 'New Text Document_v01.0001.txt'))
+        listFolder, listFiles = sequences.core._list_folder, sequences.core._list_files
+        sequences.core._list_folder = sequences.core._list_files = fail
+        try:
+            results = [
+                sequences.ascan_for_files(TEST_FILES_PATH, recursive=True),
+                sequences.afind_sequences(TEST_FILES_PATH),
+                seq.aload(),
+            ]
+            for result in results:
+                result.wait(10)
+                self.assertTrue(result.ready())
+                self.assertFalse(result.successful())
+                self.assertRaises(Interrupt, result.get)
+        finally:
+            sequences.core._list_folder, sequences.core._list_files = listFolder, listFiles
+
+    def test_pending_result(self):
+        result = sequences.PendingResult()
+        self.assertFalse(result.ready())
+        self.assertRaises(ValueError, result.successful)
+        self.assertRaises(sequences.core.TimeoutError, result.get, 0.01)
+
 
 class TestImageSequence(unittest.TestCase):
     sequenceClass = sequences.ImageSequence
@@ -695,6 +1416,217 @@ class TestSequenceUtils(unittest.TestCase):
             path = sequences.utils.join_paths(TEST_FILES_PATH, 'TestFlattening') + test_results[i]
             self.assertEqual(path, r)
 
+    def test_scan_for_files_workers(self):
+        for groupFolders in (False, True):
+            expected = sequences.scan_for_files(TEST_FILES_PATH, recursive=True, groupFolders=groupFolders)
+            result = sequences.scan_for_files(TEST_FILES_PATH, recursive=True, groupFolders=groupFolders, workers=4)
+            self.assertEqual(result, expected)
+        expected = sequences.scan_for_files(TEST_FILES_PATH)
+        self.assertEqual(sequences.scan_for_files(TEST_FILES_PATH, workers=4), expected)
+
+    def test_compile_filter(self):
+        self.assertIsNone(sequences.utils.compile_filter())
+        self.assertIsNone(sequences.utils.compile_filter(include=['*']))
+        nameFilter = sequences.utils.compile_filter(include=['*.jpg', '*.py'], exclude=['*_v02*'], extensions=['jpg'])
+        self.assertTrue(nameFilter('shot_v01.0001.jpg'))
+        self.assertFalse(nameFilter('shot_v02.0001.jpg'))
+        self.assertFalse(nameFilter('shot_v01.0001.py'))
+        self.assertFalse(nameFilter('shot_v01.0001.jpg.bak'))
+        self.assertFalse(sequences.utils.compile_filter(include=[])('a.jpg'))
+        self.assertTrue(sequences.utils.filter_item('a.[1].jpg', include=['a.[[]1].*']))
+        self.assertFalse(sequences.utils.filter_item('a.jpg', exclude=['?.jpg']))
+
+    def test_scan_for_files_filters(self):
+        allFiles = sequences.scan_for_files(TEST_FILES_PATH, recursive=True)
+        kwargs = dict(include=['New*', 'Test*'], exclude=['*_test*'], extensions=['.jpg', 'txt'])
+        expected = [p for p in allFiles if sequences.utils.filter_item(os.path.basename(p), kwargs['include'], kwargs['exclude'])
+                    and os.path.splitext(p)[1] in ('.jpg', '.txt')]
+        self.assertTrue(expected)
+        for workers in (1, 4):
+            self.assertEqual(sequences.scan_for_files(TEST_FILES_PATH, recursive=True, workers=workers, **kwargs), expected)
+        self.assertEqual(list(sequences.iter_files(TEST_FILES_PATH, **kwargs)), sorted(expected, key=allFiles.index))
+        self.assertEqual(sequences.ascan_for_files(TEST_FILES_PATH, recursive=True, **kwargs).get(10), expected)
+
+        # Pruned folders are never listed
+        listed = []
+        listFolder = sequences.core._list_folder
+        sequences.core._list_folder = lambda path, *args: listed.append(path) or listFolder(path, *args)
+        try:
+            result = sequences.scan_for_files(TEST_FILES_PATH, recursive=True, prune=['TestFlattening', 'Version*'])
+        finally:
+            sequences.core._list_folder = listFolder
+        self.assertTrue(listed)
+        for folder in listed:
+            self.assertNotIn('TestFlattening', folder)
+            self.assertNotIn('Version', folder)
+        self.assertEqual(result, [p for p in allFiles if '/TestFlattening/' not in p and '/Version' not in p])
+
+        folder = os.path.join(TEST_FILES_PATH, 'Sequences')
+        self.assertEqual(
+            sequences.utils.get_folder_contents(folder, extensions=['py', 'txt']),
+            [p for p in sequences.utils.get_folder_contents(folder) if os.path.isfile(p) and not p.endswith('.jpg')])
+
+    def test_find_sequences_filters(self):
+        folder = sequences.utils.join_paths(TEST_FILES_PATH, 'Sequences')
+        seqs, singles = sequences.find_sequences(folder, exclude=['*.00[0-4]?.*'], extensions=['jpg', 'py'])
+        self.assertEqual([s.numbers for s in seqs], [[80]])
+        self.assertEqual(singles, [])
+        walked = dict((f, (s, n)) for f, s, n in sequences.walk_sequences(TEST_FILES_PATH, extensions=['py'], prune=['Test*']))
+        self.assertNotIn(sequences.utils.join_paths(TEST_FILES_PATH, 'TestFlattening'), walked)
+        seqs, singles = walked[folder]
+        self.assertEqual([os.path.basename(s.get_pound_string()) for s in seqs], ['New Text Document_v01.####.py'])
+        self.assertEqual(singles, [])
+
+    def test_iter_files(self):
+        files = sequences.iter_files(TEST_FILES_PATH)
+        self.assertNotIsInstance(files, list)
+        self.assertEqual(sorted(files), sorted(sequences.scan_for_files(TEST_FILES_PATH, recursive=True)))
+
+        expected = sequences.scan_for_files(TEST_FILES_PATH, recursive=True, groupFolders=True)
+        groups = list(sequences.iter_files(TEST_FILES_PATH, groupFolders=True))
+        self.assertEqual(sorted(groups), sorted(expected))
+
+        expected = sequences.scan_for_files(TEST_FILES_PATH)
+        self.assertEqual(list(sequences.iter_files(TEST_FILES_PATH, recursive=False)), expected)
+
+    def test_flatten_sequences_members(self):
+        paths = ['/show/aaa010.{0:04d}.exr'.format(i) for i in range(1, 11)]
+        paths += ['/show/aaa020.{0:04d}.exr'.format(i) for i in range(5, 8)]
+        paths += ['/show/readme.txt', '/show/aaa030.####.exr']
+        flattened = sequences.flatten_sequences(list(reversed(paths)))
+        self.assertEqual(sorted(flattened), [
+            '/show/aaa010.####.exr',
+            '/show/aaa020.####.exr',
+            '/show/aaa030.####.exr',
+            '/show/readme.txt',
+        ])
+        self.assertEqual(flattened['/show/aaa010.####.exr'].numbers, range(1, 11))
+        self.assertEqual(flattened['/show/aaa020.####.exr'].numbers, [5, 6, 7])
+        self.assertIsNone(flattened['/show/readme.txt'])
+
+    def test_find_sequences(self):
+        folder = sequences.utils.join_paths(TEST_FILES_PATH, 'SequencesPadding')
+        seqs, singles = sequences.find_sequences(folder)
+        self.assertEqual(singles, [])
+        results = [(os.path.basename(s.get_pound_string()), s.numbers) for s in seqs]
+        self.assertEqual(results, [
+            ('New Text Document_v01.#####.txt', [5]),
+            ('New Text Document_v01.####.txt', [1, 2, 3]),
+            ('New Text Document_v01.###.txt', [4]),
+        ])
+
+    def test_find_sequences_singles(self):
+        folder = sequences.utils.join_paths(TEST_FILES_PATH, 'Sequences')
+        seqs, singles = sequences.find_sequences(folder, sequenceClass=sequences.ImageSequence)
+        self.assertEqual(len(seqs), 1)
+        self.assertIsInstance(seqs[0], sequences.ImageSequence)
+        self.assertEqual(seqs[0].numbers, [1, 10, 12, 13, 49, 80])
+        self.assertEqual([os.path.basename(p) for p in singles], [
+            'New Text Document_v01.0005.py',
+            'New Text Document_v01_test.0004.txt',
+        ])
+
+    def test_walk_sequences(self):
+        counter = sequences.core.SYSCALL_COUNTER
+        walked = list(sequences.walk_sequences(TEST_FILES_PATH))
+        self.assertEqual(sequences.core.SYSCALL_COUNTER - counter, len(walked))
+        folders = [folder for folder, seqs, singles in walked]
+        self.assertEqual(folders[0], TEST_FILES_PATH.rstrip('/'))
+        self.assertEqual(sorted(folders), sorted(
+            sequences.utils.path_normalize(f) for f, d, n in os.walk(TEST_FILES_PATH.rstrip('/'))))
+        for folder, seqs, singles in walked:
+            expectedSeqs, expectedSingles = sequences.find_sequences(folder)
+            self.assertEqual([s.get_pound_string() for s in seqs], [s.get_pound_string() for s in expectedSeqs])
+            self.assertEqual([s.numbers for s in seqs], [s.numbers for s in expectedSeqs])
+            self.assertEqual(singles, expectedSingles)
+
+    def test_match_file_sequence(self):
+        paths = sequences.scan_for_files(TEST_FILES_PATH, recursive=True)
+        paths += [
+            'aaa010.####.exr', 'aaa010.%04d.exr', 'aaa010.$F4.exr', 'aaa010.\\d{4}.exr',
+            'aaa010.{item:04d}.exr', 'aaa010.{item:04d', 'aaa010.0001', 'aaa010.0001.',
+            'aaa010.0001abc', 'aaa010.0001 - Copy.jpg', 'a.0001.b c', 'a.b.0001.0002.c.d',
+            'a.0001.b\n.c', '.0001', 'no_sequence.txt', '',
+        ]
+        regex = sequences.core.DEFAULT_FILE_SEQUENCE_PATTERN
+        for path in paths:
+            expected = regex.search(path)
+            match = sequences.core.match_file_sequence(path)
+            if expected is None:
+                self.assertIsNone(match, path)
+                continue
+            self.assertEqual(match.groupdict(), expected.groupdict(), path)
+            for group in sequences.core.SequenceMatch.groupNames:
+                self.assertEqual(match.span(group), expected.span(group), path)
+
+
+class TestTemplateCache(unittest.TestCase):
+
+    def setUp(self):
+        sequences.core.TEMPLATE_CACHE.clear()
+
+    def test_shared_template(self):
+        cache = sequences.core.TEMPLATE_CACHE
+        paths = ['/show/shot010/beauty.{0:04d}.exr'.format(i) for i in range(1, 4)]
+        seqs = [sequences.FileSequence(p, validateExists=False) for p in paths]
+        self.assertEqual((cache.misses, cache.hits), (1, 2))
+        for path, seq in zip(paths, seqs):
+            uncached = sequences.core.DEFAULT_FILE_SEQUENCE_PATTERN.search(path)
+            self.assertEqual(seq._primary_match.groupdict(), uncached.groupdict())
+            self.assertEqual(seq.padding, 4)
+            self.assertEqual(seq.ext, '.exr')
+
+        # Same template with a different class is parsed again
+        sequences.ImageSequence(paths[0], validateExists=False)
+        self.assertEqual((cache.misses, cache.hits), (2, 2))
+
+        # Item number that is not the last digits in the path is not cached
+        sequences.FileSequence('/show/beauty.0001.v2.exr', validateExists=False)
+        sequences.FileSequence('/show/beauty.0002.v2.exr', validateExists=False)
+        self.assertEqual(len(cache), 2)
+
+    def test_lru_cache(self):
+        cache = sequences.utils.LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.info(), {'hits': 2, 'misses': 1, 'size': 2, 'maxSize': 2})
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+        self.assertRaises(ValueError, sequences.utils.LRUCache, 0)
+
+    def test_lru_cache_threads(self):
+        cache = sequences.utils.LRUCache(16)
+        errors = []
+
+        def work(offset):
+            try:
+                for index in xrange(5000):
+                    key = (offset + index) % 40
+                    if cache.get(key) is None:
+                        cache.set(key, index)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cache), 16)
+        # Every entry is still reachable from the linked list
+        link, reachable = cache._root[1], 0
+        while link is not cache._root:
+            reachable += 1
+            link = link[1]
+        self.assertEqual(reachable, 16)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
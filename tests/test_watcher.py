@@ -0,0 +1,114 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import sequences
+
+
+@unittest.skipUnless(sequences.utils.get_os() == 'linux', "inotify is only available on linux")
+class TestSequenceWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.touch(1, 2)
+        self.events = []
+        self.watcher = sequences.SequenceWatcher(
+            addedCB=lambda s, n: self.events.append(('added', n)),
+            removedCB=lambda s, n: self.events.append(('removed', n)),
+            completeCB=lambda s: self.events.append(('complete', None)),
+        )
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def path(self, number):
+        return sequences.utils.join_paths(self.folder, 'render.{0:04d}.exr'.format(number))
+
+    def touch(self, *numbers):
+        for number in numbers:
+            with open(self.path(number), 'w') as f:
+                f.write('frame')
+
+    def process(self):
+        # Wait for the first events then read anything left
+        self.watcher.process_events(1)
+        while self.watcher.process_events(0.05):
+            pass
+
+    def test_watch(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.watcher.add(seq, expected='1-4')
+        self.assertEqual(seq.numbers, [1, 2])
+
+        counter = sequences.core.SYSCALL_COUNTER
+        self.touch(3, 4)
+        open(sequences.utils.join_paths(self.folder, 'other.0005.exr'), 'w').close()
+        self.process()
+        self.assertEqual(self.events, [('added', 3), ('added', 4), ('complete', None)])
+        self.assertEqual(seq.numbers, [1, 2, 3, 4])
+
+        del self.events[:]
+        os.rename(self.path(1), self.path(6))
+        os.remove(self.path(2))
+        self.process()
+        self.assertEqual(self.events, [('removed', 1), ('added', 6), ('removed', 2)])
+        self.assertEqual(seq.numbers, [3, 4, 6])
+        # No folder scans while following the sequence
+        self.assertEqual(sequences.core.SYSCALL_COUNTER, counter)
+
+    def test_wait_for_close(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.watcher.add(seq)
+        f = open(self.path(3), 'w')
+        self.process()
+        self.assertEqual(seq.numbers, [1, 2])
+        f.close()
+        self.process()
+        self.assertEqual(seq.numbers, [1, 2, 3])
+
+    def test_links(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.watcher.add(seq, expected='1-3')
+        os.remove(self.path(2))
+        self.process()
+        del self.events[:]
+        os.link(self.path(1), self.path(2))
+        os.symlink(self.path(1), self.path(3))
+        self.process()
+        self.assertEqual(self.events, [('added', 2), ('added', 3), ('complete', None)])
+        self.assertEqual(seq.numbers, [1, 2, 3])
+
+    def test_add_complete(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.watcher.add(seq, expected=[1, 2])
+        self.assertEqual(self.events, [('complete', None)])
+
+    def test_add_built(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.assertEqual(len(seq), 2)
+        self.touch(3)
+        # Written between the scan and the watch
+        os.utime(self.folder, (time.time() - 10, time.time() - 10))
+        self.watcher.add(seq)
+        self.assertEqual(self.events, [('added', 3)])
+
+    def test_folder_removed(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.watcher.add(seq)
+        shutil.rmtree(self.folder)
+        self.process()
+        self.assertEqual(sorted(self.events), [('removed', 1), ('removed', 2)])
+        self.assertEqual(len(seq), 0)
+        self.assertEqual(self.watcher.sequences, [])
+
+    def test_remove(self):
+        seq = sequences.FileSequence(self.path(1))
+        self.watcher.add(seq)
+        self.watcher.remove(seq)
+        self.assertRaises(ValueError, self.watcher.remove, seq)
+        self.touch(3)
+        self.process()
+        self.assertEqual(self.events, [])